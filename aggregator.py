@@ -0,0 +1,138 @@
+import logging
+import time
+import typing
+
+from models import *
+from metrics import metrics
+
+logger = logging.getLogger()
+
+# Each timeframe is built from the closed candles of the one before it, so a trade only ever
+# touches the 1m candle; the other timeframes are updated when a lower timeframe candle closes.
+TIMEFRAMES = ["1m", "5m", "15m", "30m", "1h", "4h"]
+TIMEFRAME_MS = {"1m": 60_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000, "1h": 3_600_000, "4h": 14_400_000}
+
+_strategy_timer = metrics.histogram("stage_seconds", stage="strategy")  # Time spent in the listeners
+
+
+class _Level:
+    # Candle currently being built for one timeframe.
+    __slots__ = ("timeframe", "ms", "open_time", "open", "high", "low", "close", "volume")
+
+    def __init__(self, timeframe: str):
+        self.timeframe = timeframe
+        self.ms = TIMEFRAME_MS[timeframe]
+        self.open_time = None
+
+    def start(self, timestamp: int, open_: float, high: float, low: float, close: float, volume: float):
+        self.open_time = timestamp - timestamp % self.ms
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def merge(self, high: float, low: float, close: float, volume: float):
+        if high > self.high:
+            self.high = high
+        if low < self.low:
+            self.low = low
+        self.close = close
+        self.volume += volume
+
+
+class CandleAggregator:
+    # Turns the aggTrade stream of one symbol into 1m/5m/15m/30m/1h/4h candles.
+    # on_new_candle(timeframe, candles) is called when a candle closes, candles[-1] being that candle,
+    # on_same_candle(timeframe, price, size, timestamp) for every trade of the current candle, including the
+    # trade that opens it.
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self._levels = [_Level(tf) for tf in TIMEFRAMES]
+
+        self.candles = dict()  # Closed candles, only kept for the timeframes somebody listens to
+        self._new_candle_callbacks = {tf: [] for tf in TIMEFRAMES}
+        self._same_candle_callbacks = []  # (timeframe, callback) pairs
+
+    def add_listener(self, timeframe: str, on_new_candle: typing.Callable, on_same_candle: typing.Callable):
+        if timeframe not in self.candles:
+            self.candles[timeframe] = CandleSeries()
+        # Lists are replaced rather than mutated so that the websocket thread can keep iterating them
+        self._new_candle_callbacks[timeframe] = self._new_candle_callbacks[timeframe] + [on_new_candle]
+        self._same_candle_callbacks = self._same_candle_callbacks + [(timeframe, on_same_candle)]
+
+    def remove_listener(self, timeframe: str, on_new_candle: typing.Callable, on_same_candle: typing.Callable):
+        self._new_candle_callbacks[timeframe] = [cb for cb in self._new_candle_callbacks[timeframe]
+                                                 if cb != on_new_candle]
+        self._same_candle_callbacks = [(tf, cb) for tf, cb in self._same_candle_callbacks
+                                       if not (tf == timeframe and cb == on_same_candle)]
+
+    def has_listeners(self) -> bool:
+        return len(self._same_candle_callbacks) > 0
+
+    def seed(self, timeframe: str, history: CandleSeries):
+        # Prepends the closed candles of a REST/backfill history to the candles built from trades.
+        if timeframe not in self.candles:
+            self.candles[timeframe] = CandleSeries()
+        candles = CandleSeries()
+        candles.extend(history)
+        candles.extend(self.candles[timeframe])
+        self.candles[timeframe] = candles
+
+    def on_trade(self, price: float, size: float, timestamp: int):
+        base = self._levels[0]
+        if base.open_time is None:
+            base.start(timestamp, price, price, price, price, size)
+        elif timestamp >= base.open_time + base.ms:
+            self._close(0, timestamp)
+            base.start(timestamp, price, price, price, price, size)
+        else:
+            base.merge(price, price, price, size)
+
+        # The trade opening a candle is part of it too: its listeners see it after on_new_candle
+        start = time.perf_counter() if metrics.enabled else 0.0
+        for timeframe, callback in self._same_candle_callbacks:
+            callback(timeframe, price, size, timestamp)
+        if start:
+            _strategy_timer.record(time.perf_counter() - start)
+
+    def _close(self, idx: int, timestamp: int):
+        level = self._levels[idx]
+
+        candles = self.candles.get(level.timeframe)
+        if candles is not None:
+            candles.append(level.open_time, level.open, level.high, level.low, level.close, level.volume)
+            start = time.perf_counter() if metrics.enabled else 0.0
+            for callback in self._new_candle_callbacks[level.timeframe]:
+                callback(level.timeframe, candles)
+            if start:
+                _strategy_timer.record(time.perf_counter() - start)
+
+        if idx + 1 < len(self._levels):
+            upper = self._levels[idx + 1]
+            if upper.open_time is None:
+                upper.start(level.open_time, level.open, level.high, level.low, level.close, level.volume)
+            else:
+                upper.merge(level.high, level.low, level.close, level.volume)
+            # The trade that closed the lower candle may also be past the end of the upper one
+            if timestamp >= upper.open_time + upper.ms:
+                self._close(idx + 1, timestamp)
+
+        level.open_time = None
+
+    def current(self, timeframe: str) -> typing.Optional[typing.Tuple[int, float, float, float, float, float]]:
+        # In-progress candle of a timeframe as (open time, open, high, low, close, volume), merged on demand
+        # from the partial candles of the lower timeframes.
+        result = None
+        for level in reversed(self._levels[:TIMEFRAMES.index(timeframe) + 1]):
+            if level.open_time is None:
+                continue
+            if result is None:
+                open_time = level.open_time - level.open_time % TIMEFRAME_MS[timeframe]
+                result = [open_time, level.open, level.high, level.low, level.close, level.volume]
+            else:
+                result[2] = max(result[2], level.high)
+                result[3] = min(result[3], level.low)
+                result[4] = level.close
+                result[5] += level.volume
+        return tuple(result) if result is not None else None
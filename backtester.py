@@ -0,0 +1,180 @@
+import array
+import itertools
+import logging
+import typing
+from concurrent.futures import ProcessPoolExecutor
+
+from models import *
+from aggregator import CandleAggregator
+from strategies import Strategy, TechnicalStrategy, BreakoutStrategy
+
+logger = logging.getLogger()
+
+STRATEGIES = {"Technical": TechnicalStrategy, "Breakout": BreakoutStrategy}
+
+
+class BacktestResult:
+    def __init__(self, initial_balance: float):
+        self.initial_balance = initial_balance
+        self.pnl = 0.0
+        self.max_drawdown = 0.0  # In % of the equity peak
+
+        # One entry per trade, stored column by column
+        self.entry_times = array.array("q")
+        self.exit_times = array.array("q")
+        self.sides = array.array("b")  # 1 long, -1 short
+        self.entry_prices = array.array("d")
+        self.exit_prices = array.array("d")
+        self.quantities = array.array("d")
+        self.trade_pnls = array.array("d")
+
+    @property
+    def trades(self) -> typing.List[typing.Dict]:
+        return [{"entry_time": self.entry_times[i], "exit_time": self.exit_times[i],
+                 "side": "BUY" if self.sides[i] == 1 else "SELL", "entry_price": self.entry_prices[i],
+                 "exit_price": self.exit_prices[i], "quantity": self.quantities[i], "pnl": self.trade_pnls[i]}
+                for i in range(len(self.sides))]
+
+
+class Backtester:
+    # Replays candles (or raw trades) through the same Strategy classes that run live. The strategy puts
+    # its signals on this object instead of the executor queue, and positions are opened at the signal price,
+    # sized with balance_pct, then closed on take profit or stop loss.
+    def __init__(self, strategy: Strategy, initial_balance: float = 1000.0, fee_pct: float = 0.04):
+        self.strategy = strategy
+        self._fee = fee_pct / 100
+        self.result = BacktestResult(initial_balance)
+
+        self._balance = initial_balance
+        self._peak = initial_balance
+
+        self._side = 0
+        self._entry_time = 0
+        self._entry_price = 0.0
+        self._quantity = 0.0
+        self._tp_price = 0.0
+        self._sl_price = 0.0
+
+        strategy._signals = self
+
+    def put(self, signal: Signal):
+        # Called by Strategy._emit in place of queue.Queue.put
+        side = 1 if signal.side == "BUY" else -1
+        quantity = self._balance * self.strategy.balance_pct / 100 / signal.price
+        quantity = signal.contract.round_quantity(quantity)  # Rounded down, as the live OrderExecutor does
+        if quantity <= 0:
+            return
+
+        self._side = side
+        self._entry_time = signal.timestamp
+        self._entry_price = signal.price
+        self._quantity = quantity
+        self._tp_price = signal.price * (1 + side * self.strategy.take_profit / 100)
+        self._sl_price = signal.price * (1 - side * self.strategy.stop_loss / 100)
+        self.strategy.ongoing_position = True
+
+    def _close_position(self, exit_price: float, timestamp: int):
+        side = self._side
+        pnl = side * (exit_price - self._entry_price) * self._quantity
+        pnl -= (self._entry_price + exit_price) * self._quantity * self._fee
+
+        result = self.result
+        result.entry_times.append(self._entry_time)
+        result.exit_times.append(timestamp)
+        result.sides.append(side)
+        result.entry_prices.append(self._entry_price)
+        result.exit_prices.append(exit_price)
+        result.quantities.append(self._quantity)
+        result.trade_pnls.append(pnl)
+
+        self._balance += pnl
+        if self._balance > self._peak:
+            self._peak = self._balance
+        elif self._peak > 0:
+            result.max_drawdown = max(result.max_drawdown, (self._peak - self._balance) / self._peak * 100)
+
+        self._side = 0
+        self.strategy.ongoing_position = False
+
+    def _check_exit(self, high: float, low: float, timestamp: int):
+        # When both levels are inside the same bar the stop loss is assumed to have been hit first.
+        if self._side == 1:
+            if low <= self._sl_price:
+                self._close_position(self._sl_price, timestamp)
+            elif high >= self._tp_price:
+                self._close_position(self._tp_price, timestamp)
+        else:
+            if high >= self._sl_price:
+                self._close_position(self._sl_price, timestamp)
+            elif low <= self._tp_price:
+                self._close_position(self._tp_price, timestamp)
+
+    def run(self, candles: CandleSeries, warmup: int = 0) -> BacktestResult:
+        # The first `warmup` candles only seed the strategy, e.g. for its indicators.
+        if warmup > 0:
+            self.strategy.seed(candles[:warmup])
+        bars = candles[warmup:]
+
+        columns = [bars.column(name) for name in CandleSeries.COLUMNS]
+        on_candle_closed = self.strategy.on_candle_closed
+        for timestamp, open_, high, low, close, volume in zip(*columns):
+            if self._side != 0:
+                self._check_exit(high, low, timestamp)
+            on_candle_closed(timestamp, open_, high, low, close, volume)
+        for column in columns:
+            column.release()
+
+        if self._side != 0 and len(bars) > 0:
+            self._close_position(bars[-1].close, bars.last_timestamp())
+
+        self.result.pnl = self._balance - self.result.initial_balance
+        return self.result
+
+    def run_trades(self, prices: typing.Sequence[float], sizes: typing.Sequence[float],
+                   timestamps: typing.Sequence[int]) -> BacktestResult:
+        # Tick replay through a CandleAggregator, exactly as the aggTrade stream drives the strategy live.
+        aggregator = CandleAggregator(self.strategy.contract.symbol)
+        aggregator.add_listener(self.strategy.timeframe, self.strategy.on_new_candle, self.strategy.on_same_candle)
+
+        on_trade = aggregator.on_trade
+        last_price, last_time = None, None
+        for price, size, timestamp in zip(prices, sizes, timestamps):
+            if self._side != 0:
+                self._check_exit(price, price, timestamp)
+            on_trade(price, size, timestamp)
+            last_price, last_time = price, timestamp
+
+        if self._side != 0 and last_price is not None:
+            self._close_position(last_price, last_time)
+
+        self.result.pnl = self._balance - self.result.initial_balance
+        return self.result
+
+
+def run_backtest(strategy_type: str, contract: Contract, timeframe: str, balance_pct: float, take_profit: float,
+                 stop_loss: float, other_params: typing.Dict, candles: CandleSeries, warmup: int = 0,
+                 initial_balance: float = 1000.0) -> BacktestResult:
+    strategy = STRATEGIES[strategy_type](contract, timeframe, balance_pct, take_profit, stop_loss, other_params, None)
+    return Backtester(strategy, initial_balance).run(candles, warmup)
+
+
+def _run_sweep_point(args) -> typing.Tuple[typing.Dict, float, float, int]:
+    other_params = args[6]
+    result = run_backtest(*args)
+    return other_params, result.pnl, result.max_drawdown, len(result.sides)
+
+
+def sweep(strategy_type: str, contract: Contract, timeframe: str, balance_pct: float, take_profit: float,
+          stop_loss: float, grid: typing.Dict[str, typing.List], candles: CandleSeries, warmup: int = 0,
+          processes: typing.Optional[int] = None) -> typing.List[typing.Tuple[typing.Dict, float, float, int]]:
+    # Backtests every combination of the grid, e.g. {"ema_fast": [8, 12], "ema_slow": [26, 30], "ema_signal": [9]},
+    # on a process pool. Returns (parameters, pnl, max drawdown, number of trades) sorted by pnl.
+    names = list(grid.keys())
+    points = [(strategy_type, contract, timeframe, balance_pct, take_profit, stop_loss, dict(zip(names, values)),
+               candles, warmup) for values in itertools.product(*grid.values())]
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        results = list(executor.map(_run_sweep_point, points, chunksize=max(1, len(points) // 64)))
+
+    results.sort(key=lambda r: r[1], reverse=True)
+    return results
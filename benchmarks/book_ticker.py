@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fixtures
+from benchmarks.suite import offline_client
+
+# Throughput of BinanceFutureClient._on_message on bookTicker frames, compared with the previous
+# json.loads + nested dict implementation, optionally with a reader thread polling prices like the UI.
+#
+#   python benchmarks/book_ticker.py [file with one recorded frame per line]
+
+
+def dict_on_message(prices: dict, message: str):
+    # Previous implementation, kept as the reference
+    data = json.loads(message)
+    if "e" in data:
+        if data['e'] == 'bookTicker':
+            symbol = data['s']
+            if symbol not in prices:
+                prices[symbol] = {'bid': float(data['b']), 'ask': float(data['a'])}
+            else:
+                prices[symbol]['bid'] = float(data['b'])
+                prices[symbol]['ask'] = float(data['a'])
+
+
+def run(name: str, on_message, messages, reader=None) -> float:
+    stop = threading.Event()
+    if reader is not None:
+        threading.Thread(target=reader, args=(stop,), daemon=True).start()
+
+    start = time.perf_counter()
+    for message in messages:
+        on_message(message)
+    elapsed = time.perf_counter() - start
+    stop.set()
+
+    print("  %-40s %10.0f msg/s" % (name, len(messages) / elapsed))
+    return elapsed
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            messages = [line.strip() for line in f if line.strip()]
+    else:
+        messages = fixtures.book_ticker_messages(300_000)
+    watched = fixtures.symbols(10)
+
+    prices = dict()
+    client = offline_client()
+
+    def dict_reader(stop):
+        while not stop.is_set():
+            try:
+                for symbol in watched:
+                    if symbol in prices:
+                        prices[symbol]['bid'], prices[symbol]['ask']
+            except RuntimeError:
+                pass
+            time.sleep(0.001)
+
+    def table_reader(stop):
+        while not stop.is_set():
+            for symbol in watched:
+                client.prices.snapshot(symbol)
+            time.sleep(0.001)
+
+    print("bookTicker decode + price update, %d frames" % len(messages))
+    run("json.loads + dict (previous)", lambda m: dict_on_message(prices, m), messages)
+    run("PriceTable + field scan", lambda m: client._on_message(None, m), messages)
+    run("json.loads + dict, with UI reader", lambda m: dict_on_message(prices, m), messages, dict_reader)
+    run("PriceTable + field scan, with UI reader", lambda m: client._on_message(None, m), messages, table_reader)
+
+    for symbol in watched:
+        assert prices[symbol]['bid'] == client.prices[symbol]['bid'], symbol
+
+
+if __name__ == "__main__":
+    main()
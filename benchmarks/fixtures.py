@@ -0,0 +1,164 @@
+import json
+import random
+import typing
+
+# Market data payloads in the exact wire format of the Binance USDⓈ-M futures API, generated from a fixed
+# seed so that every benchmark run replays the same bytes.
+
+_BASES = ["BTC", "ETH", "BNB", "SOL", "XRP", "ADA", "DOGE", "AVAX", "DOT", "LINK", "LTC", "TRX", "ATOM", "ETC",
+          "XLM", "FIL", "APT", "ARB", "OP", "NEAR", "INJ", "SUI", "SEI", "TIA", "AAVE", "UNI", "MKR", "CRV"]
+
+
+def symbols(count: int) -> typing.List[str]:
+    result = []
+    for i in range(count):
+        base = _BASES[i % len(_BASES)] + ("" if i < len(_BASES) else str(i // len(_BASES)))
+        result.append(base + "USDT")
+    return result
+
+
+def exchange_info(count: int = 300) -> typing.Dict:
+    rng = random.Random(1)
+    entries = []
+    for symbol in symbols(count):
+        price_precision = rng.choice([1, 2, 3, 4, 5, 6, 7])
+        quantity_precision = rng.choice([0, 1, 2, 3])
+        tick = "{:.{p}f}".format(10 ** -price_precision, p=price_precision)
+        step = "{:.{p}f}".format(10 ** -quantity_precision, p=max(quantity_precision, 1))
+        entries.append({
+            "symbol": symbol, "pair": symbol, "contractType": "PERPETUAL", "deliveryDate": 4133404800000,
+            "onboardDate": 1569398400000, "status": "TRADING", "maintMarginPercent": "2.5000",
+            "requiredMarginPercent": "5.0000", "baseAsset": symbol[:-4], "quoteAsset": "USDT", "marginAsset": "USDT",
+            "pricePrecision": price_precision, "quantityPrecision": quantity_precision, "baseAssetPrecision": 8,
+            "quotePrecision": 8, "underlyingType": "COIN", "underlyingSubType": ["Layer-1"], "settlePlan": 0,
+            "triggerProtect": "0.0500", "liquidationFee": "0.012500", "marketTakeBound": "0.05",
+            "maxMoveOrderLimit": 10000,
+            "filters": [
+                {"minPrice": tick, "maxPrice": "4529764", "filterType": "PRICE_FILTER", "tickSize": tick},
+                {"stepSize": step, "filterType": "LOT_SIZE", "maxQty": "1000", "minQty": step},
+                {"stepSize": step, "filterType": "MARKET_LOT_SIZE", "maxQty": "120", "minQty": step},
+                {"limit": 200, "filterType": "MAX_NUM_ORDERS"},
+                {"limit": 10, "filterType": "MAX_NUM_ALGO_ORDERS"},
+                {"notional": "5", "filterType": "MIN_NOTIONAL"},
+                {"multiplierDown": "0.9500", "multiplierUp": "1.0500", "multiplierDecimal": "4",
+                 "filterType": "PERCENT_PRICE"},
+            ],
+            "orderTypes": ["LIMIT", "MARKET", "STOP", "STOP_MARKET", "TAKE_PROFIT", "TAKE_PROFIT_MARKET",
+                           "TRAILING_STOP_MARKET"],
+            "timeInForce": ["GTC", "IOC", "FOK", "GTX", "GTD"],
+        })
+    return {"timezone": "UTC", "serverTime": 1713000000000, "futuresType": "U_MARGINED",
+            "rateLimits": [{"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": 2400},
+                           {"rateLimitType": "ORDERS", "interval": "MINUTE", "intervalNum": 1, "limit": 1200},
+                           {"rateLimitType": "ORDERS", "interval": "SECOND", "intervalNum": 10, "limit": 300}],
+            "exchangeFilters": [], "assets": [{"asset": "USDT", "marginAvailable": True, "autoAssetExchange": "-10000"}],
+            "symbols": entries}
+
+
+def account() -> typing.Dict:
+    assets = []
+    for asset, wallet in (("USDT", "15000.00000000"), ("BNB", "0.00000000"), ("USDC", "0.00000000")):
+        assets.append({"asset": asset, "walletBalance": wallet, "unrealizedProfit": "0.00000000",
+                       "marginBalance": wallet, "maintMargin": "0.00000000", "initialMargin": "0.00000000",
+                       "positionInitialMargin": "0.00000000", "openOrderInitialMargin": "0.00000000",
+                       "crossWalletBalance": wallet, "crossUnPnl": "0.00000000", "availableBalance": wallet,
+                       "maxWithdrawAmount": wallet, "marginAvailable": True, "updateTime": 1713000000000})
+    return {"feeTier": 0, "canTrade": True, "canDeposit": True, "canWithdraw": True, "updateTime": 0,
+            "multiAssetsMargin": False, "totalWalletBalance": "15000.00000000", "assets": assets, "positions": []}
+
+
+def book_ticker_messages(count: int, symbol_count: int = 300) -> typing.List[str]:
+    rng = random.Random(2)
+    names = symbols(symbol_count)
+    prices = {s: rng.uniform(0.1, 60000) for s in names}
+    messages = []
+    timestamp = 1713000000000
+    update_id = 4000000000000
+    for i in range(count):
+        # A few symbols make most of the traffic, as on the real stream
+        symbol = names[min(int(rng.expovariate(0.05)), symbol_count - 1)]
+        prices[symbol] *= 1 + rng.gauss(0, 0.0001)
+        bid = prices[symbol]
+        ask = bid * 1.0001
+        timestamp += rng.randint(0, 2)
+        update_id += rng.randint(1, 50)
+        messages.append(json.dumps({"e": "bookTicker", "u": update_id, "s": symbol, "b": "%.8f" % bid,
+                                    "B": "%.3f" % rng.uniform(0.001, 50), "a": "%.8f" % ask,
+                                    "A": "%.3f" % rng.uniform(0.001, 50), "T": timestamp, "E": timestamp + 1},
+                                   separators=(",", ":")))
+    return messages
+
+
+def agg_trade_messages(count: int, symbol_count: int = 20, trades_per_minute: int = 2000) -> typing.List[str]:
+    rng = random.Random(3)
+    names = symbols(symbol_count)
+    prices = {s: rng.uniform(0.1, 60000) for s in names}
+    messages = []
+    timestamp = 1713000000000
+    trade_id = 2000000000
+    step = max(1, 60_000 // trades_per_minute)
+    for i in range(count):
+        symbol = names[min(int(rng.expovariate(0.2)), symbol_count - 1)]
+        prices[symbol] *= 1 + rng.gauss(0, 0.0002)
+        timestamp += rng.randint(0, 2 * step)
+        trade_id += 1
+        messages.append(json.dumps({"e": "aggTrade", "E": timestamp + 5, "a": trade_id, "s": symbol,
+                                    "p": "%.8f" % prices[symbol], "q": "%.3f" % rng.expovariate(2),
+                                    "f": trade_id * 3, "l": trade_id * 3 + rng.randint(0, 4), "T": timestamp,
+                                    "m": rng.random() < 0.5}, separators=(",", ":")))
+    return messages
+
+
+def _depth_levels(rng: random.Random, mid: float, tick: float, side: int, count: int) -> typing.List[typing.List[str]]:
+    return [["%.2f" % (mid + side * tick * (i + 1)), "%.3f" % rng.uniform(0.001, 20)] for i in range(count)]
+
+
+def depth_snapshot(symbol: str = "BTCUSDT", levels: int = 1000, last_update_id: int = 5000000000) -> typing.Dict:
+    # /fapi/v1/depth response matching the first event of depth_messages()
+    rng = random.Random(4)
+    return {"lastUpdateId": last_update_id, "E": 1713000000000, "T": 1713000000000,
+            "bids": _depth_levels(rng, 60000.0, 0.1, -1, levels), "asks": _depth_levels(rng, 60000.0, 0.1, 1, levels)}
+
+
+def depth_messages(count: int, symbol: str = "BTCUSDT", last_update_id: int = 5000000000) -> typing.List[str]:
+    # @depth@100ms diff events continuing depth_snapshot(): most changes are close to the top of the book
+    rng = random.Random(5)
+    messages = []
+    update_id = last_update_id
+    timestamp = 1713000000000
+    for i in range(count):
+        first = update_id + 1 if i > 0 else last_update_id - 2
+        last = update_id + rng.randint(1, 30)
+        bids, asks = [], []
+        for _ in range(rng.randint(1, 20)):
+            distance = int(rng.expovariate(0.1)) + 1
+            qty = "0.000" if rng.random() < 0.2 else "%.3f" % rng.uniform(0.001, 20)
+            if rng.random() < 0.5:
+                bids.append(["%.2f" % (60000.0 - 0.1 * distance), qty])
+            else:
+                asks.append(["%.2f" % (60000.0 + 0.1 * distance), qty])
+        timestamp += 100
+        messages.append(json.dumps({"e": "depthUpdate", "E": timestamp, "T": timestamp - 1, "s": symbol,
+                                    "U": first, "u": last, "pu": update_id, "b": bids, "a": asks},
+                                   separators=(",", ":")))
+        update_id = last
+    return messages
+
+
+def klines(count: int = 1000, interval_ms: int = 60_000, start_time: int = 1713000000000) -> typing.List[typing.List]:
+    # /fapi/v1/klines response
+    rng = random.Random(6)
+    price = 60000.0
+    result = []
+    for i in range(count):
+        open_time = start_time + i * interval_ms
+        open_ = price
+        close = price * (1 + rng.gauss(0, 0.001))
+        high = max(open_, close) * (1 + rng.uniform(0, 0.0005))
+        low = min(open_, close) * (1 - rng.uniform(0, 0.0005))
+        volume = rng.uniform(10, 500)
+        result.append([open_time, "%.2f" % open_, "%.2f" % high, "%.2f" % low, "%.2f" % close, "%.3f" % volume,
+                       open_time + interval_ms - 1, "%.5f" % (volume * close), rng.randint(100, 5000),
+                       "%.3f" % (volume / 2), "%.5f" % (volume * close / 2), "0"])
+        price = close
+    return result
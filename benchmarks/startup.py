@@ -0,0 +1,76 @@
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from models import *
+from connectors.binance_futures import BinanceFutureClient
+from benchmarks import fixtures
+from benchmarks.stub_server import StubBinanceServer
+
+# Startup time of BinanceFutureClient against a local stub server that adds a fixed delay per request,
+# compared with the previous startup sequence (one request after the other on fresh connections,
+# then a Contract for every symbol).
+#
+#   python benchmarks/startup.py [round trip in ms] [runs]
+
+logging.getLogger().setLevel(logging.CRITICAL)
+
+
+def sequential_startup(server: StubBinanceServer):
+    exchange_info = requests.get(server.url + "/fapi/v1/exchangeInfo").json()
+    contracts = {c['symbol']: Contract(c) for c in exchange_info['symbols']}
+    account = requests.get(server.url + "/fapi/v2/account").json()
+    balances = {a['asset']: Balance(a) for a in account['assets']}
+    return contracts, balances
+
+
+def client_startup(server: StubBinanceServer, cache_dir: str) -> BinanceFutureClient:
+    # Nothing listens on the websocket URL: the connection thread keeps retrying in the background
+    return BinanceFutureClient("key", "secret", True, base_url=server.url, wss_url="ws://127.0.0.1:9",
+                               cache_dir=cache_dir)
+
+
+def measure(func, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    round_trip = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.08
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    server = StubBinanceServer({"/fapi/v1/exchangeInfo": fixtures.exchange_info(),
+                                "/fapi/v2/account": fixtures.account()}, latency=round_trip)
+    cache_dir = tempfile.mkdtemp()
+
+    def cold():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        client_startup(server, cache_dir)
+
+    try:
+        results = [("sequential, eager contracts", measure(lambda: sequential_startup(server), runs)),
+                   ("client, cold exchangeInfo cache", measure(cold, runs)),
+                   ("client, warm exchangeInfo cache", measure(lambda: client_startup(server, cache_dir), runs))]
+    finally:
+        server.close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("Startup time, %d ms round trip, median of %d runs" % (round_trip * 1000, runs))
+    for name, seconds in results:
+        print("  %-35s %8.1f ms" % (name, seconds * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import json
+import threading
+import time
+import typing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class StubBinanceServer:
+    # Local HTTP server answering Binance REST paths with canned JSON payloads, with an optional artificial
+    # latency per request to mimic the round trip to the exchange. A route is a payload or a callable
+    # route(params) returning either the payload or a (payload, status) tuple.
+    def __init__(self, routes: typing.Dict[str, typing.Union[typing.Dict, typing.List, typing.Callable]],
+                 latency: float = 0.0):
+        self.routes = routes
+        self.latency = latency
+        self.calls = []
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                stub.calls.append((self.command, url.path, params))
+                if stub.latency > 0:
+                    time.sleep(stub.latency)
+
+                route = stub.routes.get(url.path)
+                if route is None:
+                    body, status = {"code": -5000, "msg": "Path %s is invalid" % url.path}, 404
+                else:
+                    body, status = (route(params) if callable(route) else route), 200
+                    if isinstance(body, tuple):  # A callable route can answer (payload, HTTP status)
+                        body, status = body
+
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = "http://127.0.0.1:%s" % self._server.server_port
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,396 @@
+import argparse
+import collections
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import types
+import typing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import *
+from metrics import LatencyHistogram
+from aggregator import CandleAggregator
+from connectors.binance_futures import BinanceFutureClient
+from connectors.order_book import OrderBook
+from benchmarks import fixtures
+
+# Replays generated market data (or recorded frames) through the real connector, model and interface code,
+# with the network replaced by canned payloads and Tk by stand-in widgets, and compares each case with a
+# stored baseline. Each case is run three times: once for throughput (best of THROUGHPUT_RUNS), once timing
+# every call for p50/p99, and once under tracemalloc for the peak memory.
+#
+#   python benchmarks/suite.py                  compare with benchmarks/baseline.json
+#   python benchmarks/suite.py --save-baseline  store the current results as the baseline
+#   python benchmarks/suite.py --check          exit with status 1 if a case regressed
+#
+# Timings are stored relative to a reference case measured in the same run, plain json and dict work that
+# does not depend on the code under test, so a baseline saved on one machine holds on a slower or busier one.
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+REFERENCE_CASE = "reference json.loads + dict"
+THROUGHPUT_RUNS = 3
+THROUGHPUT_TOLERANCE = 0.25  # A case regressed if it is more than 25% slower than the baseline...
+P99_TOLERANCE = 1.0  # ...or if its p99 is more than twice as high, and P99_SLACK_US above it
+P99_SLACK_US = 5.0
+MEMORY_TOLERANCE = 0.20
+
+
+class _CannedResponse:
+    # requests.Response stand-in
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+        self.headers = dict()
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class _CannedTransport:
+    # HttpTransport stand-in answering every request with the payload of its endpoint, 404 if there is none
+    def __init__(self, payloads: typing.Dict[str, str]):
+        self._payloads = payloads
+
+    def request(self, method: str, endpoint: str, params: typing.Dict) -> _CannedResponse:
+        payload = self._payloads.get(endpoint)
+        if payload is None:
+            return _CannedResponse(404, '{"code":-1,"msg":"No canned response"}')
+        return _CannedResponse(200, payload)
+
+    def latency_snapshot(self) -> typing.Dict[str, typing.Dict[str, float]]:
+        return dict()
+
+
+class _OfflineShard:
+    # Websocket connection stand-in for the SubscriptionManager: subscriptions are accepted, nothing is received
+    def __init__(self, manager, shard_id: int):
+        self.streams = set()
+
+    def send(self, method: str, streams: typing.List[str]):
+        pass
+
+    def call_soon(self, callback: typing.Callable):
+        callback()
+
+    def close(self):
+        pass
+
+
+def offline_client(payloads: typing.Optional[typing.Dict[str, str]] = None) -> BinanceFutureClient:
+    # Client built by its constructor but without any connection: REST responses are the `payloads`
+    # (endpoint -> JSON text), no websocket is opened and the user data stream is not started.
+    canned = {"/fapi/v1/exchangeInfo": json.dumps(fixtures.exchange_info(0)),
+              "/fapi/v2/account": json.dumps(fixtures.account())}
+    canned.update(payloads or dict())
+    return BinanceFutureClient("", "", True, cache_dir=None, transport=_CannedTransport(canned),
+                               shard_factory=_OfflineShard, user_stream=False)
+
+
+class _FakeLabel:
+    # tk.Label / tk.Scrollbar stand-in
+    def config(self, **kwargs):
+        pass
+
+    def set(self, first, last):
+        pass
+
+
+def _fake_table(columns: typing.List, visible_rows: int, sort_column: typing.Optional[int] = None,
+                sort_reverse: bool = False):
+    # VirtualTable with its model but stand-in widgets
+    from interface.table_component import VirtualTable
+    table = VirtualTable.__new__(VirtualTable)
+    table._init_model(columns, visible_rows, None, sort_column, sort_reverse)
+    table._cells = [[_FakeLabel() for _ in columns] for _ in range(visible_rows)]
+    table._scrollbar = _FakeLabel()
+    return table
+
+
+class _FakeText:
+    # tk.Text stand-in keeping the lines, enough for Logging.add_logs
+    def __init__(self):
+        self.lines = []
+
+    def configure(self, **kwargs):
+        pass
+
+    def insert(self, index, text):
+        self.lines[0:0] = text.split("\n")[:-1]
+
+    def delete(self, start, end):
+        del self.lines[int(start.split(".")[0]) - 1:]
+
+
+class Case:
+    # A benchmark: setup() returns the state passed to each run(state, item) call over the items
+    def __init__(self, name: str, items: typing.List, setup: typing.Callable, run: typing.Callable):
+        self.name = name
+        self.items = items
+        self.setup = setup
+        self.run = run
+
+    def measure(self) -> typing.Dict[str, float]:
+        run = self.run
+
+        elapsed = None
+        for _ in range(THROUGHPUT_RUNS):
+            state = self.setup()
+            gc.collect()
+            start = time.perf_counter()
+            for item in self.items:
+                run(state, item)
+            run_time = time.perf_counter() - start
+            if elapsed is None or run_time < elapsed:
+                elapsed = run_time
+
+        state = self.setup()
+        histogram = LatencyHistogram()
+        clock = time.perf_counter
+        for item in self.items:
+            call_start = clock()
+            run(state, item)
+            histogram.record(clock() - call_start)
+
+        state = None
+        gc.collect()
+        tracemalloc.start()
+        state = self.setup()
+        for item in self.items:
+            run(state, item)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {"throughput": len(self.items) / elapsed, "p50_us": histogram.percentile(50) * 1e6,
+                "p99_us": histogram.percentile(99) * 1e6, "peak_kb": peak / 1024}
+
+
+def reference_case(book_ticker_frames: typing.List[str]) -> Case:
+    def run(table, frame):
+        data = json.loads(frame)
+        table[data['s']] = (float(data['b']), float(data['a']), data['T'])
+
+    return Case(REFERENCE_CASE, book_ticker_frames[:100_000], dict, run)
+
+
+def market_data_cases(book_ticker_frames: typing.List[str]) -> typing.List[Case]:
+    cases = []
+
+    cases.append(Case("on_message bookTicker", book_ticker_frames, offline_client,
+                      lambda client, frame: client._on_message(None, frame)))
+
+    agg_trades = fixtures.agg_trade_messages(200_000)
+
+    def agg_trade_setup():
+        client = offline_client()
+        for symbol in fixtures.symbols(20):
+            client.aggregators[symbol] = aggregator = CandleAggregator(symbol)
+            for timeframe in ("1m", "15m", "1h"):
+                aggregator.add_listener(timeframe, lambda tf, candles: None, lambda tf, price, size, ts: None)
+        return client
+
+    cases.append(Case("on_message aggTrade", agg_trades, agg_trade_setup,
+                      lambda client, frame: client._on_message(None, frame)))
+
+    depth = fixtures.depth_messages(50_000)
+    contract = Contract(fixtures.exchange_info(1)['symbols'][0])
+
+    def depth_setup():
+        client = offline_client()
+        order_book = OrderBook(contract)
+        order_book.load_snapshot(fixtures.depth_snapshot(contract.symbol))
+        client.order_books[contract.symbol] = order_book
+        return client
+
+    cases.append(Case("on_message depthUpdate", depth, depth_setup,
+                      lambda client, frame: client._on_message(None, frame)))
+    return cases
+
+
+def rest_cases() -> typing.List[Case]:
+    cases = []
+    klines = json.dumps(fixtures.klines(1500))
+    exchange_info = json.dumps(fixtures.exchange_info(300))
+    client = offline_client({"/fapi/v1/klines": klines, "/fapi/v1/exchangeInfo": exchange_info})
+    contract = Contract(fixtures.exchange_info(1)['symbols'][0])
+
+    cases.append(Case("get_historical_candles 1500 klines", [None] * 200, lambda: client,
+                      lambda c, _: c.get_historical_candles(contract, "1m", limit=1500)))
+
+    def contracts(c, _):
+        result = c.get_contracts(use_cache=False)
+        for symbol in result:
+            result[symbol]
+
+    cases.append(Case("get_contracts 300 symbols + Contract", [None] * 50, lambda: client, contracts))
+
+    raw_candles = fixtures.klines(1000)
+    cases.append(Case("Candle construction", raw_candles, lambda: None, lambda _, kline: Candle(kline)))
+    return cases
+
+
+def ui_cases(book_ticker_frames: typing.List[str]) -> typing.List[Case]:
+    # The interface modules import tkmacosx for their buttons; only the pure Python parts are exercised here
+    sys.modules.setdefault("tkmacosx", types.SimpleNamespace(Button=object))
+    try:
+        from interface.watchlist_component import WatchList, _WatchRow, WATCHLIST_COLUMNS, WATCHLIST_ROWS
+        from interface.trades_component import TradesWatch, TRADES_COLUMNS, TRADES_ROWS
+        from interface.logging_component import Logging
+    except ImportError as e:
+        print("UI cases skipped: %s" % e)
+        return []
+
+    info = fixtures.exchange_info(300)
+    watched = [Contract(c) for c in info['symbols'][:50]]
+    client = offline_client()
+    for frame in book_ticker_frames[:5000]:
+        client._on_message(None, frame)
+    updates = book_ticker_frames[:20000]
+
+    def watchlist_setup():
+        watchlist = WatchList.__new__(WatchList)
+        watchlist._prices_version = -1
+        watchlist._table = _fake_table(WATCHLIST_COLUMNS, WATCHLIST_ROWS)
+        for contract in watched:
+            watchlist._table.upsert(contract.symbol, _WatchRow(contract))
+        return watchlist
+
+    def refresh(watchlist, chunk):
+        # One UI tick: the prices received since the previous tick, then the refresh
+        for frame in chunk:
+            client._on_message(None, frame)
+        watchlist.refresh(client.prices)
+
+    chunks = [updates[i:i + 100] for i in range(0, len(updates), 100)]
+
+    def logging_setup():
+        frame = Logging.__new__(Logging)
+        frame.logging_text = _FakeText()
+        return frame
+
+    batches = [["Order %d placed on BTCUSDT" % (i * 5 + j) for j in range(5)] for i in range(2000)]
+
+    # A day of trading: 20 trades open at a time, each repriced on every tick until it closes
+    strategy = types.SimpleNamespace(strat_name="Technical")
+    trade_ticks = []
+    open_trades = []
+    for tick in range(5000):
+        if tick % 5 == 0:
+            contract = watched[tick % len(watched)]
+            open_trades.append(Trade(1_700_000_000_000 + tick * 1000, contract, strategy, "BUY", 0.5, 100.0,
+                                     "%s-B-%d" % (contract.symbol, tick)))
+        if len(open_trades) > 20:
+            open_trades[0].status = "closed"
+            trade_ticks.append(open_trades[:])
+            del open_trades[0]
+        else:
+            trade_ticks.append(open_trades[:])
+
+    def trades_setup():
+        trades_watch = TradesWatch.__new__(TradesWatch)
+        trades_watch._table = _fake_table(TRADES_COLUMNS, TRADES_ROWS, 0, True)
+        trades_watch._closed = collections.deque()
+        trades_watch._closed_keys = set()
+        return trades_watch
+
+    def trades_refresh(trades_watch, trades):
+        for trade in trades:
+            trade.pnl += 0.01
+        trades_watch.refresh(trades)
+
+    return [Case("WatchList.refresh, 50 symbols, 100 frames/tick", chunks, watchlist_setup, refresh),
+            Case("TradesWatch.refresh, 1000 trades, 20 open", trade_ticks, trades_setup, trades_refresh),
+            Case("Logging.add_logs, 5 messages/tick", batches, logging_setup, lambda f, batch: f.add_logs(batch))]
+
+
+def relative(result: typing.Dict[str, float], reference: typing.Dict[str, float]) -> typing.Dict[str, float]:
+    # Throughput as a multiple of the reference case's, latencies in reference calls (mean duration of one)
+    call_us = 1e6 / reference["throughput"]
+    return {"throughput": result["throughput"] / reference["throughput"], "p50_calls": result["p50_us"] / call_us,
+            "p99_calls": result["p99_us"] / call_us, "peak_kb": result["peak_kb"]}
+
+
+def expected(stored: typing.Dict[str, float], reference: typing.Dict[str, float]) -> typing.Dict[str, float]:
+    # Baseline figures of a case in the units of this run
+    call_us = 1e6 / reference["throughput"]
+    return {"throughput": stored["throughput"] * reference["throughput"], "p99_us": stored["p99_calls"] * call_us,
+            "peak_kb": stored["peak_kb"]}
+
+
+def compare(results: typing.Dict[str, typing.Dict[str, float]], baseline: typing.Dict[str, typing.Dict[str, float]]) \
+        -> typing.List[str]:
+    regressions = []
+    reference = results[REFERENCE_CASE]
+    for name, result in results.items():
+        if name == REFERENCE_CASE or name not in baseline:
+            continue
+        base = expected(baseline[name], reference)
+        if result["throughput"] < base["throughput"] * (1 - THROUGHPUT_TOLERANCE):
+            regressions.append("%s: throughput %.0f/s, baseline %.0f/s" % (name, result["throughput"],
+                                                                         base["throughput"]))
+        if result["p99_us"] > base["p99_us"] * (1 + P99_TOLERANCE) + P99_SLACK_US:
+            regressions.append("%s: p99 %.1f us, baseline %.1f us" % (name, result["p99_us"], base["p99_us"]))
+        if result["peak_kb"] > base["peak_kb"] * (1 + MEMORY_TOLERANCE) + 64:
+            regressions.append("%s: peak memory %.0f KiB, baseline %.0f KiB" % (name, result["peak_kb"],
+                                                                              base["peak_kb"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", help="file with one recorded bookTicker frame per line")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--filter", default="", help="only run the cases whose name contains this text")
+    args = parser.parse_args()
+
+    if args.frames:
+        with open(args.frames) as f:
+            book_ticker_frames = [line.strip() for line in f if line.strip()]
+    else:
+        book_ticker_frames = fixtures.book_ticker_messages(200_000)
+
+    baseline = dict()
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    # The reference case always runs first, whatever the filter
+    cases = market_data_cases(book_ticker_frames) + rest_cases() + ui_cases(book_ticker_frames)
+    cases = [reference_case(book_ticker_frames)] + [case for case in cases if args.filter in case.name]
+    results = dict()
+    print("%-45s %12s %9s %9s %10s %8s" % ("case", "per second", "p50 us", "p99 us", "peak KiB", "vs base"))
+    for case in cases:
+        result = case.measure()
+        results[case.name] = result
+        change = "new"
+        if case.name == REFERENCE_CASE:
+            change = ""
+        elif case.name in baseline:
+            base = expected(baseline[case.name], results[REFERENCE_CASE])
+            change = "%+7.1f%%" % ((result["throughput"] / base["throughput"] - 1) * 100)
+        print("%-45s %12.0f %9.1f %9.1f %10.0f %8s" % (case.name, result["throughput"], result["p50_us"],
+                                                       result["p99_us"], result["peak_kb"], change))
+
+    if args.save_baseline:
+        reference = results[REFERENCE_CASE]
+        for name, result in results.items():
+            if name != REFERENCE_CASE:
+                baseline[name] = {key: round(value, 4) for key, value in relative(result, reference).items()}
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print("Baseline saved to %s" % BASELINE_PATH)
+        return
+
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        print("REGRESSION " + regression)
+    if args.check and len(regressions) > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
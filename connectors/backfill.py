@@ -0,0 +1,159 @@
+import logging
+import os
+import struct
+import threading
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+from models import *
+
+logger = logging.getLogger()
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+}
+
+# One cached bar: open time (int64) followed by open, high, low, close, volume (float64), little endian.
+_RECORD = struct.Struct("<q5d")
+
+KLINES_PAGE_LIMIT = 1000
+
+
+class CandleCache:
+    # Append-only binary cache of closed candles, one file per symbol and interval.
+    def __init__(self, directory: str = "cache"):
+        self._directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self._directory, f"{symbol}_{interval}.bin")
+
+    def load(self, symbol: str, interval: str) -> CandleSeries:
+        candles = CandleSeries()
+        path = self._path(symbol, interval)
+        if not os.path.exists(path):
+            return candles
+
+        with open(path, "rb") as f:
+            raw = f.read()
+
+        # Ignore a partially written trailing record, e.g. after a crash mid-write
+        raw = raw[:len(raw) - len(raw) % _RECORD.size]
+        for row in _RECORD.iter_unpack(raw):
+            candles.append(*row)
+        return candles
+
+    @staticmethod
+    def _pack(candles: CandleSeries) -> bytes:
+        return b"".join(_RECORD.pack(c.timestamp, c.open, c.high, c.low, c.close, c.volume) for c in candles)
+
+    def append(self, symbol: str, interval: str, candles: CandleSeries):
+        if len(candles) == 0:
+            return
+        with self._lock:
+            with open(self._path(symbol, interval), "ab") as f:
+                f.write(self._pack(candles))
+
+    def replace(self, symbol: str, interval: str, candles: CandleSeries):
+        # Rewrites the whole file, e.g. when older candles are added in front of the cached ones
+        path = self._path(symbol, interval)
+        with self._lock:
+            with open(path + ".tmp", "wb") as f:
+                f.write(self._pack(candles))
+            os.replace(path + ".tmp", path)
+
+
+class KlineBackfill:
+    # Pages through /fapi/v1/klines beyond the 1000 candles limit of a single call and keeps the
+    # result in a CandleCache, so that later runs only download the candles missing at either end.
+    # Request weight is accounted for by the client's shared RateLimiter, which gives way to orders.
+    def __init__(self, client, cache: CandleCache, max_workers: int = 4):
+        self._client = client
+        self._cache = cache
+        self._max_workers = max_workers
+
+    def _fetch_page(self, contract: Contract, interval: str, start_time: typing.Optional[int],
+                    end_time: typing.Optional[int]) -> CandleSeries:
+        return self._client.get_historical_candles(contract, interval, start_time=start_time, end_time=end_time,
+                                                   limit=KLINES_PAGE_LIMIT)
+
+    def _fetch_backwards(self, contract: Contract, interval: str, start_time: int, end_time: int) -> CandleSeries:
+        # Only endTime is sent: with both bounds set Binance returns the oldest candles of the range,
+        # not the most recent ones before endTime
+        pages = []
+        while end_time >= start_time:
+            page = self._fetch_page(contract, interval, None, end_time)
+            if len(page) == 0:
+                break
+            pages.append(page)
+            end_time = page[0].timestamp - 1
+            if len(page) < KLINES_PAGE_LIMIT:
+                break
+
+        candles = CandleSeries()
+        for page in reversed(pages):
+            candles.extend(page)
+        return candles
+
+    def _fetch_forwards(self, contract: Contract, interval: str, start_time: int) -> CandleSeries:
+        candles = CandleSeries()
+        while True:
+            page = self._fetch_page(contract, interval, start_time, None)
+            if len(page) == 0:
+                break
+            candles.extend(page)
+            start_time = page.last_timestamp() + 1
+            if len(page) < KLINES_PAGE_LIMIT:
+                break
+        return candles
+
+    def backfill(self, contract: Contract, interval: str, start_time: int) -> CandleSeries:
+        # Returns every candle from start_time up to now, the last one possibly still open.
+        interval_ms = INTERVAL_MS[interval]
+        now = int(time.time() * 1000)
+
+        candles = self._cache.load(contract.symbol, interval)
+        cached = len(candles)
+        last_cached = candles.last_timestamp()
+
+        if last_cached is None:
+            fetched = self._fetch_backwards(contract, interval, start_time, now)
+        else:
+            first_cached = candles[0].timestamp
+            if start_time < first_cached:
+                # The history asked for starts before the cache: the older candles go in front of it
+                older = self._fetch_backwards(contract, interval, start_time, first_cached - 1)
+                if len(older) > 0:
+                    older.extend(candles)
+                    candles = older
+                    self._cache.replace(contract.symbol, interval, candles)
+            fetched = self._fetch_forwards(contract, interval, last_cached + 1)
+
+        # Only closed candles go to the cache, the open one would otherwise be frozen in it
+        closed = fetched.between(0, now - interval_ms + 1)
+        self._cache.append(contract.symbol, interval, closed)
+
+        candles.extend(fetched)
+        logger.info("Backfilled %s %s candles for %s (%s from cache)", len(candles), interval, contract.symbol,
+                    cached)
+        return candles.between(start_time, now + 1)
+
+    def backfill_many(self, contracts: typing.List[Contract], interval: str,
+                      start_time: int) -> typing.Dict[str, CandleSeries]:
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            futures = {c.symbol: executor.submit(self.backfill, c, interval, start_time) for c in contracts}
+
+        results = dict()
+        for symbol, future in futures.items():
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                logger.error("Error while backfilling %s %s candles: %s", symbol, interval, e)
+        return results
@@ -1,20 +1,39 @@
+import collections
 import logging
-import requests
 import time
 import typing
 import hmac
 import hashlib
 from urllib.parse import urlencode
-import websocket
-import threading
 import json
+import threading
+import os
+from concurrent.futures import ThreadPoolExecutor
 from models import *
+from aggregator import CandleAggregator
+from connectors.transport import HttpTransport
+from connectors.rate_limiter import get_rate_limiter
+from connectors.price_table import PriceTable, parse_book_ticker
+from connectors.subscriptions import SubscriptionManager
+from connectors.order_book import OrderBook
+from connectors.user_stream import AccountStore, UserDataStream
+from connectors.recorder import Recorder
+from metrics import metrics
 
 # Initialize logger for logging events
 logger = logging.getLogger()
 
+EXCHANGE_INFO_TTL = 24 * 3600  # Seconds a cached exchangeInfo payload is used before downloading it again
+MAX_PENDING_LOGS = 1000
+ORDER_BOOK_RETRY_DELAY = 1.0  # Seconds before reloading a depth snapshot that failed, doubled on each failure
+ORDER_BOOK_MAX_RETRY_DELAY = 60.0
+ORDER_BOOK_MAX_ATTEMPTS = 10  # Snapshot requests before giving up on a book, e.g. for a delisted symbol
+
 class BinanceFutureClient:
-    def __init__(self, public_key: str, secret_key: str, testnet: bool):
+    def __init__(self, public_key: str, secret_key: str, testnet: bool, base_url: typing.Optional[str] = None,
+                 wss_url: typing.Optional[str] = None, cache_dir: typing.Optional[str] = "cache",
+                 recorder: typing.Optional[Recorder] = None, transport=None,
+                 shard_factory: typing.Optional[typing.Callable] = None, user_stream: bool = True):
         # Set base URL based on testnet flag
         if testnet:
             self._base_url = "https://testnet.binancefuture.com"  # Testnet API endpoint
@@ -23,32 +42,105 @@ class BinanceFutureClient:
             self._base_url = "https://fapi.binance.com"  # Production API endpoint
             self._wss_url = "wss://fstream.binance.com/ws"
 
+        # Overrides, e.g. to run against a local stub server
+        if base_url is not None:
+            self._base_url = base_url
+        if wss_url is not None:
+            self._wss_url = wss_url
+
         self._public_key = public_key
         self._secret_key = secret_key
 
         self._headers = {'X-MBX-APIKEY': self._public_key}
-        
-        self.contracts = self.get_contracts()
-        self.balances = self.get_balance()
+        # Anything with the request() and latency_snapshot() methods of HttpTransport will do, e.g. canned
+        # responses in the benchmarks
+        if transport is None:
+            transport = HttpTransport(self._base_url, self._headers, get_rate_limiter(self._base_url))
+        self._transport = transport
 
-        # Dictionary to store latest bid-ask prices for symbols
-        self.prices = dict()
-        
-        self.logs = []
+        # No disk cache of the exchange information if cache_dir is None
+        self._exchange_info_path = None
+        if cache_dir is not None:
+            self._exchange_info_path = os.path.join(cache_dir, "exchange_info_" + ("testnet" if testnet else "live")
+                                                    + ".json")
+
+        # Optional log of everything received, see connectors.recorder
+        self._recorder = recorder
+
+        self._init_state()
+
+        # Websocket connections are opened on the first subscription, each handling up to 200 streams.
+        # shard_factory replaces the websocket connections, see SubscriptionManager
+        self._subscriptions = SubscriptionManager(self._wss_url, self._on_message, shard_factory=shard_factory)
+
+        # Contracts and balances are fetched at the same time. Only the contracts are waited for,
+        # balances are filled in whenever their request returns.
 
-        self._ws_id = 1
-        self.ws = None
+        startup = ThreadPoolExecutor(max_workers=2)
+        contracts = startup.submit(self.get_contracts)
+        startup.submit(self._load_account, user_stream).add_done_callback(self._on_account_loaded)
+        startup.shutdown(wait=False)
 
-        t = threading.Thread(target=self._start_ws)
-        t.start()
+        self.contracts = contracts.result()
         
         # Log initialization of Binance Futures client
         logger.info("Binance Futures Client Successfully Initialized")
 
+    def _init_state(self):
+        # Everything that does not need a connection, shared with the ReplayClient
+        # Latest bid-ask prices for symbols, written by the websocket thread and read by the UI
+        self.prices = PriceTable()
+
+        # Candle aggregators fed by the aggTrade stream, by symbol
+        self.aggregators = dict()
+
+        # Local order books fed by the depth diff stream, by symbol
+        self.order_books = dict()
+        # Symbols whose snapshot is being loaded -> whether the book was reset again meanwhile
+        self._book_loaders = dict()
+        self._book_loaders_lock = threading.Lock()
+
+        # Messages for the interface's Logging frame, see drain_logs()
+        self.logs = collections.deque(maxlen=MAX_PENDING_LOGS)
+
+        self.contracts = dict()
+
+        # Orders, positions and balances pushed by the user data stream, balances is the store's own dictionary
+        self.account = AccountStore()
+        self.balances = self.account.balances
+        self._user_stream = UserDataStream(self, self.account)
+
+        # Probes of _on_message, created on first use (see metrics.metrics)
+        self._stage_timers = dict()
+        self._message_counters = dict()
+
+    def _load_account(self, start_user_stream: bool = True):
+        account_data = self.get_account()
+        if account_data is not None:
+            self.account.load_account(account_data)
+        if start_user_stream:
+            self._user_stream.start()
+
+    def _on_account_loaded(self, future):
+        # Nothing waits for the account, so its errors (authentication, malformed payload...) are reported here
+        error = future.exception()
+        if error is not None:
+            logger.error("Error while loading the Binance account: %s", error)
+            self.logs.append(f"Binance account could not be loaded: {error}")
 
     def _add_logs(self, msg: str):
         logger.info("%s", msg)
-        self.logs.append({"log": msg, "displayed": False})
+        self.logs.append(msg)
+
+    def drain_logs(self) -> typing.List[str]:
+        # Messages added since the previous call, oldest first. Only the newest MAX_PENDING_LOGS are kept
+        # if nobody drains them.
+        messages = []
+        try:
+            while True:
+                messages.append(self.logs.popleft())
+        except IndexError:
+            return messages
         
     """
     The method below takes the request data as input and generates a cryptographic
@@ -68,61 +160,89 @@ class BinanceFutureClient:
     
     def _make_request(self, method: str, endpoint: str, data: typing.Dict):
         # Make HTTP request to Binance Futures API
-        if method == "GET":
-            try:
-                response = requests.get(self._base_url + endpoint, params=data, headers=self._headers)
-            except Exception as e:
-                logger.error("Connection Error While Making %s request to %s: %s", method, endpoint, e)
-                return None
-        elif method == "POST":
-            try:
-                response = requests.post(self._base_url + endpoint, params=data, headers=self._headers)
-            except Exception as e:
-                logger.error("Connection Error While Making %s request to %s: %s", method, endpoint, e)
-                return None
-        elif method == "DELETE":
-            try:
-                response = requests.delete(self._base_url + endpoint, params=data, headers=self._headers)
-            except Exception as e:
-                logger.error("Connection Error While Making %s request to %s: %s", method, endpoint, e)
-                return None
-        else:
+        if method not in ("GET", "POST", "PUT", "DELETE"):
             raise ValueError("Unsupported HTTP method")
+
+        try:
+            response = self._transport.request(method, endpoint, data)
+        except Exception as e:
+            logger.error("Connection Error While Making %s request to %s: %s", method, endpoint, e)
+            return None
         
         # Check if request was successful
         if response.status_code == 200:
+            if self._recorder is not None:
+                self._recorder.record_response(method, endpoint, data, response.text)
             return response.json()  # Return JSON response
         else:
             # Log error if request fails
             logger.error("Error while making %s request to %s: %s (HTTP status code %s)", 
-                            method, endpoint, response.json(), response.status_code)
+                            method, endpoint, response.text, response.status_code)
             return None
+
+    def get_latency_stats(self) -> typing.Dict[str, typing.Dict[str, float]]:
+        # Round trip time histograms of the REST calls, by endpoint
+        return self._transport.latency_snapshot()
         
-    def get_contracts(self) -> typing.Dict[str, Contract]:
-        # Retrieve information about available contracts on Binance Futures
-        exchange_info = self._make_request("GET", "/fapi/v1/exchangeInfo", dict())
-        contracts = dict()
-        if exchange_info is not None:
-            # Extract contract data from API response
-            for contract_data in exchange_info['symbols']:
-                contracts[contract_data['symbol']] = Contract(contract_data)
-        return contracts
+    def _load_cached_exchange_info(self) -> typing.Optional[typing.List[typing.Dict]]:
+        if self._exchange_info_path is None:
+            return None
+        try:
+            if time.time() - os.path.getmtime(self._exchange_info_path) > EXCHANGE_INFO_TTL:
+                return None
+            with open(self._exchange_info_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_exchange_info(self, symbols_info: typing.List[typing.Dict]):
+        if self._exchange_info_path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self._exchange_info_path), exist_ok=True)
+            with open(self._exchange_info_path + ".tmp", "w") as f:
+                json.dump(symbols_info, f)
+            os.replace(self._exchange_info_path + ".tmp", self._exchange_info_path)
+        except OSError as e:
+            logger.warning("Could not cache exchange information: %s", e)
+
+    def get_contracts(self, use_cache: bool = True) -> typing.Mapping[str, Contract]:
+        # Retrieve information about available contracts on Binance Futures, from the disk cache if it is recent
+        symbols_info = self._load_cached_exchange_info() if use_cache else None
+
+        if symbols_info is None:
+            exchange_info = self._make_request("GET", "/fapi/v1/exchangeInfo", dict())
+            if exchange_info is None:
+                return LazyContracts([])
+            symbols_info = exchange_info['symbols']
+            self._save_exchange_info(symbols_info)
+        elif self._recorder is not None:
+            # A replay must see the contracts even though they were not downloaded
+            self._recorder.record_response("GET", "/fapi/v1/exchangeInfo", dict(),
+                                           json.dumps({'symbols': symbols_info}))
+
+        # Contract objects are only built for the symbols actually looked up
+        return LazyContracts(symbols_info)
     
-    def get_historical_candles(self, contract: Contract, interval: str) -> typing.List[Candle]:
+    def get_historical_candles(self, contract: Contract, interval: str, start_time: typing.Optional[int] = None,
+                               end_time: typing.Optional[int] = None, limit: int = 1000) -> CandleSeries:
         # Retrieve historical candlestick data for a symbol and interval
         data = dict()
         data['symbol'] = contract.symbol
         data['interval'] = interval
-        data['limit'] = 1000  # Limit the number of returned candles
+        data['limit'] = limit  # Limit the number of returned candles
+        if start_time is not None:
+            data['startTime'] = start_time
+        if end_time is not None:
+            data['endTime'] = end_time
 
         raw_candles = self._make_request("GET", "/fapi/v1/klines", data)
 
-        candles = []
+        candles = CandleSeries()
 
         if raw_candles is not None:
-            # Format raw candlestick data into a list of tuples
-            for c in raw_candles:
-                candles.append(Candle(c))
+            # Store the raw candlestick data column by column
+            candles.extend_klines(raw_candles)
         return candles
     
     def get_bid_ask(self, contract: Contract) -> typing.Dict[str, float]:
@@ -132,46 +252,66 @@ class BinanceFutureClient:
         ob_data = self._make_request("GET", "/fapi/v1/ticker/bookTicker", data)
 
         if ob_data is not None:
-            if contract.symbol not in self.prices:
-                # Initialize bid-ask prices if not available
-                self.prices[contract.symbol] = {
-                    'bid': float(ob_data['bidPrice']),  # Latest bid price
-                    'ask': float(ob_data['askPrice'])   # Latest ask price
-                }
-            else:
-                # Update latest bid-ask prices
-                self.prices[contract.symbol]['bid'] = float(ob_data['bidPrice'])
-                self.prices[contract.symbol]['ask'] = float(ob_data['askPrice'])
+            bid = float(ob_data['bidPrice'])
+            ask = float(ob_data['askPrice'])
+            update_time = ob_data.get('time', 0)
 
-            return self.prices[contract.symbol]
+            def seed():
+                # On the thread writing the symbol's prices, unless the stream already has a newer price
+                snapshot = self.prices.snapshot(contract.symbol)
+                if snapshot is None or snapshot[2] < update_time:
+                    self.prices.update(contract.symbol, bid, ask, update_time)
 
+            # The price table is only written by the bookTicker stream of the symbol, if it has one
+            self._call_on_stream_thread(contract.symbol.lower() + "@bookTicker", seed)
+            return {'bid': bid, 'ask': ask}
 
-    # Get current balances from account.
-    def get_balance(self) -> typing.Dict[str, Balance]:
+    def _call_on_stream_thread(self, stream: str, callback: typing.Callable) -> bool:
+        return self._subscriptions.call_soon(stream, callback)
+
+
+    def get_order_book_snapshot(self, contract: Contract, limit: int = 1000) -> typing.Optional[typing.Dict]:
+        data = dict()
+        data['symbol'] = contract.symbol
+        data['limit'] = limit
+        return self._make_request("GET", "/fapi/v1/depth", data)
+
+    def get_account(self) -> typing.Optional[typing.Dict]:
         data = dict()
         data['timestamp'] = int(time.time() * 1000)
         data["signature"] = self._generate_signature(data)
+        return self._make_request("GET", "/fapi/v2/account", data)
 
+    # Get current balances from account. self.balances is kept up to date by the user data stream instead.
+    def get_balance(self) -> typing.Dict[str, Balance]:
         balances = dict()
 
-        account_data = self._make_request("GET", "/fapi/v2/account", data)
+        account_data = self.get_account()
 
         if account_data is not None:
             for a in account_data["assets"]:
                 balances[a['asset']] = Balance(a)
         return balances
 
-    # Placing order
-    def place_order(self, contract: Contract, side: str, quantity: float, order_type: str, price=None, timeinforce=None) -> OrderStatus:
+    def _order_params(self, contract: Contract, side: str, quantity: float, order_type: str, price=None,
+                      timeinforce=None, client_order_id=None) -> typing.Dict:
         data = dict()
         data['symbol'] = contract.symbol
         data['side'] = side
-        data['quantity'] = quantity
+        data['quantity'] = contract.format_quantity(quantity)
         data['type'] = order_type
         if price is not None:
-            data['price'] = price
+            data['price'] = contract.format_price(price)
         if timeinforce is not None:
-            data['timeinforce'] = timeinforce
+            data['timeInForce'] = timeinforce
+        if client_order_id is not None:
+            data['newClientOrderId'] = client_order_id
+        return data
+
+    # Placing order
+    def place_order(self, contract: Contract, side: str, quantity: float, order_type: str, price=None, timeinforce=None,
+                    client_order_id=None) -> OrderStatus:
+        data = self._order_params(contract, side, quantity, order_type, price, timeinforce, client_order_id)
         data['timestamp'] = int(time.time() * 1000)
         data['signature'] = self._generate_signature(data)
 
@@ -182,6 +322,28 @@ class BinanceFutureClient:
         
         return order_status
 
+    # Placing up to 5 orders in one request. Each order is a dictionary from _order_params, the result has one
+    # entry per order, None for the orders Binance rejected.
+    def place_batch_orders(self, orders: typing.List[typing.Dict]) -> typing.List[typing.Optional[OrderStatus]]:
+        data = dict()
+        data['batchOrders'] = json.dumps(orders, separators=(",", ":"))
+        data['timestamp'] = int(time.time() * 1000)
+        data['signature'] = self._generate_signature(data)
+
+        response = self._make_request("POST", "/fapi/v1/batchOrders", data)
+        if response is None:
+            return [None] * len(orders)
+
+        results = []
+        for order, result in zip(orders, response):
+            if 'orderId' in result:
+                results.append(OrderStatus(result))
+            else:
+                logger.error("Batch order %s %s %s rejected: %s", order['side'], order['quantity'], order['symbol'],
+                             result.get('msg'))
+                results.append(None)
+        return results
+
 
     # Cancelling order
     def cancel_order(self, contract: Contract, order_id: int)-> OrderStatus:
@@ -199,76 +361,159 @@ class BinanceFutureClient:
 
         return order_status
 
-    # Get order status
+    # Get order status, from the user data stream if the order has had an update since the client started
     def get_order_status(self, contract: Contract, order_id: int)-> OrderStatus:
+        order_status = self.account.get_order(order_id)
+        if order_status is not None:
+            return order_status
+
         data = dict()
         data['timestamp'] = int(time.time() * 1000)
         data['symbol'] = contract.symbol
-        data['orderID'] = order_id
-        data['signature'] = self.g_enerate_signature(data)
+        data['orderId'] = order_id
+        data['signature'] = self._generate_signature(data)
         order_status = self._make_request("GET", "/fapi/v1/order", data)
         if order_status is not None:
             order_status = OrderStatus(order_status)
         return order_status
 
-    def _start_ws(self):
-        self.ws = websocket.WebSocketApp(self._wss_url, on_open=self._on_open, on_close=self._on_close, on_error=self._on_error, on_message=self._on_message)
+    def subscribe_candles(self, contract: Contract, timeframe: str, on_new_candle: typing.Callable,
+                          on_same_candle: typing.Callable) -> CandleAggregator:
+        # Live candles built from the aggTrade stream, see CandleAggregator for the callbacks.
+        if contract.symbol not in self.aggregators:
+            self.aggregators[contract.symbol] = CandleAggregator(contract.symbol)
+            self.subscribe_channel([contract], "aggTrade")
+        aggregator = self.aggregators[contract.symbol]
+        aggregator.add_listener(timeframe, on_new_candle, on_same_candle)
+        return aggregator
+
+    def unsubscribe_candles(self, contract: Contract, timeframe: str, on_new_candle: typing.Callable,
+                            on_same_candle: typing.Callable):
+        aggregator = self.aggregators.get(contract.symbol)
+        if aggregator is None:
+            return
+        aggregator.remove_listener(timeframe, on_new_candle, on_same_candle)
+        if not aggregator.has_listeners():
+            del self.aggregators[contract.symbol]
+            self.unsubscribe_channel([contract], "aggTrade")
+
+    def subscribe_order_book(self, contract: Contract) -> OrderBook:
+        # The diff stream is subscribed first so that no update is missed between the snapshot and the stream,
+        # the snapshot is then loaded in the background.
+        if contract.symbol not in self.order_books:
+            self.order_books[contract.symbol] = OrderBook(contract)
+            self.subscribe_channel([contract], "depth@100ms")
+            self._resync_order_book(contract.symbol)
+        return self.order_books[contract.symbol]
+
+    def unsubscribe_order_book(self, contract: Contract):
+        if self.order_books.pop(contract.symbol, None) is not None:
+            self.unsubscribe_channel([contract], "depth@100ms")
+
+    def _resync_order_book(self, symbol: str):
+        # A single loader thread per book: if one is already running, it fetches a new snapshot for the reset book
+        order_book = self.order_books.get(symbol)
+        if order_book is None:
+            return
+        order_book.reset()
+
+        with self._book_loaders_lock:
+            if symbol in self._book_loaders:
+                self._book_loaders[symbol] = True
+                return
+            self._book_loaders[symbol] = False
+        threading.Thread(target=self._load_order_book, args=(symbol,), daemon=True).start()
+
+    def _load_order_book(self, symbol: str):
+        # Retries with an exponential backoff, and gives up after ORDER_BOOK_MAX_ATTEMPTS failed snapshots.
+        # The loader only stops under the lock, so a resync requested meanwhile is never lost.
+        delay = ORDER_BOOK_RETRY_DELAY
+        attempts = 0
         while True:
-            try:
-                self.ws.run_forever()
-            except Exception as e:
-                logger.error("Binance Error In run_forever() method: %s",e)
-            time.sleep(2)
-    
-    def _on_open(self, ws):
-        logger.info("Binance connection opened")
-        contract_list = list(self.contracts.values())
-        self.subscribe_channel(contract_list, "bookTicker")
-    
-    def _on_close(self, ws):
-        logger.warning("Binance connection closed")
+            order_book = self.order_books.get(symbol)
+            loaded = False
+            if order_book is not None:
+                try:
+                    snapshot = self.get_order_book_snapshot(order_book.contract)
+                    loaded = snapshot is not None and order_book.load_snapshot(snapshot)
+                except Exception as e:
+                    logger.error("Error while loading the %s order book snapshot: %s", symbol, e)
+
+            with self._book_loaders_lock:
+                if self._book_loaders[symbol]:
+                    # Reset while the snapshot was loading, or subscribed again: start over
+                    self._book_loaders[symbol] = False
+                    delay = ORDER_BOOK_RETRY_DELAY
+                    attempts = 0
+                    continue
+                attempts += 1
+                if loaded or order_book is None or attempts >= ORDER_BOOK_MAX_ATTEMPTS:
+                    del self._book_loaders[symbol]
+                    break
+            time.sleep(delay)
+            delay = min(delay * 2, ORDER_BOOK_MAX_RETRY_DELAY)
+
+        if order_book is not None and not loaded:
+            self._add_logs(f"{symbol} order book could not be loaded after {attempts} attempts")
 
-    def _on_error(self, ws, error_code: int, error_msg: str):
-        logger.error("Binance connection error. Error code: %s, Error message: %s", error_code, error_msg)
-
-    
     def _on_message(self, ws, message: str):
         # logger.info("Binance message received: %s", message)
+        if self._recorder is not None:
+            self._recorder.record_frame(message)
+
+        if not metrics.enabled:
+            self._handle_message(message)
+            return
+
+        start = time.perf_counter()
+        event, symbol = self._handle_message(message)
+        elapsed = time.perf_counter() - start
+
+        # Handling time by event type, and message count by stream
+        timer = self._stage_timers.get(event)
+        if timer is None:
+            timer = self._stage_timers[event] = metrics.histogram("stage_seconds", stage=event)
+        timer.record(elapsed)
+        counter = self._message_counters.get((event, symbol))
+        if counter is None:
+            counter = metrics.counter("ws_messages", stream=str(symbol).lower() + "@" + event)
+            self._message_counters[(event, symbol)] = counter
+        counter.inc()
+
+    def _handle_message(self, message: str) -> typing.Tuple[typing.Optional[str], typing.Optional[str]]:
+        # Returns the event type and symbol of the message, for the metrics
+
+        # bookTicker frames are most of the traffic: only the fields needed are read, without json.loads
+        if message.startswith('{"e":"bookTicker"'):
+            book_ticker = parse_book_ticker(message)
+            if book_ticker is not None:
+                self.prices.update(*book_ticker)
+                return 'bookTicker', book_ticker[0]
+
         data = json.loads(message)
 
         if "e" in data:
            if data['e'] == 'bookTicker':
-            symbol = data['s']
-            if symbol not in self.prices:
-                # Initialize bid-ask prices if not available
-                self.prices[symbol] = {
-                    'bid': float(data['b']),  # Latest bid price
-                    'ask': float(data['a'])   # Latest ask price
-                }
-            else:
-                # Update latest bid-ask prices
-                self.prices[symbol]['bid'] = float(data['b'])
-                self.prices[symbol]['ask'] = float(data['a'])
-            # print(self.prices[symbol])
-            # if symbol == "BTCUSDT":
-            #     self._add_logs(symbol+ " " + str(self.prices[symbol]["bid"]) + " / " + 
-            #                                     str(self.prices[symbol]["ask"]))
+            self.prices.update(data['s'], float(data['b']), float(data['a']), data['T'])
+
+           elif data['e'] == 'aggTrade':
+            aggregator = self.aggregators.get(data['s'])
+            if aggregator is not None:
+                aggregator.on_trade(float(data['p']), float(data['q']), data['T'])
+
+           elif data['e'] == 'depthUpdate':
+            order_book = self.order_books.get(data['s'])
+            if order_book is not None and not order_book.on_depth_update(data):
+                self._add_logs(f"{data['s']} order book out of sync, reloading it")
+                self._resync_order_book(data['s'])
+
+           return data['e'], data.get('s')
+        return 'other', None
 
     
     def subscribe_channel(self, contracts: typing.List[Contract], channel: str):
-        if self.ws is None:
-            logger.error("WebSocket connection is not initialized.")
-            return
-        data = dict()
-        data['method'] = "SUBSCRIBE"
-        data['params'] = []
-        # for contract in contracts:
-        #     data['params'].append(contract.symbol.lower()+"@"+ channel)
-        data['params'].append("!bookTicker")
-        data['id'] = self._ws_id
-        try:
-            self.ws.send(json.dumps(data))
-        except Exception as e:
-            logger.error("Websocket Error While Subscribing to %s %s updates: %s", len(contracts), channel, e)
-        
-        self._ws_id += 1
\ No newline at end of file
+        # Subscriptions are reference counted: each call must be matched by an unsubscribe_channel call
+        self._subscriptions.subscribe([contract.symbol.lower() + "@" + channel for contract in contracts])
+
+    def unsubscribe_channel(self, contracts: typing.List[Contract], channel: str):
+        self._subscriptions.unsubscribe([contract.symbol.lower() + "@" + channel for contract in contracts])
\ No newline at end of file
@@ -0,0 +1,634 @@
+import asyncio
+import collections
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+import typing
+from urllib.parse import urlencode
+
+import aiohttp
+
+from models import *
+from aggregator import CandleAggregator
+from connectors.binance_futures import MAX_PENDING_LOGS, ORDER_BOOK_RETRY_DELAY, ORDER_BOOK_MAX_RETRY_DELAY, \
+    ORDER_BOOK_MAX_ATTEMPTS
+from connectors.order_book import OrderBook
+from connectors.rate_limiter import get_rate_limiter
+from connectors.price_table import PriceTable, parse_book_ticker
+from connectors.subscriptions import SubscriptionManager, MIN_SEND_INTERVAL
+from connectors.user_stream import AccountStore, LISTEN_KEY_KEEPALIVE
+from metrics import metrics
+
+logger = logging.getLogger()
+
+
+class _AsyncShard:
+    # Websocket connection of a SubscriptionManager as a task of the client's event loop, carrying up to
+    # MAX_STREAMS_PER_CONNECTION streams like the threaded _Shard. Frames are handled on the loop, which is
+    # therefore the single writer of the PriceTable. send(), call_soon() and close() can be called from any
+    # thread: they only schedule work on the loop.
+    def __init__(self, manager: SubscriptionManager, shard_id: int, client: "AsyncBinanceFutureClient"):
+        self._manager = manager
+        self.shard_id = shard_id
+        self.streams = set()
+
+        self._client = client
+        self._loop = client._loop
+        self._ws_id = 1
+        self.ws = None
+        self._outbox = collections.deque()  # (method, streams) to send, only used on the loop
+        self._wakeup = None  # asyncio.Event set when a message is queued
+
+        self._task = asyncio.run_coroutine_threadsafe(self._run(), self._loop)
+
+    async def _run(self):
+        self._wakeup = asyncio.Event()
+        sender = asyncio.create_task(self._send_messages())
+        try:
+            while True:
+                try:
+                    async with self._client._session.ws_connect(self._manager.wss_url, heartbeat=30) as ws:
+                        self.ws = ws
+                        logger.info("Binance connection %s opened", self.shard_id)
+                        # Restores the subscriptions after a reconnection
+                        if len(self.streams) > 0:
+                            self._queue_message("SUBSCRIBE", list(self.streams))
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                try:
+                                    self._manager.on_message(ws, msg.data)
+                                except Exception as e:
+                                    logger.error("Error while handling Binance message on connection %s: %s",
+                                                 self.shard_id, e)
+                            elif msg.type == aiohttp.WSMsgType.ERROR:
+                                logger.error("Binance connection %s error: %s", self.shard_id, ws.exception())
+                                break
+                    logger.warning("Binance connection %s closed", self.shard_id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("Binance Error In websocket task (connection %s): %s", self.shard_id, e)
+                self.ws = None
+                await asyncio.sleep(2)
+        finally:
+            sender.cancel()
+
+    async def _send_messages(self):
+        last_send = 0.0
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while len(self._outbox) > 0:
+                wait = last_send + MIN_SEND_INTERVAL - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                # Consecutive messages of the same kind queued meanwhile go out as one
+                method, streams = self._outbox.popleft()
+                streams = list(streams)
+                while len(self._outbox) > 0 and self._outbox[0][0] == method:
+                    streams.extend(self._outbox.popleft()[1])
+                streams = list(dict.fromkeys(streams))
+
+                if self.ws is None:
+                    continue  # The connection subscribes every stream of the shard once open
+                data = {"method": method, "params": streams, "id": self._ws_id}
+                try:
+                    await self.ws.send_str(json.dumps(data))
+                except Exception as e:
+                    logger.error("Websocket Error While Sending %s for %s streams: %s", method, len(streams), e)
+                self._ws_id += 1
+                last_send = time.monotonic()
+
+    def send(self, method: str, streams: typing.List[str]):
+        self._loop.call_soon_threadsafe(self._queue_message, method, streams)
+
+    def _queue_message(self, method: str, streams: typing.List[str]):
+        self._outbox.append((method, streams))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def call_soon(self, callback: typing.Callable):
+        self._loop.call_soon_threadsafe(callback)
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._task.cancel)
+
+
+class AsyncBinanceFutureClient:
+    # Same public surface as BinanceFutureClient, but every REST call is a coroutine and the websocket
+    # connections are tasks on the same event loop, so many requests and stream connections can be in flight
+    # at once without one thread per connection. Prices, subscriptions and the account are kept with the same
+    # PriceTable, SubscriptionManager and AccountStore as the threaded client. subscribe_channel() and the
+    # other subscription methods are plain methods that can be called from any thread. Call start() from a
+    # running loop before using the client.
+    def __init__(self, public_key: str, secret_key: str, testnet: bool, base_url: typing.Optional[str] = None,
+                 wss_url: typing.Optional[str] = None):
+        if testnet:
+            self._base_url = "https://testnet.binancefuture.com"
+            self._wss_url = "wss://stream.binancefuture.com/ws"
+        else:
+            self._base_url = "https://fapi.binance.com"
+            self._wss_url = "wss://fstream.binance.com/ws"
+
+        # Overrides, e.g. to run against a local stub server
+        if base_url is not None:
+            self._base_url = base_url
+        if wss_url is not None:
+            self._wss_url = wss_url
+
+        self._public_key = public_key
+        self._secret_key = secret_key
+
+        self._headers = {'X-MBX-APIKEY': self._public_key}
+        self._rate_limiter = get_rate_limiter(self._base_url)
+        self._session = None
+        self._loop = None
+
+        self.contracts = dict()
+        self.prices = PriceTable()  # Only written on the event loop
+        self.aggregators = dict()
+        self.order_books = dict()  # Fed by the depth diff stream on the loop, by symbol
+        self._book_loaders = dict()  # Symbol -> task loading its snapshot, only used on the loop
+        self.account = AccountStore()
+        self.balances = self.account.balances
+        self.logs = collections.deque(maxlen=MAX_PENDING_LOGS)
+
+        # Same probes as the threaded client and its HttpTransport, all in the metrics registry. Only used
+        # on the loop.
+        self.latencies = dict()  # Endpoint -> LatencyHistogram
+        self._status_counters = dict()  # (endpoint, status) -> Counter
+        self._stage_timers = dict()
+        self._message_counters = dict()
+
+        self._subscriptions = SubscriptionManager(self._wss_url, self._on_message,
+                                                  shard_factory=lambda manager, shard_id:
+                                                  _AsyncShard(manager, shard_id, self))
+        self._user_stream_task = None
+        self.listen_key = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._session = aiohttp.ClientSession(headers=self._headers,
+                                              connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60),
+                                              timeout=aiohttp.ClientTimeout(total=10, connect=3))
+        self.contracts, account_data = await asyncio.gather(self.get_contracts(), self.get_account())
+        if account_data is not None:
+            self.account.load_account(account_data)
+        self._user_stream_task = asyncio.create_task(self._run_user_stream())
+        logger.info("Async Binance Futures Client Successfully Initialized")
+
+    async def close(self):
+        self._subscriptions.close()
+        for loader in list(self._book_loaders.values()):
+            loader.cancel()
+        if self._user_stream_task is not None:
+            self._user_stream_task.cancel()
+        if self.listen_key is not None:
+            await self._make_request("DELETE", "/fapi/v1/listenKey", dict())
+        if self._session is not None:
+            await self._session.close()
+
+    def _add_logs(self, msg: str):
+        logger.info("%s", msg)
+        self.logs.append(msg)
+
+    def drain_logs(self) -> typing.List[str]:
+        # Messages added since the previous call, oldest first. Only the newest MAX_PENDING_LOGS are kept
+        # if nobody drains them.
+        messages = []
+        try:
+            while True:
+                messages.append(self.logs.popleft())
+        except IndexError:
+            return messages
+
+    def _generate_signature(self, data: typing.Dict) -> str:
+        return hmac.new(self._secret_key.encode(), urlencode(data).encode(), hashlib.sha256).hexdigest()
+
+    async def _make_request(self, method: str, endpoint: str, data: typing.Dict):
+        if method not in ("GET", "POST", "PUT", "DELETE"):
+            raise ValueError("Unsupported HTTP method")
+
+        # Orders keep their priority over market data requests while they wait, as with the threaded client
+        waiting = False
+        try:
+            while True:
+                wait = self._rate_limiter.try_acquire(method, endpoint, data, waiting)
+                if wait <= 0:
+                    break
+                waiting = True
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            if waiting:
+                self._rate_limiter.release_wait(method, endpoint)
+            raise
+
+        start = time.perf_counter()
+        status = "error"
+        try:
+            async with self._session.request(method, self._base_url + endpoint, params=data) as response:
+                status = response.status
+                self._rate_limiter.update(response.headers)
+                if response.status in (418, 429):
+                    retry_after = response.headers.get("Retry-After")
+                    self._rate_limiter.back_off(int(retry_after) if retry_after is not None else None)
+
+                if response.status == 200:
+                    return await response.json()
+                logger.error("Error while making %s request to %s: %s (HTTP status code %s)",
+                             method, endpoint, await response.text(), response.status)
+                return None
+        except Exception as e:
+            logger.error("Connection Error While Making %s request to %s: %s", method, endpoint, e)
+            return None
+        finally:
+            self._record(endpoint, status, time.perf_counter() - start)
+
+    def _record(self, endpoint: str, status, seconds: float):
+        histogram = self.latencies.get(endpoint)
+        if histogram is None:
+            histogram = metrics.histogram("http_request_seconds", endpoint=endpoint)
+            self.latencies[endpoint] = histogram
+        histogram.record(seconds)
+
+        counter = self._status_counters.get((endpoint, status))
+        if counter is None:
+            counter = metrics.counter("http_responses", endpoint=endpoint, status=str(status))
+            self._status_counters[(endpoint, status)] = counter
+        counter.inc()
+
+    async def get_contracts(self) -> typing.Mapping[str, Contract]:
+        exchange_info = await self._make_request("GET", "/fapi/v1/exchangeInfo", dict())
+        if exchange_info is None:
+            return LazyContracts([])
+        return LazyContracts(exchange_info['symbols'])
+
+    async def get_historical_candles(self, contract: Contract, interval: str, start_time: typing.Optional[int] = None,
+                                     end_time: typing.Optional[int] = None, limit: int = 1000) -> CandleSeries:
+        data = dict()
+        data['symbol'] = contract.symbol
+        data['interval'] = interval
+        data['limit'] = limit
+        if start_time is not None:
+            data['startTime'] = start_time
+        if end_time is not None:
+            data['endTime'] = end_time
+
+        raw_candles = await self._make_request("GET", "/fapi/v1/klines", data)
+
+        candles = CandleSeries()
+        if raw_candles is not None:
+            candles.extend_klines(raw_candles)
+        return candles
+
+    async def get_bid_ask(self, contract: Contract) -> typing.Dict[str, float]:
+        data = dict()
+        data['symbol'] = contract.symbol
+        ob_data = await self._make_request("GET", "/fapi/v1/ticker/bookTicker", data)
+
+        if ob_data is not None:
+            bid = float(ob_data['bidPrice'])
+            ask = float(ob_data['askPrice'])
+            update_time = ob_data.get('time', 0)
+            # On the loop like the stream frames, so the price table keeps a single writer. A newer price
+            # from the stream is kept, and without a stream nothing is written.
+            if contract.symbol.lower() + "@bookTicker" in self._subscriptions.streams:
+                snapshot = self.prices.snapshot(contract.symbol)
+                if snapshot is None or snapshot[2] < update_time:
+                    self.prices.update(contract.symbol, bid, ask, update_time)
+            return {'bid': bid, 'ask': ask}
+
+    async def get_order_book_snapshot(self, contract: Contract, limit: int = 1000) -> typing.Optional[typing.Dict]:
+        data = dict()
+        data['symbol'] = contract.symbol
+        data['limit'] = limit
+        return await self._make_request("GET", "/fapi/v1/depth", data)
+
+    async def get_account(self) -> typing.Optional[typing.Dict]:
+        data = dict()
+        data['timestamp'] = int(time.time() * 1000)
+        data['signature'] = self._generate_signature(data)
+        return await self._make_request("GET", "/fapi/v2/account", data)
+
+    async def get_balance(self) -> typing.Dict[str, Balance]:
+        # Current balances from the REST API, self.balances is kept up to date by the user data stream instead
+        balances = dict()
+        account_data = await self.get_account()
+        if account_data is not None:
+            for a in account_data['assets']:
+                balances[a['asset']] = Balance(a)
+        return balances
+
+    def _order_params(self, contract: Contract, side: str, quantity: float, order_type: str, price=None,
+                      timeinforce=None, client_order_id=None) -> typing.Dict:
+        data = dict()
+        data['symbol'] = contract.symbol
+        data['side'] = side
+        data['quantity'] = contract.format_quantity(quantity)
+        data['type'] = order_type
+        if price is not None:
+            data['price'] = contract.format_price(price)
+        if timeinforce is not None:
+            data['timeInForce'] = timeinforce
+        if client_order_id is not None:
+            data['newClientOrderId'] = client_order_id
+        return data
+
+    async def place_order(self, contract: Contract, side: str, quantity: float, order_type: str, price=None,
+                          timeinforce=None, client_order_id=None) -> OrderStatus:
+        data = self._order_params(contract, side, quantity, order_type, price, timeinforce, client_order_id)
+        data['timestamp'] = int(time.time() * 1000)
+        data['signature'] = self._generate_signature(data)
+
+        order_status = await self._make_request("POST", "/fapi/v1/order", data)
+        if order_status is not None:
+            order_status = OrderStatus(order_status)
+        return order_status
+
+    async def place_batch_orders(self, orders: typing.List[typing.Dict]) -> typing.List[typing.Optional[OrderStatus]]:
+        # Up to 5 orders from _order_params in one request, None for the orders Binance rejected
+        data = dict()
+        data['batchOrders'] = json.dumps(orders, separators=(",", ":"))
+        data['timestamp'] = int(time.time() * 1000)
+        data['signature'] = self._generate_signature(data)
+
+        response = await self._make_request("POST", "/fapi/v1/batchOrders", data)
+        if response is None:
+            return [None] * len(orders)
+
+        results = []
+        for order, result in zip(orders, response):
+            if 'orderId' in result:
+                results.append(OrderStatus(result))
+            else:
+                logger.error("Batch order %s %s %s rejected: %s", order['side'], order['quantity'], order['symbol'],
+                             result.get('msg'))
+                results.append(None)
+        return results
+
+    async def cancel_order(self, contract: Contract, order_id: int) -> OrderStatus:
+        data = dict()
+        data['orderId'] = order_id
+        data['symbol'] = contract.symbol
+        data['timestamp'] = int(time.time() * 1000)
+        data['signature'] = self._generate_signature(data)
+
+        order_status = await self._make_request("DELETE", "/fapi/v1/order", data)
+        if order_status is not None:
+            order_status = OrderStatus(order_status)
+        return order_status
+
+    async def get_order_status(self, contract: Contract, order_id: int) -> OrderStatus:
+        # From the user data stream if the order has had an update since the client started
+        order_status = self.account.get_order(order_id)
+        if order_status is not None:
+            return order_status
+
+        data = dict()
+        data['timestamp'] = int(time.time() * 1000)
+        data['symbol'] = contract.symbol
+        data['orderId'] = order_id
+        data['signature'] = self._generate_signature(data)
+
+        order_status = await self._make_request("GET", "/fapi/v1/order", data)
+        if order_status is not None:
+            order_status = OrderStatus(order_status)
+        return order_status
+
+    async def _run_user_stream(self):
+        # Listen key and user data websocket, as UserDataStream does for the threaded client: the store is
+        # resynchronized from the REST account endpoint after a reconnection.
+        keepalive = asyncio.create_task(self._keep_listen_key_alive())
+        connections = 0
+        try:
+            while True:
+                try:
+                    response = await self._make_request("POST", "/fapi/v1/listenKey", dict())
+                    if response is not None:
+                        self.listen_key = response['listenKey']
+                        async with self._session.ws_connect(self._wss_url + "/" + self.listen_key,
+                                                            heartbeat=30) as ws:
+                            logger.info("Binance user data stream opened")
+                            connections += 1
+                            if connections > 1:
+                                account_data = await self.get_account()
+                                if account_data is not None:
+                                    self.account.load_account(account_data)
+                            async for msg in ws:
+                                if msg.type != aiohttp.WSMsgType.TEXT:
+                                    break
+                                data = json.loads(msg.data)
+                                if data.get('e') == 'listenKeyExpired':
+                                    logger.warning("Binance listen key expired, reconnecting the user data stream")
+                                    break
+                                self.account.on_event(data)
+                        logger.warning("Binance user data stream closed")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("Binance Error In user data stream task: %s", e)
+                await asyncio.sleep(2)
+        finally:
+            keepalive.cancel()
+
+    async def _keep_listen_key_alive(self):
+        while True:
+            await asyncio.sleep(LISTEN_KEY_KEEPALIVE)
+            if self.listen_key is not None and \
+                    await self._make_request("PUT", "/fapi/v1/listenKey", dict()) is None:
+                logger.warning("Binance listen key keepalive failed")
+
+    def _on_message(self, ws, message: str):
+        if not metrics.enabled:
+            self._handle_message(message)
+            return
+
+        start = time.perf_counter()
+        event, symbol = self._handle_message(message)
+        elapsed = time.perf_counter() - start
+
+        # Handling time by event type, and message count by stream, as for the threaded client
+        timer = self._stage_timers.get(event)
+        if timer is None:
+            timer = self._stage_timers[event] = metrics.histogram("stage_seconds", stage=event)
+        timer.record(elapsed)
+        counter = self._message_counters.get((event, symbol))
+        if counter is None:
+            counter = metrics.counter("ws_messages", stream=str(symbol).lower() + "@" + event)
+            self._message_counters[(event, symbol)] = counter
+        counter.inc()
+
+    def _handle_message(self, message: str) -> typing.Tuple[typing.Optional[str], typing.Optional[str]]:
+        # Returns the event type and symbol of the message, for the metrics
+
+        # bookTicker frames are most of the traffic: only the fields needed are read, without json.loads
+        if message.startswith('{"e":"bookTicker"'):
+            book_ticker = parse_book_ticker(message)
+            if book_ticker is not None:
+                self.prices.update(*book_ticker)
+                return 'bookTicker', book_ticker[0]
+
+        data = json.loads(message)
+
+        if "e" in data:
+            if data['e'] == 'bookTicker':
+                self.prices.update(data['s'], float(data['b']), float(data['a']), data['T'])
+
+            elif data['e'] == 'aggTrade':
+                aggregator = self.aggregators.get(data['s'])
+                if aggregator is not None:
+                    aggregator.on_trade(float(data['p']), float(data['q']), data['T'])
+
+            elif data['e'] == 'depthUpdate':
+                order_book = self.order_books.get(data['s'])
+                if order_book is not None and not order_book.on_depth_update(data):
+                    self._add_logs(f"{data['s']} order book out of sync, reloading it")
+                    self._resync_order_book(data['s'])
+
+            return data['e'], data.get('s')
+        return 'other', None
+
+    def subscribe_channel(self, contracts: typing.List[Contract], channel: str):
+        # Subscriptions are reference counted: each call must be matched by an unsubscribe_channel call
+        self._subscriptions.subscribe([contract.symbol.lower() + "@" + channel for contract in contracts])
+
+    def unsubscribe_channel(self, contracts: typing.List[Contract], channel: str):
+        self._subscriptions.unsubscribe([contract.symbol.lower() + "@" + channel for contract in contracts])
+
+    def subscribe_candles(self, contract: Contract, timeframe: str, on_new_candle: typing.Callable,
+                          on_same_candle: typing.Callable) -> CandleAggregator:
+        # Live candles built from the aggTrade stream, see CandleAggregator for the callbacks.
+        if contract.symbol not in self.aggregators:
+            self.aggregators[contract.symbol] = CandleAggregator(contract.symbol)
+            self.subscribe_channel([contract], "aggTrade")
+        aggregator = self.aggregators[contract.symbol]
+        aggregator.add_listener(timeframe, on_new_candle, on_same_candle)
+        return aggregator
+
+    def unsubscribe_candles(self, contract: Contract, timeframe: str, on_new_candle: typing.Callable,
+                            on_same_candle: typing.Callable):
+        aggregator = self.aggregators.get(contract.symbol)
+        if aggregator is None:
+            return
+        aggregator.remove_listener(timeframe, on_new_candle, on_same_candle)
+        if not aggregator.has_listeners():
+            del self.aggregators[contract.symbol]
+            self.unsubscribe_channel([contract], "aggTrade")
+
+    def subscribe_order_book(self, contract: Contract) -> OrderBook:
+        # The diff stream is subscribed first so that no update is missed between the snapshot and the stream,
+        # the snapshot is then loaded by a task of the loop.
+        if contract.symbol not in self.order_books:
+            self.order_books[contract.symbol] = OrderBook(contract)
+            self.subscribe_channel([contract], "depth@100ms")
+            self._loop.call_soon_threadsafe(self._resync_order_book, contract.symbol)
+        return self.order_books[contract.symbol]
+
+    def unsubscribe_order_book(self, contract: Contract):
+        if self.order_books.pop(contract.symbol, None) is not None:
+            self.unsubscribe_channel([contract], "depth@100ms")
+
+    def _resync_order_book(self, symbol: str):
+        # On the loop. A single loader task per book: a resync while it runs replaces it with a new one, since
+        # the snapshot it is waiting for is outdated.
+        order_book = self.order_books.get(symbol)
+        if order_book is None:
+            return
+        order_book.reset()
+
+        loader = self._book_loaders.get(symbol)
+        if loader is not None:
+            loader.cancel()
+        self._book_loaders[symbol] = asyncio.ensure_future(self._load_order_book(symbol))
+
+    async def _load_order_book(self, symbol: str):
+        # Same backoff and retry cap as the threaded client
+        delay = ORDER_BOOK_RETRY_DELAY
+        try:
+            for attempt in range(1, ORDER_BOOK_MAX_ATTEMPTS + 1):
+                order_book = self.order_books.get(symbol)
+                if order_book is None:
+                    return  # Unsubscribed meanwhile
+                try:
+                    snapshot = await self.get_order_book_snapshot(order_book.contract)
+                    if snapshot is not None and order_book.load_snapshot(snapshot):
+                        return
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("Error while loading the %s order book snapshot: %s", symbol, e)
+                if attempt < ORDER_BOOK_MAX_ATTEMPTS:
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, ORDER_BOOK_MAX_RETRY_DELAY)
+            self._add_logs(f"{symbol} order book could not be loaded after {ORDER_BOOK_MAX_ATTEMPTS} attempts")
+        finally:
+            if self._book_loaders.get(symbol) is asyncio.current_task():
+                del self._book_loaders[symbol]
+
+    def get_latency_stats(self) -> typing.Dict[str, typing.Dict[str, float]]:
+        return {endpoint: histogram.snapshot() for endpoint, histogram in list(self.latencies.items())}
+
+
+class SyncBinanceFutureClient:
+    # Blocking facade over AsyncBinanceFutureClient for the Tkinter interface: the event loop runs on one
+    # background thread and each call waits for its coroutine. Data attributes (contracts, prices, account,
+    # logs...) and the subscription methods are used straight from the async client. A blocking call from
+    # the loop thread itself, e.g. from a price or order listener, would never return and raises instead.
+    def __init__(self, public_key: str, secret_key: str, testnet: bool, base_url: typing.Optional[str] = None,
+                 wss_url: typing.Optional[str] = None):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+        self._client = AsyncBinanceFutureClient(public_key, secret_key, testnet, base_url, wss_url)
+        self._run(self._client.start())
+
+    def _run(self, coro):
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("Blocking Binance client call from its own event loop thread")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def __getattr__(self, name):
+        # Only called for attributes not defined on the facade
+        return getattr(self._client, name)
+
+    def get_contracts(self) -> typing.Mapping[str, Contract]:
+        return self._run(self._client.get_contracts())
+
+    def get_historical_candles(self, contract: Contract, interval: str, start_time: typing.Optional[int] = None,
+                               end_time: typing.Optional[int] = None, limit: int = 1000) -> CandleSeries:
+        return self._run(self._client.get_historical_candles(contract, interval, start_time, end_time, limit))
+
+    def get_bid_ask(self, contract: Contract) -> typing.Dict[str, float]:
+        return self._run(self._client.get_bid_ask(contract))
+
+    def get_order_book_snapshot(self, contract: Contract, limit: int = 1000) -> typing.Optional[typing.Dict]:
+        return self._run(self._client.get_order_book_snapshot(contract, limit))
+
+    def get_account(self) -> typing.Optional[typing.Dict]:
+        return self._run(self._client.get_account())
+
+    def get_balance(self) -> typing.Dict[str, Balance]:
+        return self._run(self._client.get_balance())
+
+    def place_order(self, contract: Contract, side: str, quantity: float, order_type: str, price=None,
+                    timeinforce=None, client_order_id=None) -> OrderStatus:
+        return self._run(self._client.place_order(contract, side, quantity, order_type, price, timeinforce,
+                                                  client_order_id))
+
+    def place_batch_orders(self, orders: typing.List[typing.Dict]) -> typing.List[typing.Optional[OrderStatus]]:
+        return self._run(self._client.place_batch_orders(orders))
+
+    def cancel_order(self, contract: Contract, order_id: int) -> OrderStatus:
+        return self._run(self._client.cancel_order(contract, order_id))
+
+    def get_order_status(self, contract: Contract, order_id: int) -> OrderStatus:
+        return self._run(self._client.get_order_status(contract, order_id))
+
+    def close(self):
+        self._run(self._client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,173 @@
+import array
+import bisect
+import logging
+import threading
+import typing
+
+from models import *
+
+logger = logging.getLogger()
+
+
+class _BookSide:
+    # Price levels of one side in sorted arrays, best level last: updates are a binary search plus a short
+    # memmove near the end of the array (most changes happen close to the top of the book), and the best
+    # level is a plain index. Ask prices are stored negated so that both sides sort the same way.
+    def __init__(self, sign: int):
+        self._sign = sign
+        self._keys = array.array("d")
+        self._qtys = array.array("d")
+
+    def clear(self):
+        self._keys = array.array("d")
+        self._qtys = array.array("d")
+
+    def set(self, price: float, qty: float):
+        key = price * self._sign
+        keys = self._keys
+        idx = bisect.bisect_left(keys, key)
+        if idx < len(keys) and keys[idx] == key:
+            if qty == 0:
+                del keys[idx]
+                del self._qtys[idx]
+            else:
+                self._qtys[idx] = qty
+        elif qty != 0:
+            keys.insert(idx, key)
+            self._qtys.insert(idx, qty)
+
+    def best(self) -> typing.Optional[typing.Tuple[float, float]]:
+        if len(self._keys) == 0:
+            return None
+        return self._keys[-1] * self._sign, self._qtys[-1]
+
+    def levels(self) -> typing.Iterator[typing.Tuple[float, float]]:
+        # From the best level outwards
+        sign = self._sign
+        keys, qtys = self._keys, self._qtys
+        for idx in range(len(keys) - 1, -1, -1):
+            yield keys[idx] * sign, qtys[idx]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class OrderBook:
+    # Local copy of a contract's order book: a REST depth snapshot kept up to date with the @depth diff stream,
+    # following the Binance futures procedure. Diff events that arrive before the snapshot are buffered, events
+    # older than the snapshot are dropped, and a gap in the pu -> u chain means the book must be reloaded,
+    # which on_depth_update reports by returning False.
+    def __init__(self, contract: Contract):
+        self.contract = contract
+        self.bids = _BookSide(1)
+        self.asks = _BookSide(-1)
+
+        self.last_update_id = None
+        self._snapshot_id = None
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    @property
+    def synced(self) -> bool:
+        return self.last_update_id is not None and self.last_update_id != self._snapshot_id
+
+    def reset(self):
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            self.last_update_id = None
+            self._snapshot_id = None
+            self._buffer = []
+
+    def load_snapshot(self, snapshot: typing.Dict) -> bool:
+        # Response of /fapi/v1/depth. Returns False if the buffered events show it is already outdated.
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            for price, qty in snapshot['bids']:
+                self.bids.set(float(price), float(qty))
+            for price, qty in snapshot['asks']:
+                self.asks.set(float(price), float(qty))
+            self.last_update_id = snapshot['lastUpdateId']
+            self._snapshot_id = self.last_update_id
+
+            buffered, self._buffer = self._buffer, []
+            for event in buffered:
+                if not self._apply(event):
+                    return False
+            return True
+
+    def on_depth_update(self, event: typing.Dict) -> bool:
+        with self._lock:
+            if self.last_update_id is None:
+                self._buffer.append(event)
+                return True
+            return self._apply(event)
+
+    def _apply(self, event: typing.Dict) -> bool:
+        if event['u'] < self._snapshot_id:
+            return True  # Already contained in the snapshot
+
+        if self.last_update_id == self._snapshot_id:
+            # First event after the snapshot must straddle it
+            if not event['U'] <= self._snapshot_id <= event['u']:
+                logger.warning("%s order book snapshot %s does not match diff events %s-%s", self.contract.symbol,
+                               self._snapshot_id, event['U'], event['u'])
+                return False
+        elif event['pu'] != self.last_update_id:
+            logger.warning("%s order book gap: expected pu %s, got %s", self.contract.symbol, self.last_update_id,
+                           event['pu'])
+            return False
+
+        for price, qty in event['b']:
+            self.bids.set(float(price), float(qty))
+        for price, qty in event['a']:
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = event['u']
+        return True
+
+    def best_bid(self) -> typing.Optional[typing.Tuple[float, float]]:
+        return self.bids.best()
+
+    def best_ask(self) -> typing.Optional[typing.Tuple[float, float]]:
+        return self.asks.best()
+
+    def vwap(self, side: str, quantity: float) -> typing.Optional[float]:
+        # Average price of a market order of `quantity` taking liquidity from the book: a BUY consumes the asks,
+        # a SELL the bids. None if the book is not deep enough, or for a quantity that is not positive.
+        if quantity <= 0:
+            return None
+        with self._lock:
+            levels = self.asks.levels() if side == "BUY" else self.bids.levels()
+            remaining = quantity
+            cost = 0.0
+            for price, qty in levels:
+                filled = qty if qty < remaining else remaining
+                cost += filled * price
+                remaining -= filled
+                if remaining <= 0:
+                    return cost / quantity
+        return None
+
+    def slippage(self, side: str, quantity: float) -> typing.Optional[float]:
+        # Distance in % between the VWAP of a market order of that size and the best price on its side.
+        best = self.best_ask() if side == "BUY" else self.best_bid()
+        vwap = self.vwap(side, quantity)
+        if best is None or vwap is None:
+            return None
+        return abs(vwap - best[0]) / best[0] * 100
+
+    def depth(self, side: str, max_slippage: float) -> float:
+        # Quantity available within max_slippage % of the best price, e.g. to cap a balance_pct order size.
+        with self._lock:
+            book_side = self.asks if side == "BUY" else self.bids
+            best = book_side.best()
+            if best is None:
+                return 0.0
+            limit = best[0] * (1 + max_slippage / 100) if side == "BUY" else best[0] * (1 - max_slippage / 100)
+            total = 0.0
+            for price, qty in book_side.levels():
+                if (side == "BUY" and price > limit) or (side == "SELL" and price < limit):
+                    break
+                total += qty
+            return total
@@ -0,0 +1,125 @@
+import array
+import math
+import threading
+import time
+import typing
+
+SNAPSHOT_RETRIES = 100  # Reads of a slot being written before snapshot() gives up on a fresh value
+
+
+class PriceTable:
+    # Top of book of every symbol in preallocated columns (one slot per symbol) instead of a dict of dicts.
+    # There is a single writer per symbol (the websocket thread); readers on other threads get consistent
+    # bid/ask/time triples without locking thanks to a per-slot sequence number (seqlock): it is odd while
+    # the slot is being written, so a reader retries if it saw an odd number or if it changed during its read.
+    # A reader retries at most SNAPSHOT_RETRIES times and then returns the last consistent triple it read, so
+    # a writer that died mid-update cannot hang it.
+    # `version` increases on every update so that a reader can tell cheaply whether anything changed.
+    # Listeners added for a symbol are called as listener(symbol, bid, ask) on the writer thread after each of
+    # its updates, they must return quickly.
+    def __init__(self, capacity: int = 1024):
+        self._index = dict()  # Symbol -> slot
+        self.symbols = []
+        self._capacity = capacity
+
+        self._bid = array.array("d", [math.nan]) * capacity
+        self._ask = array.array("d", [math.nan]) * capacity
+        self._update_time = array.array("q", [0]) * capacity
+        self._seq = array.array("q", [0]) * capacity
+
+        self.version = 0
+        self._last_good = dict()  # Slot -> last consistent snapshot read
+        self._alloc_lock = threading.Lock()
+        self._listeners = dict()  # Symbol -> listeners, replaced rather than mutated
+
+    def _allocate(self, symbol: str) -> int:
+        with self._alloc_lock:
+            slot = self._index.get(symbol)
+            if slot is not None:
+                return slot
+            slot = len(self.symbols)
+            if slot == self._capacity:
+                self._bid.extend(array.array("d", [math.nan]) * self._capacity)
+                self._ask.extend(array.array("d", [math.nan]) * self._capacity)
+                self._update_time.extend(array.array("q", [0]) * self._capacity)
+                self._seq.extend(array.array("q", [0]) * self._capacity)
+                self._capacity *= 2
+            self.symbols.append(symbol)
+            self._index[symbol] = slot
+            return slot
+
+    def update(self, symbol: str, bid: float, ask: float, update_time: int = 0):
+        # Only for the one thread writing the symbol, usually the websocket thread of its bookTicker stream.
+        # Two threads writing the same slot could interleave and leave readers with a mix of both updates.
+        slot = self._index.get(symbol)
+        if slot is None:
+            slot = self._allocate(symbol)
+        seq = self._seq
+        # Odd while writing, and even once the last write is over even if the single writer rule is broken
+        odd = (seq[slot] + 1) | 1
+        seq[slot] = odd
+        self._bid[slot] = bid
+        self._ask[slot] = ask
+        self._update_time[slot] = update_time
+        seq[slot] = odd + 1
+        self.version += 1
+        if self._listeners:
+            listeners = self._listeners.get(symbol)
+            if listeners is not None:
+                for listener in listeners:
+                    listener(symbol, bid, ask)
+
+    def add_listener(self, symbol: str, listener: typing.Callable):
+        listeners = dict(self._listeners)
+        listeners[symbol] = listeners.get(symbol, ()) + (listener,)
+        self._listeners = listeners
+
+    def remove_listener(self, symbol: str, listener: typing.Callable):
+        listeners = dict(self._listeners)
+        remaining = tuple(cb for cb in listeners.get(symbol, ()) if cb != listener)
+        if remaining:
+            listeners[symbol] = remaining
+        else:
+            listeners.pop(symbol, None)
+        self._listeners = listeners
+
+    def snapshot(self, symbol: str) -> typing.Optional[typing.Tuple[float, float, int, int]]:
+        # (bid, ask, update time, sequence number) of a symbol, None if it never had a price.
+        slot = self._index.get(symbol)
+        if slot is None:
+            return None
+        seq = self._seq
+        for attempt in range(SNAPSHOT_RETRIES):
+            before = seq[slot]
+            if not before & 1:
+                result = (self._bid[slot], self._ask[slot], self._update_time[slot], before)
+                if seq[slot] == before:
+                    self._last_good[slot] = result
+                    return result
+            if attempt > 0:
+                time.sleep(0)  # Lets the writer thread finish its update
+        return self._last_good.get(slot)
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self._index
+
+    def __getitem__(self, symbol: str) -> typing.Dict[str, float]:
+        # Dictionary view kept for the callers written against the former {symbol: {'bid', 'ask'}} prices
+        snapshot = self.snapshot(symbol)
+        if snapshot is None:
+            raise KeyError(symbol)
+        return {'bid': snapshot[0], 'ask': snapshot[1]}
+
+    def get(self, symbol: str, default=None):
+        return self[symbol] if symbol in self._index else default
+
+
+def parse_book_ticker(message: str) -> typing.Optional[typing.Tuple[str, float, float, int]]:
+    # Reads symbol, best bid, best ask and transaction time out of a raw bookTicker frame without decoding
+    # the whole JSON object. Frames have a fixed key order:
+    #   {"e":"bookTicker","u":1,"s":"BTCUSDT","b":"1.0","B":"2","a":"1.1","A":"3","T":4,"E":5}
+    # so after splitting on quotes every field sits at a known position. Returns None for any other layout.
+    parts = message.split('"')
+    if len(parts) < 29 or parts[7] != "s" or parts[11] != "b" or parts[19] != "a" or parts[27] != "T":
+        return None
+    return parts[9], float(parts[13]), float(parts[21]), int(parts[28][1:-1])
@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+import typing
+
+logger = logging.getLogger()
+
+# Endpoints that create or cancel orders. They are served before market data requests and may use
+# the weight kept in reserve for them.
+ORDER_ENDPOINTS = {"/fapi/v1/order", "/fapi/v1/batchOrders", "/fapi/v1/allOpenOrders"}
+
+
+def _weight_by_limit(limit: int, steps: typing.List[typing.Tuple[int, int]], default: int) -> int:
+    for max_limit, weight in steps:
+        if limit <= max_limit:
+            return weight
+    return default
+
+
+def request_weight(method: str, endpoint: str, params: typing.Dict) -> int:
+    # Request weights as documented for the USDⓈ-M futures REST API.
+    if endpoint == "/fapi/v1/klines":
+        return _weight_by_limit(int(params.get("limit", 500)), [(99, 1), (499, 2), (1000, 5)], 10)
+    if endpoint == "/fapi/v1/depth":
+        return _weight_by_limit(int(params.get("limit", 500)), [(50, 2), (100, 5), (500, 10)], 20)
+    if endpoint == "/fapi/v1/ticker/bookTicker":
+        return 2 if "symbol" in params else 5
+    if endpoint in ("/fapi/v2/account", "/fapi/v2/balance"):
+        return 5
+    if endpoint == "/fapi/v1/batchOrders":
+        return 5
+    return 1
+
+
+def order_count(method: str, endpoint: str, params: typing.Dict) -> int:
+    # Orders counted against the ORDERS limits, only new orders are.
+    if method != "POST":
+        return 0
+    if endpoint == "/fapi/v1/order":
+        return 1
+    if endpoint == "/fapi/v1/batchOrders":
+        return params['batchOrders'].count('"symbol"') if 'batchOrders' in params else 5
+    return 0
+
+
+class RateLimiter:
+    # Client side mirror of the Binance REQUEST_WEIGHT (per minute) and ORDERS (per 10 seconds and per minute)
+    # fixed windows. Counters are incremented before each request and corrected with the X-MBX-USED-WEIGHT-1M /
+    # X-MBX-ORDER-COUNT-* headers of each response, which also account for other processes using the same IP
+    # or account. Market data requests can only use weight_limit * market_data_share and wait while an
+    # order request is waiting, so orders and cancellations always get through first.
+    def __init__(self, weight_limit: int = 2400, order_limit_10s: int = 300, order_limit_1m: int = 1200,
+                 market_data_share: float = 0.8):
+        self._weight_limit = weight_limit
+        self._market_data_limit = int(weight_limit * market_data_share)
+        self._order_limit_10s = order_limit_10s
+        self._order_limit_1m = order_limit_1m
+
+        self._cond = threading.Condition()
+
+        self._minute = 0
+        self._ten_seconds = 0
+        self._used_weight = 0
+        self._orders_10s = 0
+        self._orders_1m = 0
+
+        self._banned_until = 0.0
+        self._orders_waiting = 0
+
+    def _roll(self, now: float):
+        minute = int(now // 60)
+        if minute != self._minute:
+            self._minute = minute
+            self._used_weight = 0
+            self._orders_1m = 0
+        ten_seconds = int(now // 10)
+        if ten_seconds != self._ten_seconds:
+            self._ten_seconds = ten_seconds
+            self._orders_10s = 0
+
+    def _wait_time(self, now: float, is_order: bool, weight: int, orders: int) -> float:
+        # 0 when the request can be sent now, otherwise the time until the blocking window resets.
+        if now < self._banned_until:
+            return self._banned_until - now
+        if not is_order and self._orders_waiting > 0:
+            return 0.05
+
+        limit = self._weight_limit if is_order else self._market_data_limit
+        if self._used_weight + weight > limit:
+            return 60 - now % 60
+        if orders > 0:
+            if self._orders_1m + orders > self._order_limit_1m:
+                return 60 - now % 60
+            if self._orders_10s + orders > self._order_limit_10s:
+                return 10 - now % 10
+        return 0
+
+    def acquire(self, method: str, endpoint: str, params: typing.Dict):
+        weight = request_weight(method, endpoint, params)
+        orders = order_count(method, endpoint, params)
+        is_order = endpoint in ORDER_ENDPOINTS and method != "GET"
+
+        with self._cond:
+            if is_order:
+                self._orders_waiting += 1
+            try:
+                while True:
+                    now = time.time()
+                    self._roll(now)
+                    wait = self._wait_time(now, is_order, weight, orders)
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+
+                self._used_weight += weight
+                self._orders_10s += orders
+                self._orders_1m += orders
+            finally:
+                if is_order:
+                    self._orders_waiting -= 1
+                    self._cond.notify_all()
+
+    def try_acquire(self, method: str, endpoint: str, params: typing.Dict, waiting: bool = False) -> float:
+        # Non-blocking variant for event loops: counts the request and returns 0 if it can be sent now,
+        # otherwise returns how long to sleep before trying again, with waiting=True. As with acquire(), an
+        # order request holds back market data requests from its first refused attempt until it is sent, or
+        # until release_wait() if the caller gives up.
+        weight = request_weight(method, endpoint, params)
+        orders = order_count(method, endpoint, params)
+        is_order = endpoint in ORDER_ENDPOINTS and method != "GET"
+
+        with self._cond:
+            now = time.time()
+            self._roll(now)
+            if is_order and waiting:
+                self._orders_waiting -= 1  # Its own registration does not count against it
+            wait = self._wait_time(now, is_order, weight, orders)
+            if wait <= 0:
+                self._used_weight += weight
+                self._orders_10s += orders
+                self._orders_1m += orders
+                if is_order and waiting:
+                    self._cond.notify_all()
+            elif is_order:
+                self._orders_waiting += 1
+            return wait
+
+    def release_wait(self, method: str, endpoint: str):
+        # For a request given up on after try_acquire() asked it to wait
+        if endpoint in ORDER_ENDPOINTS and method != "GET":
+            with self._cond:
+                self._orders_waiting -= 1
+                self._cond.notify_all()
+
+    def update(self, headers: typing.Mapping[str, str]):
+        # Server side counters of the current windows, taken from a response.
+        with self._cond:
+            self._roll(time.time())
+            used_weight = headers.get("X-MBX-USED-WEIGHT-1M")
+            if used_weight is not None:
+                self._used_weight = max(self._used_weight, int(used_weight))
+            orders_10s = headers.get("X-MBX-ORDER-COUNT-10S")
+            if orders_10s is not None:
+                self._orders_10s = max(self._orders_10s, int(orders_10s))
+            orders_1m = headers.get("X-MBX-ORDER-COUNT-1M")
+            if orders_1m is not None:
+                self._orders_1m = max(self._orders_1m, int(orders_1m))
+
+    def back_off(self, retry_after: typing.Optional[int]):
+        # After a 429 (limit exceeded) or 418 (IP banned) response, nothing is sent until Retry-After has passed.
+        with self._cond:
+            delay = retry_after if retry_after is not None else 60
+            self._banned_until = max(self._banned_until, time.time() + delay)
+            logger.warning("Binance rate limit hit, pausing REST requests for %s seconds", delay)
+
+    @property
+    def used_weight(self) -> int:
+        return self._used_weight
+
+
+_limiters = dict()
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(base_url: str) -> RateLimiter:
+    # Limits apply per IP and account, so every client talking to the same API shares one limiter.
+    with _limiters_lock:
+        if base_url not in _limiters:
+            _limiters[base_url] = RateLimiter()
+        return _limiters[base_url]
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import typing
+import zlib
+
+logger = logging.getLogger()
+
+# Kinds of records
+WS_FRAME = 0
+USER_DATA_FRAME = 1
+REST_RESPONSE = 2
+
+# The log is a sequence of zlib compressed blocks, each prefixed by its compressed length (uint32). A block
+# holds records made of kind (uint8), receive time (float64, seconds since the epoch) and payload length
+# (uint32), followed by the UTF-8 payload. REST payloads are JSON objects with method, endpoint, params and
+# body (the response text).
+_BLOCK = struct.Struct("<I")
+_RECORD = struct.Struct("<BdI")
+
+BLOCK_SIZE = 256 * 1024  # Uncompressed bytes per block
+FLUSH_INTERVAL = 1.0  # Seconds before a partial block is written anyway
+
+_UNRECORDED_PARAMS = ("signature", "timestamp")
+
+
+class Recorder:
+    # Append-only log of what a BinanceFutureClient receives. The record_* methods only put a tuple on a queue;
+    # serialization, compression and disk writes happen on a background thread. close() writes what is left.
+    def __init__(self, path: str, block_size: int = BLOCK_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self._block_size = block_size
+        self._flush_interval = flush_interval
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def record_frame(self, message: str, kind: int = WS_FRAME):
+        self._queue.put((kind, time.time(), message))
+
+    def record_response(self, method: str, endpoint: str, params: typing.Dict, body: str):
+        self._queue.put((REST_RESPONSE, time.time(), (method, endpoint, params, body)))
+
+    def _write(self):
+        buffer = bytearray()
+        last_flush = time.monotonic()
+        with open(self.path, "ab") as f:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self._flush_interval)
+                except queue.Empty:
+                    item = None
+
+                if item is not None and item[0] is not None:
+                    kind, received, payload = item
+                    if kind == REST_RESPONSE:
+                        method, endpoint, params, body = payload
+                        params = {k: v for k, v in params.items() if k not in _UNRECORDED_PARAMS}
+                        payload = json.dumps({"method": method, "endpoint": endpoint, "params": params,
+                                              "body": body}, separators=(",", ":"))
+                    data = payload.encode()
+                    buffer += _RECORD.pack(kind, received, len(data))
+                    buffer += data
+
+                closing = item is not None and item[0] is None
+                if len(buffer) >= self._block_size or (len(buffer) > 0 and (
+                        closing or time.monotonic() - last_flush >= self._flush_interval)):
+                    block = zlib.compress(bytes(buffer), 6)
+                    try:
+                        f.write(_BLOCK.pack(len(block)))
+                        f.write(block)
+                        f.flush()
+                    except OSError as e:
+                        logger.error("Could not write to the market data log %s: %s", self.path, e)
+                    buffer = bytearray()
+                    last_flush = time.monotonic()
+
+                if closing:
+                    item[1].set()
+                    return
+
+    def close(self):
+        done = threading.Event()
+        self._queue.put((None, done, None))
+        done.wait()
+
+
+def read_records(path: str) -> typing.Iterator[typing.Tuple[int, float, str]]:
+    # (kind, receive time, payload) of every record, in the order they were received. A block cut short
+    # by a crash ends the log.
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(_BLOCK.size)
+            if len(header) < _BLOCK.size:
+                return
+            block = f.read(_BLOCK.unpack(header)[0])
+            try:
+                data = zlib.decompress(block)
+            except zlib.error:
+                logger.warning("Market data log %s ends with an incomplete block", path)
+                return
+
+            offset = 0
+            while offset < len(data):
+                kind, received, length = _RECORD.unpack_from(data, offset)
+                offset += _RECORD.size
+                yield kind, received, data[offset:offset + length].decode()
+                offset += length
@@ -0,0 +1,149 @@
+import bisect
+import itertools
+import json
+import logging
+import threading
+import time
+import typing
+
+from models import *
+from connectors.binance_futures import BinanceFutureClient
+from connectors.recorder import WS_FRAME, USER_DATA_FRAME, REST_RESPONSE, read_records
+
+logger = logging.getLogger()
+
+
+class ReplayClient(BinanceFutureClient):
+    # BinanceFutureClient fed from a Recorder log instead of the network, so that the interface and the
+    # strategies run offline on exactly the frames a live session received. Frames go through the same
+    # _on_message code at their original pace (speed=1), N times faster (speed=N) or as fast as possible
+    # (speed=None). REST calls are answered with the latest response recorded for the same endpoint, symbol
+    # and interval at the current replay time, except klines: they are served from every page recorded so far
+    # within the startTime / endTime / limit of the request, so that paging ends as it does live. Orders are
+    # filled immediately at the replayed top of book and reported through the account store as the user data
+    # stream would.
+    def __init__(self, path: str, speed: typing.Optional[float] = 1.0, start: bool = True):
+        self._path = path
+        self.speed = speed
+        self._recorder = None
+        self._secret_key = ""
+
+        self._init_state()
+
+        self.replay_time = None  # Receive time of the last replayed frame
+        self.finished = threading.Event()
+        self._order_ids = itertools.count(1)
+
+        self._responses = dict()  # (method, endpoint, symbol, interval) -> ([receive times], [bodies])
+        for kind, received, payload in read_records(path):
+            if kind == REST_RESPONSE:
+                response = json.loads(payload)
+                params = response['params']
+                key = (response['method'], response['endpoint'], params.get('symbol'), params.get('interval'))
+                times, bodies = self._responses.setdefault(key, ([], []))
+                times.append(received)
+                bodies.append(response['body'])
+
+        self.contracts = self.get_contracts(use_cache=False)
+        account_data = self.get_account()
+        if account_data is not None:
+            self.account.load_account(account_data)
+
+        if start:
+            self.start()
+
+    def start(self):
+        threading.Thread(target=self._replay, daemon=True).start()
+
+    def _replay(self):
+        first = None
+        start = time.monotonic()
+        for kind, received, payload in read_records(self._path):
+            if kind == REST_RESPONSE:
+                continue
+            if first is None:
+                first = received
+            if self.speed:
+                wait = (received - first) / self.speed - (time.monotonic() - start)
+                if wait > 0:
+                    time.sleep(wait)
+
+            self.replay_time = received
+            try:
+                if kind == WS_FRAME:
+                    self._on_message(None, payload)
+                elif kind == USER_DATA_FRAME:
+                    self._user_stream._on_message(None, payload)
+            except Exception as e:
+                logger.error("Error while replaying a message: %s", e)
+
+        self._add_logs("Replay of %s finished" % self._path)
+        self.finished.set()
+
+    def _make_request(self, method: str, endpoint: str, data: typing.Dict):
+        recorded = self._responses.get((method, endpoint, data.get('symbol'), data.get('interval')))
+        if recorded is None:
+            logger.warning("No recorded response for %s %s %s", method, endpoint, data.get('symbol', ""))
+            return None
+        times, bodies = recorded
+        idx = 0
+        if self.replay_time is not None:
+            idx = max(0, bisect.bisect_right(times, self.replay_time) - 1)
+        if endpoint == "/fapi/v1/klines":
+            return self._klines_page(bodies[:idx + 1], data)
+        return json.loads(bodies[idx])
+
+    @staticmethod
+    def _klines_page(bodies: typing.List[str], data: typing.Dict) -> typing.List[typing.List]:
+        # Candles of the recorded pages within the bounds of the request, picked as Binance does: the oldest
+        # ones from startTime if it is set, otherwise the most recent ones up to endTime
+        candles = dict()  # Open time -> kline, later recordings replacing earlier ones
+        for body in bodies:
+            for kline in json.loads(body):
+                candles[kline[0]] = kline
+        start_time = data.get('startTime', 0)
+        end_time = data.get('endTime', float("inf"))
+        klines = [candles[open_time] for open_time in sorted(candles) if start_time <= open_time <= end_time]
+        limit = int(data.get('limit', 500))
+        return klines[:limit] if 'startTime' in data else klines[-limit:]
+
+    def _save_exchange_info(self, symbols_info: typing.List[typing.Dict]):
+        pass
+
+    def subscribe_channel(self, contracts: typing.List[Contract], channel: str):
+        pass  # Every recorded frame is replayed anyway
+
+    def unsubscribe_channel(self, contracts: typing.List[Contract], channel: str):
+        pass
+
+    def _call_on_stream_thread(self, stream: str, callback: typing.Callable) -> bool:
+        return False  # Prices only come from the replayed frames
+
+    def get_latency_stats(self) -> typing.Dict[str, typing.Dict[str, float]]:
+        return dict()
+
+    def place_order(self, contract: Contract, side: str, quantity: float, order_type: str, price=None, timeinforce=None,
+                    client_order_id=None) -> OrderStatus:
+        snapshot = self.prices.snapshot(contract.symbol)
+        if price is None:
+            if snapshot is None:
+                logger.warning("No replayed price to fill a %s order on %s", side, contract.symbol)
+                return None
+            price = snapshot[1] if side == "BUY" else snapshot[0]
+
+        order_id = next(self._order_ids)
+        update_time = int((self.replay_time or time.time()) * 1000)
+        # Same fields as an ORDER_TRADE_UPDATE event, so the account store and its listeners see the fill
+        self.account.on_order_update({'s': contract.symbol, 'c': client_order_id or "replay-%d" % order_id,
+                                      'S': side, 'X': "FILLED", 'i': order_id, 'ap': str(price),
+                                      'z': contract.format_quantity(quantity), 'T': update_time})
+        return self.account.get_order(order_id)
+
+    def place_batch_orders(self, orders: typing.List[typing.Dict]) -> typing.List[typing.Optional[OrderStatus]]:
+        return [self.place_order(self.contracts[order['symbol']], order['side'], float(order['quantity']),
+                                 order['type'], float(order['price']) if 'price' in order else None,
+                                 order.get('timeInForce'), order.get('newClientOrderId')) for order in orders]
+
+    def cancel_order(self, contract: Contract, order_id: int) -> OrderStatus:
+        logger.warning("Order %s cannot be cancelled: replayed orders are filled immediately", order_id)
+        return None
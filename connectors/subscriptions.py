@@ -0,0 +1,224 @@
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+import typing
+
+import websocket
+
+from metrics import metrics
+
+logger = logging.getLogger()
+
+MAX_STREAMS_PER_CONNECTION = 200  # Binance futures limit of streams per websocket connection
+MIN_SEND_INTERVAL = 0.11  # Binance accepts at most 10 incoming messages per second per connection
+
+
+class _Shard:
+    # One websocket connection carrying up to MAX_STREAMS_PER_CONNECTION streams. The connection thread only
+    # queues the raw frames; a decode worker per shard handles them, so a burst on one connection does not
+    # delay the frames of the others. SUBSCRIBE / UNSUBSCRIBE messages are queued too and sent by a sender
+    # thread at most every MIN_SEND_INTERVAL, so subscribing never blocks the caller (often the Tk thread).
+    def __init__(self, manager: "SubscriptionManager", shard_id: int):
+        self._manager = manager
+        self.shard_id = shard_id
+        self.streams = set()
+
+        self.ws = None
+        self._connected = False
+        self._closed = False
+        self._ws_id = 1
+
+        self._frames = queue.Queue()
+        self._outbox = queue.Queue()  # (method, streams) to send, None stops the sender
+
+        threading.Thread(target=self._start_ws, daemon=True).start()
+        threading.Thread(target=self._decode, daemon=True).start()
+        threading.Thread(target=self._send_messages, daemon=True).start()
+
+    def _start_ws(self):
+        reconnects = metrics.counter("ws_reconnects", connection=str(self.shard_id))
+        first = True
+        while not self._closed:
+            if not first:
+                reconnects.inc()
+            first = False
+            self.ws = websocket.WebSocketApp(self._manager.wss_url, on_open=self._on_open, on_close=self._on_close,
+                                             on_error=self._on_error, on_message=self._on_message)
+            if self._closed:
+                break  # Closed while the connection was being created
+            try:
+                self.ws.run_forever()
+            except Exception as e:
+                logger.error("Binance Error In run_forever() method (connection %s): %s", self.shard_id, e)
+            self._connected = False
+            time.sleep(2)
+
+    def _on_open(self, ws):
+        logger.info("Binance connection %s opened", self.shard_id)
+        self._connected = True
+        # Restores the subscriptions after a reconnection
+        streams = list(self.streams)
+        if len(streams) > 0:
+            self.send("SUBSCRIBE", streams)
+
+    def _on_close(self, ws, *args):
+        self._connected = False
+        logger.warning("Binance connection %s closed", self.shard_id)
+
+    def _on_error(self, ws, error):
+        logger.error("Binance connection %s error: %s", self.shard_id, error)
+
+    def _on_message(self, ws, message: str):
+        self._frames.put(message)
+
+    def call_soon(self, callback: typing.Callable):
+        self._frames.put(callback)
+
+    def _decode(self):
+        handler = self._manager.on_message
+        while True:
+            message = self._frames.get()
+            if message is None:
+                return
+            try:
+                if message.__class__ is str:
+                    handler(self.ws, message)
+                else:
+                    message()  # Queued with call_soon()
+            except Exception as e:
+                logger.error("Error while handling Binance message on connection %s: %s", self.shard_id, e)
+
+    def send(self, method: str, streams: typing.List[str]):
+        # Returns at once, the message is sent by the sender thread
+        self._outbox.put((method, streams))
+
+    def _send_messages(self):
+        last_send = 0.0
+        item = self._outbox.get()
+        while item is not None:
+            wait = last_send + MIN_SEND_INTERVAL - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+            # Consecutive messages of the same kind queued meanwhile go out as one, in order
+            method, streams = item[0], list(item[1])
+            item = False
+            while item is False:
+                try:
+                    following = self._outbox.get_nowait()
+                except queue.Empty:
+                    break
+                if following is not None and following[0] == method:
+                    streams.extend(following[1])
+                else:
+                    item = following
+            streams = list(dict.fromkeys(streams))
+
+            if self._connected:  # Otherwise _on_open subscribes every stream of the shard once connected
+                data = {"method": method, "params": streams, "id": self._ws_id}
+                try:
+                    self.ws.send(json.dumps(data))
+                except Exception as e:
+                    logger.error("Websocket Error While Sending %s for %s streams: %s", method, len(streams), e)
+                self._ws_id += 1
+                last_send = time.monotonic()
+
+            if item is False:
+                item = self._outbox.get()
+
+    def close(self):
+        self._closed = True
+        self._frames.put(None)
+        self._outbox.put(None)
+        if self.ws is not None:
+            self.ws.close()
+
+
+class SubscriptionManager:
+    # Reference counted stream subscriptions spread over as many websocket connections as needed.
+    # Streams are only subscribed while somebody uses them (watchlist rows, running strategies...), and
+    # are unsubscribed when the last user releases them; a connection is closed with its last stream.
+    # shard_factory(manager, shard_id) creates the connections, threaded _Shard objects by default; anything
+    # with a `streams` set and send(), call_soon() and close() methods callable from any thread will do.
+    def __init__(self, wss_url: str, on_message: typing.Callable,
+                 max_streams_per_connection: int = MAX_STREAMS_PER_CONNECTION,
+                 shard_factory: typing.Optional[typing.Callable] = None):
+        self.wss_url = wss_url
+        self.on_message = on_message
+        self._max_streams = max_streams_per_connection
+        self._shard_factory = shard_factory if shard_factory is not None else _Shard
+
+        self._shards = []
+        self._shard_ids = itertools.count()
+        self._ref_counts = dict()  # Stream -> number of users
+        self._stream_shard = dict()  # Stream -> _Shard
+        self._lock = threading.Lock()
+
+    def subscribe(self, streams: typing.List[str]):
+        to_send = dict()  # _Shard -> new streams
+        with self._lock:
+            for stream in streams:
+                self._ref_counts[stream] = self._ref_counts.get(stream, 0) + 1
+                if self._ref_counts[stream] > 1:
+                    continue
+                shard = self._shard_with_room()
+                shard.streams.add(stream)
+                self._stream_shard[stream] = shard
+                to_send.setdefault(shard, []).append(stream)
+
+        for shard, new_streams in to_send.items():
+            shard.send("SUBSCRIBE", new_streams)
+
+    def unsubscribe(self, streams: typing.List[str]):
+        to_send = dict()
+        with self._lock:
+            for stream in streams:
+                if stream not in self._ref_counts:
+                    continue
+                self._ref_counts[stream] -= 1
+                if self._ref_counts[stream] > 0:
+                    continue
+                del self._ref_counts[stream]
+                shard = self._stream_shard.pop(stream)
+                shard.streams.discard(stream)
+                to_send.setdefault(shard, []).append(stream)
+
+            # A connection left without streams is closed rather than kept open idle
+            closed = [shard for shard in to_send if len(shard.streams) == 0]
+            for shard in closed:
+                self._shards.remove(shard)
+                del to_send[shard]
+
+        for shard in closed:
+            shard.close()
+        for shard, old_streams in to_send.items():
+            shard.send("UNSUBSCRIBE", old_streams)
+
+    def _shard_with_room(self):
+        for shard in self._shards:
+            if len(shard.streams) < self._max_streams:
+                return shard
+        shard = self._shard_factory(self, next(self._shard_ids))
+        self._shards.append(shard)
+        return shard
+
+    def call_soon(self, stream: str, callback: typing.Callable) -> bool:
+        # Calls callback() on the thread handling the frames of a stream, after the frames already received,
+        # e.g. to write data of the stream from elsewhere without a second writer. False if not subscribed.
+        with self._lock:
+            shard = self._stream_shard.get(stream)
+        if shard is None:
+            return False
+        shard.call_soon(callback)
+        return True
+
+    @property
+    def streams(self) -> typing.List[str]:
+        return list(self._ref_counts.keys())
+
+    def close(self):
+        for shard in self._shards:
+            shard.close()
@@ -0,0 +1,82 @@
+import logging
+import threading
+import time
+import typing
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import metrics
+from connectors.rate_limiter import RateLimiter
+
+logger = logging.getLogger()
+
+
+class HttpTransport:
+    # Keep-alive HTTP session shared by every REST call of a client. Connections are pooled per host and
+    # reused, so an order does not pay for a new TCP+TLS handshake.
+    def __init__(self, base_url: str, headers: typing.Dict[str, str], rate_limiter: typing.Optional[RateLimiter] = None,
+                 pool_size: int = 10, retries: int = 3, backoff: float = 0.2,
+                 timeout: typing.Tuple[float, float] = (3.05, 10)):
+        self._base_url = base_url
+        self._timeout = timeout
+        self._rate_limiter = rate_limiter
+
+        # Read errors and 5xx responses are only retried for idempotent methods: retrying an order
+        # that may have reached the matching engine could duplicate it. Connection errors are retried
+        # for every method since the request never left.
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries, backoff_factor=backoff,
+                      status_forcelist=(500, 502, 503, 504), allowed_methods=frozenset(["GET", "PUT", "DELETE"]),
+                      raise_on_status=False, respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self._session = requests.Session()
+        self._session.headers.update(headers)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        # Endpoint -> LatencyHistogram, and (endpoint, status) -> Counter, both also in the metrics registry
+        self.latencies = dict()
+        self._status_counters = dict()
+        self._metrics_lock = threading.Lock()
+
+    def request(self, method: str, endpoint: str, params: typing.Dict) -> requests.Response:
+        # Raises requests exceptions on connection errors, once the retries are exhausted.
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire(method, endpoint, params)
+
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = self._session.request(method, self._base_url + endpoint, params=params, timeout=self._timeout)
+            status = response.status_code
+        finally:
+            self._record(endpoint, status, time.perf_counter() - start)
+
+        if self._rate_limiter is not None:
+            self._rate_limiter.update(response.headers)
+            if response.status_code in (418, 429):
+                retry_after = response.headers.get("Retry-After")
+                self._rate_limiter.back_off(int(retry_after) if retry_after is not None else None)
+        return response
+
+    def _record(self, endpoint: str, status, seconds: float):
+        histogram = self.latencies.get(endpoint)
+        if histogram is None:
+            histogram = metrics.histogram("http_request_seconds", endpoint=endpoint)
+            self.latencies[endpoint] = histogram
+        histogram.record(seconds)
+
+        with self._metrics_lock:
+            counter = self._status_counters.get((endpoint, status))
+            if counter is None:
+                counter = metrics.counter("http_responses", endpoint=endpoint, status=str(status))
+                self._status_counters[(endpoint, status)] = counter
+            counter.inc()
+
+    def latency_snapshot(self) -> typing.Dict[str, typing.Dict[str, float]]:
+        return {endpoint: histogram.snapshot() for endpoint, histogram in list(self.latencies.items())}
+
+    def close(self):
+        self._session.close()
@@ -0,0 +1,183 @@
+import collections
+import json
+import logging
+import threading
+import typing
+
+import websocket
+
+from models import *
+from metrics import metrics
+from connectors.recorder import USER_DATA_FRAME
+
+logger = logging.getLogger()
+
+LISTEN_KEY_KEEPALIVE = 30 * 60  # Seconds between two keepalives, a listen key expires after 60 minutes without one
+MAX_CLOSED_ORDERS = 1000  # Finished orders kept in the store after their last update
+FINAL_ORDER_STATUSES = ("FILLED", "CANCELED", "EXPIRED", "REJECTED", "EXPIRED_IN_MATCH")
+
+
+class AccountStore:
+    # Orders, positions and balances of the account, seeded from /fapi/v2/account and then kept up to date by
+    # the user data stream. The dictionaries are updated in place so that references to them stay current.
+    # Order listeners are called as listener(order_status) on the user data stream thread.
+    def __init__(self):
+        self.orders = dict()  # Order id -> OrderStatus
+        self.positions = dict()  # (symbol, position side) -> Position
+        self.balances = dict()  # Asset -> Balance
+        self.leverage = dict()  # Symbol -> leverage, flat positions included
+
+        self._closed_orders = collections.deque()
+        self._order_listeners = []
+        self._lock = threading.Lock()
+
+    def add_order_listener(self, listener: typing.Callable):
+        self._order_listeners = self._order_listeners + [listener]
+
+    def remove_order_listener(self, listener: typing.Callable):
+        self._order_listeners = [cb for cb in self._order_listeners if cb != listener]
+
+    def load_account(self, account_data: typing.Dict):
+        # Response of /fapi/v2/account, also used to resynchronize after a user data stream reconnection
+        with self._lock:
+            for a in account_data['assets']:
+                self.balances[a['asset']] = Balance(a)
+            for p in account_data.get('positions', []):
+                if 'leverage' in p:
+                    self.leverage[p['symbol']] = float(p['leverage'])
+                position = Position(p)
+                self._set_position(position)
+
+    def _set_position(self, position: Position):
+        key = (position.symbol, position.position_side)
+        if position.amount == 0:
+            self.positions.pop(key, None)
+        else:
+            self.positions[key] = position
+
+    def on_order_update(self, order_info: typing.Dict):
+        order = OrderStatus.from_stream(order_info)
+        with self._lock:
+            previous = self.orders.get(order.order_id)
+            if previous is not None and previous.update_time > order.update_time:
+                return  # Out of order event
+            self.orders[order.order_id] = order
+            if order.status in FINAL_ORDER_STATUSES and (previous is None or
+                                                         previous.status not in FINAL_ORDER_STATUSES):
+                self._closed_orders.append(order.order_id)
+                if len(self._closed_orders) > MAX_CLOSED_ORDERS:
+                    self.orders.pop(self._closed_orders.popleft(), None)
+
+        for listener in self._order_listeners:
+            listener(order)
+
+    def on_account_update(self, account_info: typing.Dict):
+        with self._lock:
+            for b in account_info.get('B', []):
+                balance = self.balances.get(b['a'])
+                if balance is None:
+                    self.balances[b['a']] = Balance({'initialMargin': 0, 'maintMargin': 0, 'marginBalance': b['wb'],
+                                                     'walletBalance': b['wb'], 'unrealizedProfit': 0})
+                else:
+                    balance.wallet_balance = float(b['wb'])
+                    balance.margin_balance = balance.wallet_balance + balance.unrealized_pnl
+            for p in account_info.get('P', []):
+                self._set_position(Position.from_stream(p))
+
+    def on_config_update(self, config_info: typing.Dict):
+        # "ac" object of an ACCOUNT_CONFIG_UPDATE event, sent when the leverage of a symbol changes
+        if 's' in config_info and 'l' in config_info:
+            self.leverage[config_info['s']] = float(config_info['l'])
+
+    def on_event(self, data: typing.Dict):
+        # Any user data stream event, those that do not concern the store are ignored
+        event = data.get('e')
+        if event == 'ORDER_TRADE_UPDATE':
+            self.on_order_update(data['o'])
+        elif event == 'ACCOUNT_UPDATE':
+            self.on_account_update(data['a'])
+        elif event == 'ACCOUNT_CONFIG_UPDATE':
+            self.on_config_update(data.get('ac', dict()))
+
+    def get_order(self, order_id: int) -> typing.Optional[OrderStatus]:
+        return self.orders.get(order_id)
+
+
+class UserDataStream:
+    # Listen key management and user data websocket of a BinanceFutureClient. The listen key is created when
+    # the connection opens, kept alive every LISTEN_KEY_KEEPALIVE seconds and renewed (by reconnecting) if
+    # Binance reports it expired. After a reconnection the store is resynchronized from the REST account
+    # endpoint, since the events sent while disconnected are lost.
+    def __init__(self, client, store: AccountStore):
+        self._client = client
+        self.store = store
+
+        self.listen_key = None
+        self.ws = None
+        self._connections = 0
+        self._closed = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._start_ws, daemon=True).start()
+        threading.Thread(target=self._keepalive, daemon=True).start()
+
+    def _start_ws(self):
+        reconnects = metrics.counter("ws_reconnects", connection="user_data")
+        first = True
+        while not self._closed.is_set():
+            if not first:
+                reconnects.inc()
+            first = False
+            # Returns the current key, with its validity extended, if it has not expired yet
+            response = self._client._make_request("POST", "/fapi/v1/listenKey", dict())
+            if response is not None:
+                self.listen_key = response['listenKey']
+                self.ws = websocket.WebSocketApp(self._client._wss_url + "/" + self.listen_key,
+                                                 on_open=self._on_open, on_close=self._on_close,
+                                                 on_error=self._on_error, on_message=self._on_message)
+                try:
+                    self.ws.run_forever()
+                except Exception as e:
+                    logger.error("Binance Error In user data stream run_forever() method: %s", e)
+            self._closed.wait(2)
+
+    def _keepalive(self):
+        while not self._closed.wait(LISTEN_KEY_KEEPALIVE):
+            if self.listen_key is None:
+                continue
+            if self._client._make_request("PUT", "/fapi/v1/listenKey", dict()) is None:
+                logger.warning("Binance listen key keepalive failed, reconnecting the user data stream")
+                if self.ws is not None:
+                    self.ws.close()
+
+    def _on_open(self, ws):
+        logger.info("Binance user data stream opened")
+        self._connections += 1
+        if self._connections > 1:
+            account_data = self._client.get_account()
+            if account_data is not None:
+                self.store.load_account(account_data)
+
+    def _on_close(self, ws, *args):
+        logger.warning("Binance user data stream closed")
+
+    def _on_error(self, ws, error):
+        logger.error("Binance user data stream error: %s", error)
+
+    def _on_message(self, ws, message: str):
+        if self._client._recorder is not None:
+            self._client._recorder.record_frame(message, USER_DATA_FRAME)
+
+        data = json.loads(message)
+        if data.get('e') == 'listenKeyExpired':
+            logger.warning("Binance listen key expired, reconnecting the user data stream")
+            ws.close()
+        else:
+            self.store.on_event(data)
+
+    def close(self):
+        self._closed.set()
+        if self.ws is not None:
+            self.ws.close()
+        if self.listen_key is not None:
+            self._client._make_request("DELETE", "/fapi/v1/listenKey", dict())
@@ -0,0 +1,269 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import typing
+
+from models import *
+
+logger = logging.getLogger()
+
+FLUSH_INTERVAL = 1.0  # Seconds before the rows waiting are written anyway
+BATCH_SIZE = 500  # Rows written per transaction at most
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id TEXT PRIMARY KEY,  -- client order id of the entry order
+    time INTEGER NOT NULL,  -- entry time, milliseconds since the epoch
+    symbol TEXT NOT NULL,
+    strategy TEXT NOT NULL,  -- strategy type (Technical, Breakout...), descriptive only
+    side TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    entry_price REAL NOT NULL,
+    exit_price REAL,
+    status TEXT NOT NULL,
+    pnl REAL NOT NULL,
+    updated INTEGER NOT NULL,
+    strategy_id TEXT  -- Strategy.strategy_id, NULL for the trades journaled before it existed
+);
+CREATE INDEX IF NOT EXISTS trades_time ON trades (time);
+CREATE INDEX IF NOT EXISTS trades_symbol_time ON trades (symbol, time);
+DROP INDEX IF EXISTS trades_strategy_time;
+
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER PRIMARY KEY,
+    client_order_id TEXT,
+    symbol TEXT,
+    side TEXT,
+    status TEXT NOT NULL,
+    avg_price REAL NOT NULL,
+    executed_qty REAL NOT NULL,
+    update_time INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_update_time ON orders (update_time);
+CREATE INDEX IF NOT EXISTS orders_symbol_update_time ON orders (symbol, update_time);
+CREATE INDEX IF NOT EXISTS orders_client_order_id ON orders (client_order_id);
+"""
+
+# Journals created before the strategy_id column get it on opening
+_MIGRATION = """
+ALTER TABLE trades ADD COLUMN strategy_id TEXT;
+"""
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS trades_strategy_id_time ON trades (strategy_id, time);
+"""
+
+_UPSERT_TRADE = """
+INSERT INTO trades (id, time, symbol, strategy, side, quantity, entry_price, exit_price, status, pnl, updated,
+                    strategy_id)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET entry_price = excluded.entry_price, exit_price = excluded.exit_price,
+    status = excluded.status, pnl = excluded.pnl, updated = excluded.updated
+"""
+
+# An order keeps its latest known state: an update older than the stored one is ignored
+_UPSERT_ORDER = """
+INSERT INTO orders (order_id, client_order_id, symbol, side, status, avg_price, executed_qty, update_time)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (order_id) DO UPDATE SET client_order_id = COALESCE(excluded.client_order_id, client_order_id),
+    symbol = COALESCE(excluded.symbol, symbol), side = COALESCE(excluded.side, side), status = excluded.status,
+    avg_price = excluded.avg_price, executed_qty = excluded.executed_qty, update_time = excluded.update_time
+WHERE excluded.update_time >= orders.update_time
+"""
+
+_TRADE = 0
+_ORDER = 1
+
+REPORT_GROUPS = {
+    "strategy": "strategy_id",
+    "symbol": "symbol",
+    "day": "date(time / 1000, 'unixepoch')",
+    "month": "strftime('%Y-%m', time / 1000, 'unixepoch')",
+}
+
+
+class _StoredStrategy:
+    # Stands for the strategy of a trade loaded from the journal, which no longer runs
+    def __init__(self, strat_name: str, strategy_id: typing.Optional[str]):
+        self.strat_name = strat_name
+        self.strategy_id = strategy_id
+
+
+class TradeJournal:
+    # SQLite journal of the trades and orders, in WAL mode so that reads never wait for the writer. The
+    # record_* methods copy the fields into a tuple and put it on a queue, the rows are written on a
+    # background thread, up to BATCH_SIZE per transaction, at least every FLUSH_INTERVAL seconds. A trade is
+    # one row updated as it changes, an order one row holding its latest state. Reads open their own
+    # connection and can run on any thread.
+    def __init__(self, path: str = "journal.db", flush_interval: float = FLUSH_INTERVAL, batch_size: int = BATCH_SIZE):
+        self.path = path
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(_SCHEMA)
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(trades)")]
+        if "strategy_id" not in columns:
+            connection.executescript(_MIGRATION)
+        connection.executescript(_INDEXES)
+        connection.close()
+
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.execute("PRAGMA synchronous=NORMAL")  # Durable across application crashes in WAL mode
+        return connection
+
+    def record_trade(self, trade: Trade):
+        self._queue.put((_TRADE, (trade.client_order_id, trade.time, trade.contract.symbol, trade.strategy.strat_name,
+                                  trade.side, trade.quantity, trade.entry_price, trade.exit_price, trade.status,
+                                  trade.pnl, int(time.time() * 1000), trade.strategy.strategy_id)))
+
+    def record_order(self, order_status: OrderStatus):
+        # Accepts the results of place_order / cancel_order and the user data stream updates alike
+        if order_status is None:
+            return
+        self._queue.put((_ORDER, (order_status.order_id, order_status.client_order_id, order_status.symbol,
+                                  order_status.side, order_status.status, order_status.avg_price,
+                                  order_status.executed_qty, order_status.update_time or int(time.time() * 1000))))
+
+    def _write(self):
+        connection = self._connect()
+        trades = []
+        orders = []
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self._flush_interval)
+            except queue.Empty:
+                item = None
+
+            if item is not None and item[0] == _TRADE:
+                trades.append(item[1])
+            elif item is not None and item[0] == _ORDER:
+                orders.append(item[1])
+
+            marker = item is not None and item[0] is None  # flush() or close()
+            waiting = len(trades) + len(orders)
+            if waiting >= self._batch_size or (waiting > 0 and (
+                    marker or time.monotonic() - last_flush >= self._flush_interval)):
+                try:
+                    with connection:
+                        connection.executemany(_UPSERT_TRADE, trades)
+                        connection.executemany(_UPSERT_ORDER, orders)
+                except sqlite3.Error as e:
+                    logger.error("Could not write %s rows to the trade journal %s: %s", waiting, self.path, e)
+                trades = []
+                orders = []
+                last_flush = time.monotonic()
+
+            if marker:
+                done, closing = item[1]
+                if closing:
+                    connection.close()
+                done.set()
+                if closing:
+                    return
+
+    def flush(self):
+        # Blocks until what was recorded before the call is written
+        done = threading.Event()
+        self._queue.put((None, (done, False)))
+        done.wait()
+
+    def close(self):
+        done = threading.Event()
+        self._queue.put((None, (done, True)))
+        done.wait()
+
+    def load_trades(self, contracts: typing.Dict[str, Contract], limit: int = 10_000,
+                    symbol: typing.Optional[str] = None, strategy_id: typing.Optional[str] = None,
+                    start_time: typing.Optional[int] = None, end_time: typing.Optional[int] = None) -> typing.List[Trade]:
+        # The latest `limit` trades matching the filters, oldest first, e.g. to fill the trades table on
+        # startup. Trades on symbols missing from `contracts` are skipped.
+        where, params = self._filters(symbol, strategy_id, start_time, end_time)
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT id, time, symbol, strategy, side, quantity, entry_price, exit_price, "
+                                      "status, pnl, strategy_id FROM trades" + where + " ORDER BY time DESC LIMIT ?",
+                                      params + [limit]).fetchall()
+        except sqlite3.Error as e:
+            logger.error("Could not read the trade journal %s: %s", self.path, e)
+            return []
+        finally:
+            connection.close()
+
+        trades = []
+        strategies = dict()
+        for trade_id, trade_time, trade_symbol, strat_name, side, quantity, entry_price, exit_price, status, pnl, \
+                strategy_id in reversed(rows):
+            contract = contracts.get(trade_symbol)
+            if contract is None:
+                continue
+            if (strategy_id, strat_name) not in strategies:
+                strategies[(strategy_id, strat_name)] = _StoredStrategy(strat_name, strategy_id)
+            trade = Trade(trade_time, contract, strategies[(strategy_id, strat_name)], side, quantity, entry_price,
+                          trade_id)
+            trade.exit_price = exit_price
+            trade.status = status
+            trade.pnl = pnl
+            trades.append(trade)
+        return trades
+
+    def pnl_report(self, group_by: str = "strategy", symbol: typing.Optional[str] = None,
+                   strategy_id: typing.Optional[str] = None, start_time: typing.Optional[int] = None,
+                   end_time: typing.Optional[int] = None) -> typing.List[typing.Dict]:
+        # Realized PnL of the closed trades per strategy (strategy id, with its type as 'strategy_type'), symbol,
+        # day or month, aggregated by SQLite over the time range (milliseconds since the epoch) so that months of
+        # history are never loaded in memory
+        if group_by not in REPORT_GROUPS:
+            logger.error("Unknown trade report grouping %s, expected one of %s", group_by, list(REPORT_GROUPS))
+            return []
+        where, params = self._filters(symbol, strategy_id, start_time, end_time)
+        where += (" AND " if where else " WHERE ") + "status = 'closed'"
+        group = REPORT_GROUPS[group_by]
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT " + group + ", COUNT(*), SUM(pnl > 0), SUM(pnl), "
+                                      "SUM(CASE WHEN pnl > 0 THEN pnl ELSE 0 END), "
+                                      "SUM(CASE WHEN pnl < 0 THEN pnl ELSE 0 END), MAX(pnl), MIN(pnl), MIN(strategy) "
+                                      "FROM trades" + where + " GROUP BY 1 ORDER BY 1", params).fetchall()
+        except sqlite3.Error as e:
+            logger.error("Could not read the trade journal %s: %s", self.path, e)
+            return []
+        finally:
+            connection.close()
+
+        report = []
+        for key, count, wins, pnl, profit, loss, best, worst, strat_name in rows:
+            entry = {group_by: key, 'trades': count, 'win_rate': wins / count, 'pnl': pnl, 'gross_profit': profit,
+                     'gross_loss': loss, 'best': best, 'worst': worst}
+            if group_by == "strategy":
+                entry['strategy_type'] = strat_name
+            report.append(entry)
+        return report
+
+    @staticmethod
+    def _filters(symbol: typing.Optional[str], strategy_id: typing.Optional[str], start_time: typing.Optional[int],
+                 end_time: typing.Optional[int]) -> typing.Tuple[str, typing.List]:
+        conditions = []
+        params = []
+        if symbol is not None:
+            conditions.append("symbol = ?")
+            params.append(symbol)
+        if strategy_id is not None:
+            conditions.append("strategy_id = ?")
+            params.append(strategy_id)
+        if start_time is not None:
+            conditions.append("time >= ?")
+            params.append(start_time)
+        if end_time is not None:
+            conditions.append("time < ?")
+            params.append(end_time)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
@@ -0,0 +1,198 @@
+import collections
+import itertools
+import logging
+import queue
+import threading
+import time
+import typing
+import zlib
+
+from models import *
+from metrics import metrics
+from database import TradeJournal
+
+logger = logging.getLogger()
+
+# Lower values are sent first: exits must not wait behind new entries
+PRIORITY_CANCEL = 0
+PRIORITY_EXIT = 1
+PRIORITY_ENTRY = 2
+
+MAX_BATCH_ORDERS = 5  # Orders per /fapi/v1/batchOrders request
+RECENT_ORDER_IDS = 10_000  # Acknowledged client order ids remembered to refuse resubmissions
+
+
+class OrderRequest:
+    # One order waiting in the execution queue. The client order id identifies it end to end: it is sent as
+    # newClientOrderId and comes back in the user data stream events.
+    def __init__(self, contract: Contract, side: str, quantity: float, order_type: str, client_order_id: str,
+                 price=None, timeinforce=None, priority: int = PRIORITY_ENTRY, signal: typing.Optional[Signal] = None,
+                 on_ack: typing.Optional[typing.Callable] = None):
+        self.contract = contract
+        self.side = side
+        self.quantity = quantity
+        self.order_type = order_type
+        self.client_order_id = client_order_id
+        self.price = price
+        self.timeinforce = timeinforce
+        self.priority = priority
+        self.signal = signal
+        self.on_ack = on_ack  # on_ack(order_request, order_status), order_status being None if it failed
+        self.created = signal.created if signal is not None else time.perf_counter()
+
+
+class OrderExecutor:
+    # Turns strategy signals (and exit/cancel requests) into orders on a pool of worker threads, so the HTTP
+    # round trips never run on the websocket or Tk threads and one slow request does not hold up the others.
+    # The queue is ordered by priority, and a worker takes up to MAX_BATCH_ORDERS orders at once and sends
+    # them in a single batchOrders request. A client order id can only be queued once while it is in flight
+    # and is then remembered, so the same signal can never produce two orders.
+    def __init__(self, client, workers: int = 4, journal: typing.Optional[TradeJournal] = None):
+        self.client = client
+        self._journal = journal  # Gets the result of every order sent or cancelled
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()  # FIFO order among equal priorities
+
+        self._in_flight = dict()  # Client order id -> OrderRequest, queued or waiting for its acknowledgement
+        self._recent_ids = set()
+        self._recent_order = collections.deque()
+        self._ids_lock = threading.Lock()
+
+        self.latency = metrics.histogram("signal_to_ack_seconds")  # Signal (or submission) to REST acknowledgement
+        self._entry_listeners = []  # listener(order_request, order_status) for every accepted signal order
+
+        self._workers = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def put(self, signal: Signal):
+        # Strategies hand their signals to put(), like they would to a queue. From then on the strategy has an
+        # entry pending, so that a signal on a later candle cannot open a second position before the ack.
+        quantity = self._position_size(signal)
+        if quantity <= 0:
+            self.client._add_logs(f"Not enough {signal.contract.quote_asset} balance for a {signal.strategy.strat_name} "
+                                  f"trade on {signal.contract.symbol}")
+            return
+        signal.strategy.entry_pending = True
+        if not self.submit(OrderRequest(signal.contract, signal.side, quantity, "MARKET", self._signal_order_id(signal),
+                                        priority=PRIORITY_ENTRY, signal=signal, on_ack=self._on_signal_ack)):
+            signal.strategy.entry_pending = False
+
+    def submit(self, order: OrderRequest) -> bool:
+        # False if an order with the same client order id is already in flight or was already sent
+        with self._ids_lock:
+            if order.client_order_id in self._in_flight or order.client_order_id in self._recent_ids:
+                logger.warning("Duplicate order %s ignored", order.client_order_id)
+                return False
+            self._in_flight[order.client_order_id] = order
+        self._queue.put((order.priority, next(self._sequence), order))
+        return True
+
+    def cancel(self, contract: Contract, order_id: int):
+        self._queue.put((PRIORITY_CANCEL, next(self._sequence), (contract, order_id)))
+
+    def add_entry_listener(self, listener: typing.Callable):
+        self._entry_listeners = self._entry_listeners + [listener]
+
+    def remove_entry_listener(self, listener: typing.Callable):
+        self._entry_listeners = [cb for cb in self._entry_listeners if cb != listener]
+
+    @property
+    def in_flight(self) -> typing.List[str]:
+        return list(self._in_flight.keys())
+
+    @staticmethod
+    def _signal_order_id(signal: Signal) -> str:
+        # Same strategy, symbol, side and candle give the same id, also after a restart. 30 characters whatever
+        # the symbol (Binance accepts at most 36 of [.A-Z:/a-z0-9_-]): the symbol only goes in as a checksum
+        return "%s-%s-%d-%08x" % (signal.strategy.strategy_id, signal.side[0], signal.timestamp // 1000,
+                                  zlib.crc32(signal.contract.symbol.encode()))
+
+    def _position_size(self, signal: Signal) -> float:
+        balance = self.client.balances.get(signal.contract.quote_asset)
+        if balance is None:
+            return 0.0
+        quantity = balance.wallet_balance * signal.strategy.balance_pct / 100 / signal.price
+        return signal.contract.round_quantity(quantity)
+
+    def _run(self):
+        while True:
+            _, _, item = self._queue.get()
+            if isinstance(item, tuple):
+                self._cancel(*item)
+                continue
+
+            # Whatever else is already waiting goes in the same request, cancellations are put back
+            batch = [item]
+            while len(batch) < MAX_BATCH_ORDERS:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(entry[2], tuple):
+                    self._queue.put(entry)
+                    break
+                batch.append(entry[2])
+
+            try:
+                self._send(batch)
+            except Exception as e:
+                logger.error("Error while sending %s orders: %s", len(batch), e)
+                for order in batch:
+                    self._acknowledge(order, None)
+
+    def _cancel(self, contract: Contract, order_id: int):
+        try:
+            order_status = self.client.cancel_order(contract, order_id)
+            if order_status is None:
+                self.client._add_logs(f"Cancellation of order {order_id} on {contract.symbol} failed")
+            elif self._journal is not None:
+                self._journal.record_order(order_status)
+        except Exception as e:
+            logger.error("Error while cancelling order %s on %s: %s", order_id, contract.symbol, e)
+
+    def _send(self, batch: typing.List[OrderRequest]):
+        if len(batch) == 1:
+            order = batch[0]
+            results = [self.client.place_order(order.contract, order.side, order.quantity, order.order_type,
+                                               order.price, order.timeinforce, order.client_order_id)]
+        else:
+            results = self.client.place_batch_orders([
+                self.client._order_params(order.contract, order.side, order.quantity, order.order_type, order.price,
+                                          order.timeinforce, order.client_order_id) for order in batch])
+
+        for order, order_status in zip(batch, results):
+            self._acknowledge(order, order_status)
+
+    def _acknowledge(self, order: OrderRequest, order_status: typing.Optional[OrderStatus]):
+        self.latency.record(time.perf_counter() - order.created)
+        if self._journal is not None:
+            self._journal.record_order(order_status)
+        with self._ids_lock:
+            self._in_flight.pop(order.client_order_id, None)
+            if order_status is not None:
+                # A rejected order may be submitted again, an accepted one never
+                self._recent_ids.add(order.client_order_id)
+                self._recent_order.append(order.client_order_id)
+                if len(self._recent_order) > RECENT_ORDER_IDS:
+                    self._recent_ids.discard(self._recent_order.popleft())
+
+        if order.on_ack is not None:
+            try:
+                order.on_ack(order, order_status)
+            except Exception as e:
+                logger.error("Error in acknowledgement callback of order %s: %s", order.client_order_id, e)
+
+    def _on_signal_ack(self, order: OrderRequest, order_status: typing.Optional[OrderStatus]):
+        signal = order.signal
+        if order_status is None or order_status.status in ("REJECTED", "EXPIRED"):
+            signal.strategy.entry_pending = False
+            self.client._add_logs(f"{signal.side} order on {signal.contract.symbol} failed")
+            return
+
+        signal.strategy.ongoing_position = True
+        signal.strategy.entry_pending = False
+        self.client._add_logs(f"{signal.side} {order.quantity} {signal.contract.symbol} order placed "
+                              f"({signal.strategy.strat_name}), status: {order_status.status}")
+        for listener in self._entry_listeners:
+            listener(order, order_status)
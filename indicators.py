@@ -0,0 +1,167 @@
+import threading
+import typing
+
+from models import *
+
+
+class Ema:
+    # Exponential moving average (same recursion as pandas ewm(span=length, adjust=False)).
+    # add() commits a closed candle close, peek() gives the value the EMA would have if the
+    # in-progress candle closed at the given price. Both are O(1).
+    def __init__(self, length: int):
+        self.length = length
+        self._alpha = 2 / (length + 1)
+        self.value = None
+
+    def seed(self, closes: typing.Iterable[float]):
+        # One pass over a column of closes, e.g. CandleSeries.column("close").
+        alpha = self._alpha
+        value = self.value
+        for close in closes:
+            value = close if value is None else value + alpha * (close - value)
+        self.value = value
+
+    def add(self, close: float) -> float:
+        self.value = close if self.value is None else self.value + self._alpha * (close - self.value)
+        return self.value
+
+    def peek(self, price: float) -> float:
+        if self.value is None:
+            return price
+        return self.value + self._alpha * (price - self.value)
+
+
+class Macd:
+    def __init__(self, ema_fast: int, ema_slow: int, ema_signal: int):
+        self._fast = Ema(ema_fast)
+        self._slow = Ema(ema_slow)
+        self._signal = Ema(ema_signal)
+
+        self.last_timestamp = None
+        self.macd_line = None
+        self.signal_line = None
+        self._state = None  # (last timestamp, fast, slow, signal) replaced in one assignment, see checkpoint()
+
+    def seed(self, candles: CandleSeries):
+        # Candles must all be closed: pass candles[:-1] if the last one is still open.
+        if len(candles) == 0:
+            return
+        fast, slow, signal = self._fast, self._slow, self._signal
+        fast_alpha, slow_alpha, signal_alpha = fast._alpha, slow._alpha, signal._alpha
+        fast_value, slow_value, signal_value = fast.value, slow.value, signal.value
+
+        closes = candles.column("close")
+        for close in closes:
+            if fast_value is None:
+                fast_value = slow_value = close
+            else:
+                fast_value += fast_alpha * (close - fast_value)
+                slow_value += slow_alpha * (close - slow_value)
+            macd_line = fast_value - slow_value
+            signal_value = macd_line if signal_value is None else signal_value + signal_alpha * (macd_line - signal_value)
+        closes.release()
+
+        fast.value, slow.value, signal.value = fast_value, slow_value, signal_value
+        self.macd_line = fast_value - slow_value
+        self.signal_line = signal_value
+        self.last_timestamp = candles.last_timestamp()
+        self._state = (self.last_timestamp, fast_value, slow_value, signal_value)
+
+    def add(self, timestamp: int, close: float) -> typing.Tuple[float, float]:
+        # Idempotent per candle so that every strategy sharing this instance can call it.
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return self.macd_line, self.signal_line
+        self.last_timestamp = timestamp
+        self.macd_line = self._fast.add(close) - self._slow.add(close)
+        self.signal_line = self._signal.add(self.macd_line)
+        self._state = (timestamp, self._fast.value, self._slow.value, self._signal.value)
+        return self.macd_line, self.signal_line
+
+    def checkpoint(self) -> typing.Optional[typing.Tuple[int, float, float, float]]:
+        # Consistent from any thread, even while another one adds a candle
+        return self._state
+
+    def restore(self, state: typing.Sequence):
+        timestamp, fast, slow, signal = state
+        self._fast.value, self._slow.value, self._signal.value = fast, slow, signal
+        self.macd_line = fast - slow
+        self.signal_line = signal
+        self.last_timestamp = timestamp
+        self._state = (timestamp, fast, slow, signal)
+
+    def peek(self, price: float) -> typing.Tuple[float, float]:
+        macd_line = self._fast.peek(price) - self._slow.peek(price)
+        return macd_line, self._signal.peek(macd_line)
+
+
+class IndicatorRegistry:
+    # Hands out one indicator instance per (symbol, timeframe, parameters), shared by every
+    # strategy that asks for the same one, and reference counts it so it is dropped with the last user.
+    def __init__(self):
+        self._indicators = dict()  # (symbol, timeframe) -> {parameters: indicator}
+        self._ref_counts = dict()
+        self._checkpoints = dict()  # (symbol, timeframe, parameters) -> state restored on first use
+        self._lock = threading.Lock()
+
+    def get_macd(self, symbol: str, timeframe: str, ema_fast: int, ema_slow: int, ema_signal: int,
+                 history: typing.Optional[CandleSeries] = None) -> Macd:
+        params = ("macd", ema_fast, ema_slow, ema_signal)
+        with self._lock:
+            indicators = self._indicators.setdefault((symbol, timeframe), dict())
+            if params not in indicators:
+                macd = Macd(ema_fast, ema_slow, ema_signal)
+                state = self._checkpoints.pop((symbol, timeframe, params), None)
+                if history is not None:
+                    macd.seed(history)
+                elif state is not None:
+                    macd.restore(state)
+                indicators[params] = macd
+            key = (symbol, timeframe, params)
+            self._ref_counts[key] = self._ref_counts.get(key, 0) + 1
+            return indicators[params]
+
+    def release_macd(self, symbol: str, timeframe: str, ema_fast: int, ema_slow: int, ema_signal: int):
+        params = ("macd", ema_fast, ema_slow, ema_signal)
+        key = (symbol, timeframe, params)
+        with self._lock:
+            if key not in self._ref_counts:
+                return
+            self._ref_counts[key] -= 1
+            if self._ref_counts[key] == 0:
+                del self._ref_counts[key]
+                indicators = self._indicators[(symbol, timeframe)]
+                del indicators[params]
+                if len(indicators) == 0:
+                    del self._indicators[(symbol, timeframe)]
+
+    def checkpoint(self) -> typing.List[typing.Dict]:
+        # State of every indicator in use, as JSON compatible values, to resume them with restore() after
+        # a restart instead of recomputing them over the whole history
+        with self._lock:
+            entries = [(key, params, indicator.checkpoint()) for key, indicators in self._indicators.items()
+                       for params, indicator in indicators.items()]
+            # Restored states not used yet, e.g. of a strategy not switched back on, are kept for a later session
+            entries += [((symbol, timeframe), params, state)
+                        for (symbol, timeframe, params), state in self._checkpoints.items()]
+        checkpoint = []
+        for (symbol, timeframe), params, state in entries:
+            if state is not None:
+                checkpoint.append({'symbol': symbol, 'timeframe': timeframe, 'indicator': params[0],
+                                   'params': list(params[1:]), 'state': list(state)})
+        return checkpoint
+
+    def restore(self, checkpoint: typing.List[typing.Dict]):
+        # Indicators created afterwards with the same parameters start from these states. The strategies
+        # then only add the candles closed since the checkpoint.
+        with self._lock:
+            for entry in checkpoint:
+                params = (entry['indicator'],) + tuple(entry['params'])
+                self._checkpoints[(entry['symbol'], entry['timeframe'], params)] = entry['state']
+
+    def on_candle_closed(self, symbol: str, timeframe: str, timestamp: int, close: float):
+        # Pushes a closed candle to every indicator computed on this symbol and timeframe.
+        indicators = self._indicators.get((symbol, timeframe))
+        if indicators is None:
+            return
+        for indicator in list(indicators.values()):
+            indicator.add(timestamp, close)
@@ -1,8 +1,12 @@
 import tkinter as tk
+import typing
 from datetime import datetime
 
 from interface.styling import *
 
+MAX_LOG_LINES = 500
+
+
 class Logging(tk.Frame):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -12,6 +16,16 @@ class Logging(tk.Frame):
         self.logging_text.pack(side=tk.TOP)
         
     def add_log(self, message:str):
+        self.add_logs([message])
+
+    def add_logs(self, messages: typing.List[str]):
+        # Newest message on top, only the last MAX_LOG_LINES are kept in the widget
+        if len(messages) == 0:
+            return
+        prefix = datetime.now().strftime("%a %H:%M:%S :: ")
+        text = "".join(prefix + message + "\n" for message in reversed(messages[-MAX_LOG_LINES:]))
+
         self.logging_text.configure(state=tk.NORMAL)
-        self.logging_text.insert("1.0", datetime.now().strftime("%a %H:%M:%S :: ") + message + "\n")
+        self.logging_text.insert("1.0", text)
+        self.logging_text.delete("%d.0" % (MAX_LOG_LINES + 1), tk.END)
         self.logging_text.configure(state=tk.DISABLED)
\ No newline at end of file
@@ -1,21 +1,46 @@
 import tkinter as tk
 import time
 import logging
+import typing
 
+from models import *
 from connectors.binance_futures import BinanceFutureClient
 from interface.logging_component import *
+from metrics import metrics
+from execution import OrderExecutor
+from runtime import StrategyRuntime
+from risk import RiskEngine
+from database import TradeJournal
+from workspace import Workspace
+from connectors.backfill import CandleCache, KlineBackfill
 from interface.styling import *
 from interface.watchlist_component import WatchList
-from interface.trades_component import TradesWatch
+from interface.trades_component import TradesWatch, MAX_TRADES
 from interface.strategy_component import StrategyEditor
 
 logger = logging.getLogger()
 
+MIN_REFRESH_INTERVAL = 200  # Milliseconds between two refreshes of the interface while prices move
+MAX_REFRESH_INTERVAL = 1500
+WORKSPACE_SAVE_INTERVAL = 30  # Seconds between two saves of the workspace, which is also saved on close
+
 class Root(tk.Tk):
     def __init__(self, binance: BinanceFutureClient):
         super().__init__()
         self.binance = binance
         
+        # Strategy signals become orders on the executor's workers, strategies run on the runtime's
+        self.journal = TradeJournal("journal.db")
+        binance.account.add_order_listener(self.journal.record_order)
+        self.executor = OrderExecutor(binance, journal=self.journal)
+        # Strategy history comes from the candle cache, indicators resume from the workspace checkpoint
+        self.workspace = Workspace("workspace.json")
+        workspace_state = self.workspace.load()
+        self.strategy_runtime = StrategyRuntime(binance, self.executor,
+                                                backfill=KlineBackfill(binance, CandleCache("cache")))
+        self.strategy_runtime.indicators.restore(workspace_state.get('indicators', []))
+        self.risk = RiskEngine(binance, self.executor, self.journal)
+        
         self.title("ProTactic")
         
         self.configure(bg=BG_COLOR)
@@ -26,46 +51,77 @@ class Root(tk.Tk):
         self._right_frame = tk.Frame(self, bg=BG_COLOR)
         self._right_frame.pack(side=tk.RIGHT)
         
-        self._watchlist_frame = WatchList(self.binance.contracts, self._left_frame, bg=BG_COLOR)
+        self._watchlist_frame = WatchList(self.binance.contracts, self.binance, self._left_frame, bg=BG_COLOR)
         self._watchlist_frame.pack(side=tk.TOP)
         
         self.logging_frame = Logging(self._left_frame, bg=BG_COLOR)
         self.logging_frame.pack(side=tk.TOP)
         
-        self._strategy_frame = StrategyEditor(self, self.binance.contracts, self._right_frame, bg=BG_COLOR)
+        self._strategy_frame = StrategyEditor(self, self.binance.contracts, self.strategy_runtime, self._right_frame,
+                                              bg=BG_COLOR)
         self._strategy_frame.pack(side=tk.TOP)
         
         self._trades_frame = TradesWatch(self._right_frame, bg=BG_COLOR)
         self._trades_frame.pack(side=tk.TOP)
-    
+        self._trades_frame.refresh(self._load_journal_trades())
+
+        self._watchlist_frame.restore(workspace_state.get('watchlist', []))
+        self._strategy_frame.restore(workspace_state.get('strategies', []))
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        self._refresh_interval = MIN_REFRESH_INTERVAL
+        self._refresh_timer = metrics.histogram("stage_seconds", stage="ui_refresh")
         self._update_ui()
+        self.after(WORKSPACE_SAVE_INTERVAL * 1000, self._autosave)
         
         
+    def _load_journal_trades(self) -> typing.List[Trade]:
+        trades = self.journal.load_trades(self.binance.contracts, MAX_TRADES)
+        for trade in trades:
+            if trade.status in ("open", "closing"):
+                # Left open by a session that ended without closing them: the RiskEngine does not track them and
+                # the position may have been closed since, so they are shown, and kept in the journal, as stale
+                trade.status = "stale"
+                self.journal.record_trade(trade)
+        return trades
+
+    def _save_workspace(self):
+        self.workspace.save(self._watchlist_frame.symbols, self._strategy_frame.snapshot(),
+                            self.strategy_runtime.indicators.checkpoint())
+
+    def _autosave(self):
+        # Scheduled on its own rather than from _update_ui, so that a failed save never stops the refreshes
+        try:
+            self._save_workspace()
+        except Exception as e:
+            logger.error("Could not save the workspace: %s", e)
+        finally:
+            self.after(WORKSPACE_SAVE_INTERVAL * 1000, self._autosave)
+
+    def _on_close(self):
+        try:
+            self._save_workspace()
+        except Exception as e:
+            logger.error("Could not save the workspace: %s", e)
+        self.workspace.close()  # Writes the state just saved
+        self.destroy()
+
     def _update_ui(self):
-        for log in self.binance.logs:
-            if not log["displayed"]:
-                self.logging_frame.add_log(log['log'])
-                log["displayed"] = True
-        
-        try:    
-            for key, value in self._watchlist_frame.body_widgets['symbol'].items():
-                symbol = self._watchlist_frame.body_widgets['symbol'][key].cget("text")
-                if symbol not in self.binance.contracts:
-                    continue
-                if symbol not in self.binance.prices:
-                    self.binance.get_bid_ask(self.binance.contracts[symbol])
-                
-                precision = self.binance.contracts[symbol].price_decimals
-                
-                prices = self.binance.prices[symbol]
-                
-                if prices['bid'] is not None:
-                    price_str = "{0:.{prec}f}".format(prices['bid'], prec=precision)
-                    self._watchlist_frame.body_widgets['bid_var'][key].set(prices['bid'])
-                if prices['ask'] is not None:
-                    price_str = "{0:.{prec}f}".format(prices['ask'], prec=precision)
-                    self._watchlist_frame.body_widgets['ask_var'][key].set(prices['ask'])
-        except RuntimeError as e:
-            logger.error("Error while looping through watchlist dictionary: %s", e)
-        
-        self.after(1500, self._update_ui)
\ No newline at end of file
+        # Runs on the Tk thread: it only reads what the websocket threads have already stored, never the network.
+        # The refresh interval shrinks while prices are moving and grows back when nothing changes, and is kept
+        # well above the time the refresh itself takes so the interface stays responsive under load.
+        start = time.perf_counter()
+
+        self.logging_frame.add_logs(self.binance.drain_logs())
+
+        changed = self._watchlist_frame.refresh(self.binance.prices)
+        changed += self._trades_frame.refresh(self.risk.drain_updates())
+
+        if changed > 0:
+            self._refresh_interval = max(MIN_REFRESH_INTERVAL, self._refresh_interval // 2)
+        else:
+            self._refresh_interval = min(MAX_REFRESH_INTERVAL, self._refresh_interval * 2)
+        elapsed = time.perf_counter() - start
+        self._refresh_timer.record(elapsed)
+        elapsed_ms = int(elapsed * 1000)
+        self.after(max(self._refresh_interval, elapsed_ms * 10), self._update_ui)
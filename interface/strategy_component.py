@@ -4,15 +4,21 @@ from tkmacosx import Button
 
 from interface.styling import *
 
-from connectors.binance_futures import BinanceFutureClient
+from models import *
+from runtime import StrategyRuntime
+from strategies import Strategy, TechnicalStrategy, BreakoutStrategy, new_strategy_id
 
 class StrategyEditor(tk.Frame):
-    def __init__(self,root, binance: BinanceFutureClient, *args, **kwargs):
+    def __init__(self,root, contracts: typing.Dict[str, Contract], runtime: StrategyRuntime, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
         self.root = root
         
-        self._all_contracts = list(binance.keys())
+        self._contracts = contracts
+        self._runtime = runtime  # Runs the strategies switched ON, off the Tk thread
+        self._strategies: typing.Dict[int, Strategy] = dict()
+        
+        self._all_contracts = list(contracts.keys())
         self._all_timeframes = ["1m", "5m", "15m", "30m", "1h", "4h"]
         
         
@@ -34,6 +40,7 @@ class StrategyEditor(tk.Frame):
         
         self._additional_parameters = dict()
         self._extra_input = dict()
+        self._strategy_ids = dict()  # Row -> key of its strategy in the client order ids
         
         self._base_params = [
             {"code_name":"strategy_type", "widget": tk.OptionMenu, "data_type":str, "values":["Technical", "Breakout"], "width":10},
@@ -93,6 +100,7 @@ class StrategyEditor(tk.Frame):
         for strat, params in self._extra_params.items():
             for param in params:
                 self._additional_parameters[b_index][param['code_name']] = None
+        self._strategy_ids[b_index] = new_strategy_id()
         
         self._body_index += 1
         
@@ -163,24 +171,90 @@ class StrategyEditor(tk.Frame):
         stop_loss = float(self.body_widgets['stop_loss'][b_index].get())
         
         if self.body_widgets['activation'][b_index].cget("text") == "OFF":
+            contract = self._contracts[symbol]
+            other_params = {param['code_name']: self._additional_parameters[b_index][param['code_name']]
+                            for param in self._extra_params[strat_selected]}
+            if strat_selected == "Technical":
+                new_strategy = TechnicalStrategy(contract, timeframe, balance_pct, take_profit, stop_loss, other_params,
+                                                 self._runtime.signals, self._runtime.indicators,
+                                                 strategy_id=self._strategy_ids[b_index])
+            else:
+                new_strategy = BreakoutStrategy(contract, timeframe, balance_pct, take_profit, stop_loss, other_params,
+                                                self._runtime.signals, strategy_id=self._strategy_ids[b_index])
+            # Only queued here: the history is fetched and the strategy seeded by the runtime
+            self._runtime.start(new_strategy)
+            self._strategies[b_index] = new_strategy
+
             for param in self._base_params:
                 code_name = param['code_name']
                 if code_name != "activation" and "_var" not in code_name:
                     self.body_widgets[code_name][b_index].config(state=tk.DISABLED)
             self.body_widgets["activation"][b_index].config(bg="darkgreen", text="ON")
-            self.root.logging_frame.add_log(f"{strat_selected} strategy on s{symbol}/{timeframe} started")
+            self.root.logging_frame.add_log(f"{strat_selected} strategy on {symbol}/{timeframe} started")
                     
         else:
+            self._stop_strategy(b_index)
             for param in self._base_params:
                 code_name = param['code_name']
-                if code_name != "activation" and "_var" in code_name:
+                if code_name != "activation" and "_var" not in code_name:
                     self.body_widgets[code_name][b_index].config(state=tk.NORMAL)
             self.body_widgets["activation"][b_index].config(bg="darkred", text="OFF")
-            self.root.logging_frame.add_log(f"{strat_selected} strategy on s{symbol}/{timeframe} stopped")
+            self.root.logging_frame.add_log(f"{strat_selected} strategy on {symbol}/{timeframe} stopped")
+        
+    def _stop_strategy(self, b_index:int):
+        strategy = self._strategies.pop(b_index, None)
+        if strategy is not None:
+            self._runtime.stop(strategy)
         
     def _delete_row(self, b_index:int):
+        self._stop_strategy(b_index)
         for element in self._base_params:
-            self.body_widgets[element['code_name']][b_index].grid_forget()
+            self.body_widgets[element['code_name']][b_index].destroy()
             
             del self.body_widgets[element['code_name']][b_index]
-            
\ No newline at end of file
+            if element['code_name'] + "_var" in self.body_widgets:
+                del self.body_widgets[element['code_name'] + "_var"][b_index]
+        del self._additional_parameters[b_index]
+        del self._strategy_ids[b_index]
+
+    def snapshot(self) -> typing.List[typing.Dict]:
+        # The rows as stored in the workspace, see Workspace
+        rows = []
+        for b_index in self.body_widgets['activation']:
+            strat_selected = self.body_widgets['strategy_type_var'][b_index].get()
+            row = {'id': self._strategy_ids[b_index],
+                   'strategy_type': strat_selected,
+                   'contract': self.body_widgets['contract_var'][b_index].get(),
+                   'timeframe': self.body_widgets['timeframe_var'][b_index].get(),
+                   'parameters': {param['code_name']: self._additional_parameters[b_index][param['code_name']]
+                                  for param in self._extra_params[strat_selected]},
+                   'active': self.body_widgets['activation'][b_index].cget("text") == "ON"}
+            for param in ['balance_pct', 'take_profit', 'stop_loss']:
+                try:
+                    row[param] = float(self.body_widgets[param][b_index].get())
+                except ValueError:  # Empty, or still being typed
+                    row[param] = None
+            rows.append(row)
+        return rows
+
+    def restore(self, rows: typing.List[typing.Dict]):
+        # Rebuilds the rows of a workspace snapshot and switches the active strategies back on
+        for row in rows:
+            if row['contract'] not in self._contracts or row['strategy_type'] not in self._extra_params:
+                self.root.logging_frame.add_log(f"{row['strategy_type']} strategy on {row['contract']} not restored")
+                continue
+            b_index = self._body_index
+            self._add_strategy_row()
+            if row.get('id'):
+                self._strategy_ids[b_index] = row['id']
+            self.body_widgets['strategy_type_var'][b_index].set(row['strategy_type'])
+            self.body_widgets['contract_var'][b_index].set(row['contract'])
+            self.body_widgets['timeframe_var'][b_index].set(row['timeframe'])
+            for param in ['balance_pct', 'take_profit', 'stop_loss']:
+                if row.get(param) is not None:
+                    self.body_widgets[param][b_index].insert(tk.END, str(row[param]))
+            for code_name, value in row.get('parameters', dict()).items():
+                if code_name in self._additional_parameters[b_index]:
+                    self._additional_parameters[b_index][code_name] = value
+            if row.get('active'):
+                self._switch_strategy(b_index)
@@ -0,0 +1,212 @@
+import tkinter as tk
+import typing
+from tkmacosx import Button
+
+from interface.styling import *
+
+
+class Column:
+    # text(record) is what a cell displays, sort_key(record) what the column sorts on (the text by default).
+    # A volatile column shows values that change while the record stays in the table, so the view is sorted
+    # and filtered again when a record is updated rather than only when one is added or removed.
+    def __init__(self, header: str, text: typing.Callable, width: int = 10, sort_key: typing.Optional[typing.Callable] = None,
+                 volatile: bool = False):
+        self.header = header
+        self.text = text
+        self.width = width
+        self.sort_key = sort_key if sort_key is not None else text
+        self.volatile = volatile
+
+
+class VirtualTable(tk.Frame):
+    # Table over any number of records with a fixed pool of `visible_rows` rows of labels: only the window of
+    # the sorted and filtered view starting at the scroll position is rendered, and a label is only
+    # reconfigured when its text changes. Records are kept by key, in insertion order until a header is
+    # clicked to sort on its column (clicking again reverses the order). The filter entry keeps the records
+    # that contain its text in any column. With `on_action`, each row ends with a button calling
+    # on_action(key) for the record it shows. Like the other frames, the Tk master follows the table's own
+    # positional arguments; the options are keyword only.
+    def __init__(self, columns: typing.List[Column], visible_rows: int, *args,
+                 on_action: typing.Optional[typing.Callable] = None, action_text: str = "X",
+                 sort_column: typing.Optional[int] = None, sort_reverse: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_model(columns, visible_rows, on_action, sort_column, sort_reverse)
+
+        self._commands_frame = tk.Frame(self, bg=BG_COLOR)
+        self._commands_frame.pack(side=tk.TOP)
+
+        self._filter_label = tk.Label(self._commands_frame, text="Filter", bg=BG_COLOR, fg=FG_COLOR, font=GLOBAL_FONT)
+        self._filter_label.grid(row=0, column=0)
+        self._filter_entry = tk.Entry(self._commands_frame, fg=FG_COLOR, justify=tk.CENTER, insertbackground=FG_COLOR,
+                                      bg=BG_COLOR_2)
+        self._filter_entry.bind("<KeyRelease>", self._on_filter)
+        self._filter_entry.grid(row=0, column=1)
+
+        self._table_frame = tk.Frame(self, bg=BG_COLOR)
+        self._table_frame.pack(side=tk.TOP)
+
+        self._headers = []
+        for idx, column in enumerate(columns):
+            header = tk.Label(self._table_frame, text=column.header, width=column.width, bg=BG_COLOR, fg=FG_COLOR,
+                              font=BOLD_FONT)
+            header.bind("<Button-1>", lambda event, col=idx: self.sort_by(col))
+            header.grid(row=0, column=idx)
+            self._headers.append(header)
+
+        # The pool: created once, whatever the number of records
+        self._cells = []
+        self._buttons = []
+        for row in range(visible_rows):
+            cells = []
+            for idx, column in enumerate(columns):
+                cell = tk.Label(self._table_frame, text="", width=column.width, bg=BG_COLOR, fg=FG_COLOR_2,
+                                font=GLOBAL_FONT)
+                cell.grid(row=row + 1, column=idx)
+                cells.append(cell)
+            self._cells.append(cells)
+            if on_action is not None:
+                button = Button(self._table_frame, text=action_text, bg="darkred", fg=FG_COLOR, font=GLOBAL_FONT,
+                                command=lambda r=row: self._action(r))
+                self._buttons.append(button)
+
+        self._scrollbar = tk.Scrollbar(self._table_frame, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self._scrollbar.grid(row=1, column=len(columns) + 1, rowspan=visible_rows, sticky=tk.NS)
+
+        for widget in [self._table_frame] + self._headers + [cell for cells in self._cells for cell in cells]:
+            widget.bind("<MouseWheel>", self._on_mouse_wheel)
+            widget.bind("<Button-4>", lambda event: self.scroll(-1))
+            widget.bind("<Button-5>", lambda event: self.scroll(1))
+
+    def _init_model(self, columns: typing.List[Column], visible_rows: int, on_action: typing.Optional[typing.Callable],
+                    sort_column: typing.Optional[int], sort_reverse: bool):
+        # Everything but the widgets
+        self._columns = columns
+        self._visible_rows = visible_rows
+        self._on_action = on_action
+
+        self._records = dict()  # Key -> record
+        self._view = []  # Keys of the records shown, filtered and sorted
+        self._view_dirty = False
+        self._top = 0  # Position in the view of the first row displayed
+        self._sort_column = sort_column
+        self._sort_reverse = sort_reverse
+        self._filter = ""
+
+        self._cell_text = [[""] * len(columns) for _ in range(visible_rows)]  # What each label shows
+        self._row_keys = [None] * visible_rows
+        self._scroll_position = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, key) -> bool:
+        return key in self._records
+
+    def keys(self) -> typing.List:
+        return list(self._records.keys())
+
+    def get(self, key):
+        return self._records.get(key)
+
+    def upsert(self, key, record):
+        # Adds or replaces a record, displayed at the next render()
+        if key not in self._records or self._view_depends_on_values():
+            self._view_dirty = True
+        self._records[key] = record
+
+    def remove(self, key):
+        if self._records.pop(key, None) is not None:
+            self._view_dirty = True
+
+    def sort_by(self, column: int):
+        if self._sort_column == column:
+            self._sort_reverse = not self._sort_reverse
+        else:
+            self._sort_column = column
+            self._sort_reverse = False
+        self._view_dirty = True
+        self.render()
+
+    def scroll(self, rows: int):
+        self._top += rows
+        self.render()
+
+    def render(self, values_changed: bool = False) -> int:
+        # Brings the pool in line with the records and returns the number of cells whose text changed.
+        # values_changed tells that records were modified in place since the previous render.
+        if values_changed and self._view_depends_on_values():
+            self._view_dirty = True
+        if self._view_dirty:
+            self._rebuild_view()
+
+        self._top = max(0, min(self._top, len(self._view) - self._visible_rows))
+        columns = self._columns
+        changed = 0
+        for row in range(self._visible_rows):
+            position = self._top + row
+            key = self._view[position] if position < len(self._view) else None
+            record = self._records.get(key) if key is not None else None
+            texts = self._cell_text[row]
+            for idx, column in enumerate(columns):
+                text = column.text(record) if record is not None else ""
+                if text != texts[idx]:
+                    texts[idx] = text
+                    self._cells[row][idx].config(text=text)
+                    changed += 1
+            if self._on_action is not None and (key is None) != (self._row_keys[row] is None):
+                if key is None:
+                    self._buttons[row].grid_forget()
+                else:
+                    self._buttons[row].grid(row=row + 1, column=len(columns))
+            self._row_keys[row] = key
+
+        if len(self._view) > 0:
+            position = (self._top / len(self._view), min(1.0, (self._top + self._visible_rows) / len(self._view)))
+        else:
+            position = (0.0, 1.0)
+        if position != self._scroll_position:
+            self._scroll_position = position
+            self._scrollbar.set(*position)
+        return changed
+
+    def _view_depends_on_values(self) -> bool:
+        if self._sort_column is not None and self._columns[self._sort_column].volatile:
+            return True
+        return self._filter != "" and any(column.volatile for column in self._columns)
+
+    def _rebuild_view(self):
+        self._view_dirty = False
+        if self._filter:
+            text = self._filter
+            columns = self._columns
+            keys = [key for key, record in self._records.items()
+                    if any(text in column.text(record).lower() for column in columns)]
+        else:
+            keys = list(self._records.keys())
+        if self._sort_column is not None:
+            sort_key = self._columns[self._sort_column].sort_key
+            records = self._records
+            keys.sort(key=lambda k: sort_key(records[k]), reverse=self._sort_reverse)
+        self._view = keys
+
+    def _action(self, row: int):
+        key = self._row_keys[row]
+        if key is not None:
+            self._on_action(key)
+
+    def _on_filter(self, event):
+        self._filter = self._filter_entry.get().strip().lower()
+        self._top = 0
+        self._view_dirty = True
+        self.render()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == tk.MOVETO:
+            self._top = int(float(args[1]) * len(self._view))
+        elif args[0] == tk.SCROLL:
+            step = self._visible_rows if args[2] == tk.PAGES else 1
+            self._top += int(args[1]) * step
+        self.render()
+
+    def _on_mouse_wheel(self, event):
+        self.scroll(-1 if event.delta > 0 else 1)
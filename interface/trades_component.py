@@ -1,54 +1,56 @@
+import collections
 import tkinter as tk
+import time
 import typing
 
+from models import *
 from interface.styling import *
+from interface.table_component import Column, VirtualTable
+
+TRADES_ROWS = 15  # Rows of widgets, the table scrolls beyond
+MAX_TRADES = 10_000  # Closed trades kept in the table, the oldest are dropped first
+
+
+def _trade_time(trade: Trade) -> str:
+    return time.strftime("%H:%M:%S", time.localtime(trade.time / 1000))
+
+
+TRADES_COLUMNS = [Column("Time", _trade_time, sort_key=lambda trade: trade.time),
+                  Column("Symbol", lambda trade: trade.contract.symbol, width=12),
+                  Column("Strategy", lambda trade: trade.strategy.strat_name),
+                  Column("Side", lambda trade: trade.side, width=6),
+                  Column("Quantity", lambda trade: trade.contract.format_quantity(trade.quantity),
+                         sort_key=lambda trade: trade.quantity),
+                  Column("Status", lambda trade: trade.status, volatile=True),
+                  Column("PnL", lambda trade: "%.2f" % trade.pnl, sort_key=lambda trade: trade.pnl, volatile=True)]
+
 
 class TradesWatch(tk.Frame):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        
-        self._headers=["time", "symbol", "strategy", "side", "quantity", "status", "pnl"]
-        
-        self._table_frame = tk.Frame(self, bg=BG_COLOR)
-        self._table_frame.pack(side=tk.TOP)
-        self.body_widgets = dict()
-        
-        for idx, h in enumerate(self._headers):
-            header = tk.Label(self._table_frame, text=h.capitalize(), bg=BG_COLOR, fg=FG_COLOR, font=BOLD_FONT)
-            header.grid(row=0, column=idx)
-            
-        for h in self._headers:
-            self.body_widgets[h] = dict()
-            if h in ["status", "pnl"]:
-                self.body_widgets[h+"_var"] = dict()
-            
-        self._body_index = 1
-        
-    def add_trade(self, data:typing.Dict):
-        b_index = self._body_index
-        t_index = data['time']
-        
-        self.body_widgets['time'][t_index] = tk.Label(self._table_frame, text=data['time'], bg=BG_COLOR, fg=FG_COLOR_2, font=GLOBAL_FONT)
-        self.body_widgets['time'][t_index].grid(row=b_index, column=0)
-        
-        self.body_widgets['symbol'][t_index] = tk.Label(self._table_frame, text=data['symbol'], bg=BG_COLOR, fg=FG_COLOR_2, font=GLOBAL_FONT)
-        self.body_widgets['symbol'][t_index].grid(row=b_index, column=1)
-         
-        self.body_widgets['strategy'][t_index] = tk.Label(self._table_frame, text=data['strategy'], bg=BG_COLOR, fg=FG_COLOR_2, font=GLOBAL_FONT)
-        self.body_widgets['strategy'][t_index].grid(row=b_index, column=2)
-         
-        self.body_widgets['side'][t_index] = tk.Label(self._table_frame, text=data['side'], bg=BG_COLOR, fg=FG_COLOR_2, font=GLOBAL_FONT)
-        self.body_widgets['side'][t_index].grid(row=b_index, column=3)
-         
-        self.body_widgets['quantity'][t_index] = tk.Label(self._table_frame, text=data['quantity'], bg=BG_COLOR, fg=FG_COLOR_2, font=GLOBAL_FONT)
-        self.body_widgets['quantity'][t_index].grid(row=b_index, column=4)
-         
-        self.body_widgets['status_var'][t_index] = tk.StringVar()
-        self.body_widgets['status'][t_index] = tk.Label(self._table_frame, textvariable=self.body_widgets['status_var'][t_index], bg=BG_COLOR, fg=FG_COLOR_2, font=GLOBAL_FONT)
-        self.body_widgets['status'][t_index].grid(row=b_index, column=5)
-         
-        self.body_widgets['pnl_var'][t_index] = tk.StringVar()
-        self.body_widgets['pnl'][t_index] = tk.Label(self._table_frame, textvariable=self.body_widgets['pnl_var'][t_index], bg=BG_COLOR, fg=FG_COLOR_2, font=GLOBAL_FONT)
-        self.body_widgets['pnl'][t_index].grid(row=b_index, column=6)
-        
-        self._body_index += 1
\ No newline at end of file
+
+        # Newest trades first until another column is sorted on
+        self._table = VirtualTable(TRADES_COLUMNS, TRADES_ROWS, self, sort_column=0, sort_reverse=True, bg=BG_COLOR)
+        self._table.pack(side=tk.TOP)
+
+        self._closed = collections.deque()  # Keys of the closed trades, in the order they closed
+        self._closed_keys = set()
+
+    def refresh(self, trades: typing.List[Trade]) -> int:
+        # Trades drained from the RiskEngine, already coalesced: one call per interface refresh
+        if len(trades) == 0:
+            return 0
+        for trade in trades:
+            key = trade.client_order_id
+            # Trades are updated in place by the risk engine: whether one already closed is kept here. Stale trades
+            # of an earlier session will not change any more either
+            if trade.status in ("closed", "stale") and key not in self._closed_keys:
+                self._closed_keys.add(key)
+                self._closed.append(key)
+            self._table.upsert(key, trade)
+
+        while len(self._closed) > MAX_TRADES:
+            key = self._closed.popleft()
+            self._closed_keys.discard(key)
+            self._table.remove(key)
+        return self._table.render(values_changed=True)
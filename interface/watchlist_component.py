@@ -1,22 +1,49 @@
+import threading
 import tkinter as tk
-from tkmacosx import Button
 import typing
 from models import *
+from connectors.binance_futures import BinanceFutureClient
 
 from interface.styling import *
+from interface.table_component import Column, VirtualTable
+
+WATCHLIST_ROWS = 20  # Rows of widgets, the watchlist scrolls beyond
+
+
+def _price_key(side: str) -> typing.Callable:
+    def key(row: "_WatchRow") -> float:
+        value = getattr(row, side)
+        return float(value) if value else 0.0
+    return key
+
+
+class _WatchRow:
+    # Record of a watched symbol: the prices it shows and the PriceTable sequence number they were read at
+    __slots__ = ("contract", "seq", "bid", "ask")
+
+    def __init__(self, contract: Contract):
+        self.contract = contract
+        self.seq = -1
+        self.bid = None
+        self.ask = None
+
+
+WATCHLIST_COLUMNS = [Column("Symbol", lambda row: row.contract.symbol, width=12),
+                     Column("Bid", lambda row: row.bid or "", sort_key=_price_key("bid"), volatile=True),
+                     Column("Ask", lambda row: row.ask or "", sort_key=_price_key("ask"), volatile=True)]
+
 
 class WatchList(tk.Frame):
-    def __init__(self, binance_contracts: typing.Dict[str, Contract], *args, **kwargs):
+    def __init__(self, binance_contracts: typing.Dict[str, Contract], binance: BinanceFutureClient, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
         self.binance_symbols = list(binance_contracts.keys())
+        self._binance_contracts = binance_contracts
+        self._binance = binance
         
         self._commands_frame = tk.Frame(self, bg=BG_COLOR)
         self._commands_frame.pack(side=tk.TOP)
         
-        self._table_frame = tk.Frame(self, bg=BG_COLOR)
-        self._table_frame.pack(side=tk.TOP)
-        
         self._binance_label = tk.Label(self._commands_frame, text="Binance", bg=BG_COLOR, fg=FG_COLOR, font=BOLD_FONT)
         self._binance_label.grid(row=0, column=0)
         
@@ -26,27 +53,24 @@ class WatchList(tk.Frame):
         self._binance_entry.grid(row=1, column=0)
         
         
-        self.body_widgets = dict()
-        
-        
-        self._headers = ["symbol", "bid", "ask", "remove"]
-        
-        for idx, h in enumerate(self._headers):
-            header = tk.Label(self._table_frame, text=h.capitalize() if h!="remove" else "", bg=BG_COLOR, fg=FG_COLOR, font=BOLD_FONT)
-            header.grid(row=0, column=idx)
-            
-        for h in self._headers:
-            self.body_widgets[h] = dict()
-            if h in ["bid", "ask"]:
-                self.body_widgets[h+"_var"] = dict()
-            
-        self._body_index = 1
+        self._table = VirtualTable(WATCHLIST_COLUMNS, WATCHLIST_ROWS, self, on_action=self._remove_symbol,
+                                   action_text="X", bg=BG_COLOR)
+        self._table.pack(side=tk.TOP)
+        self._prices_version = -1
 
-    def _remove_symbol(self, b_index:int):
-        for h in self._headers:
-            self.body_widgets[h][b_index].grid_forget()
-            del self.body_widgets[h][b_index]
-            
+    @property
+    def symbols(self) -> typing.List[str]:
+        return self._table.keys()
+
+    def restore(self, symbols: typing.List[str]):
+        for symbol in symbols:
+            if symbol in self._binance_contracts:
+                self._add_symbol(symbol)
+
+    def _remove_symbol(self, symbol: str):
+        self._binance.unsubscribe_channel([self._binance_contracts[symbol]], "bookTicker")
+        self._table.remove(symbol)
+        self._table.render()
             
     def _add_binance_symbol(self, event):
         symbol = event.widget.get()
@@ -55,24 +79,39 @@ class WatchList(tk.Frame):
             event.widget.delete(0, tk.END)
     
     def _add_symbol(self, symbol:str):
-        b_index = self._body_index
-        self.body_widgets['symbol'][b_index] = tk.Label(self._table_frame, text=symbol, bg=BG_COLOR, fg=FG_COLOR_2
-                                                        , font=GLOBAL_FONT)
-        self.body_widgets['symbol'][b_index].grid(row=b_index, column=0)
-        
-        self.body_widgets["bid_var"][b_index] = tk.StringVar()
-        self.body_widgets['bid'][b_index] = tk.Label(self._table_frame, textvariable=self.body_widgets["bid_var"][b_index], bg=BG_COLOR, fg=FG_COLOR_2
-                                                        , font=GLOBAL_FONT)
-        self.body_widgets['bid'][b_index].grid(row=b_index, column=1)
-        
-        self.body_widgets["ask_var"][b_index] = tk.StringVar()
-        self.body_widgets['ask'][b_index] = tk.Label(self._table_frame, textvariable=self.body_widgets["ask_var"][b_index], bg=BG_COLOR, fg=FG_COLOR_2
-                                                        , font=GLOBAL_FONT)
-        self.body_widgets['ask'][b_index].grid(row=b_index, column=2)
-        
-        
-        self.body_widgets['remove'][b_index] = Button(self._table_frame, text="X", bg="darkred", fg=FG_COLOR
-                                                        , font=GLOBAL_FONT, command=lambda: self._remove_symbol(b_index))
-        self.body_widgets['remove'][b_index].grid(row=b_index, column=3)
-        
-        self._body_index += 1
\ No newline at end of file
+        if symbol in self._table:
+            return
+        contract = self._binance_contracts[symbol]
+        # Prices of the symbol are only streamed while it is in the watchlist. The first prices are also
+        # requested over REST, on another thread, so the row does not stay empty until the symbol trades:
+        # the client hands them to the stream's thread, which keeps them unless it already has newer ones.
+        self._binance.subscribe_channel([contract], "bookTicker")
+        threading.Thread(target=self._binance.get_bid_ask, args=(contract,), daemon=True).start()
+        self._table.upsert(symbol, _WatchRow(contract))
+        self._table.render()
+
+    def refresh(self, prices) -> int:
+        # Copies the latest prices of a PriceTable into the rows and returns the number of labels changed.
+        # Nothing is done if the table has not changed since the previous call, and a row is skipped if its
+        # symbol has not been updated. Only the rows scrolled into view reach the widgets.
+        if prices.version == self._prices_version:
+            return 0
+        self._prices_version = prices.version
+
+        updated = False
+        for symbol in self._table.keys():
+            row = self._table.get(symbol)
+            snapshot = prices.snapshot(symbol)
+            if snapshot is None or snapshot[3] == row.seq:
+                continue
+            row.seq = snapshot[3]
+
+            bid = row.contract.format_price(snapshot[0])
+            ask = row.contract.format_price(snapshot[1])
+            if bid != row.bid or ask != row.ask:
+                row.bid = bid
+                row.ask = ask
+                updated = True
+        if not updated:
+            return 0
+        return self._table.render(values_changed=True)
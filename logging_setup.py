@@ -0,0 +1,57 @@
+import logging
+import logging.handlers
+import queue
+
+LOG_QUEUE_SIZE = 10_000  # Records waiting to be written, newer records are dropped beyond that
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    # Never blocks the thread that logs: if the writer thread falls behind and the queue is full, the record
+    # is dropped and counted instead.
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the % merge of the arguments is done here (they may change after the call), the full formatting
+        # is left to the listener thread. The record is not copied since no other handler sees it.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(path: str = "info.log", level: int = logging.INFO) -> logging.handlers.QueueListener:
+    # The root logger only puts records on a bounded queue; formatting for the console and the size-rotated
+    # log file happens on the QueueListener thread. Call stop() on the returned listener before exiting so that
+    # the queued records are written.
+    formatter = logging.Formatter('%(asctime)s %(levelname)s :: %(message)s')
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    stream_handler.setLevel(logging.INFO)
+
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=LOG_FILE_MAX_BYTES,
+                                                        backupCount=LOG_FILE_BACKUPS)
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(logging.DEBUG)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, file_handler, respect_handler_level=True)
+
+    logger = logging.getLogger()
+    logger.setLevel(level)
+    logger.addHandler(_DroppingQueueHandler(log_queue))
+
+    listener.start()
+    return listener
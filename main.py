@@ -1,35 +1,56 @@
 ## Imports
+import argparse
 import tkinter as tk  # Module for GUI
 import logging  # Module for logging
 from connectors.binance_futures import BinanceFutureClient  # Importing Binance Futures client
+from connectors.recorder import Recorder
+from connectors.replay import ReplayClient
 from interface.root_component import Root
+from logging_setup import setup_logging
+from metrics import metrics
 
-# Setting up logging configurations
-logger = logging.getLogger()  # Initialize logger
-logger.setLevel(logging.INFO)  # Set log level to INFO
-
-# Setting up logging handlers
-stream_handler = logging.StreamHandler()  # Stream handler for console output
-formatter = logging.Formatter('%(asctime)s %(levelname)s :: %(message)s')  # Log format
-stream_handler.setFormatter(formatter)  # Set formatter for stream handler
-stream_handler.setLevel(logging.INFO)  # Set log level for stream handler to INFO
-
-file_handler = logging.FileHandler('info.log')  # File handler for log file
-file_handler.setFormatter(formatter)  # Set formatter for file handler
-file_handler.setLevel(logging.DEBUG)  # Set log level for file handler to DEBUG
-
-# Add handlers to logger
-logger.addHandler(stream_handler)  # Add stream handler to logger
-logger.addHandler(file_handler)  # Add file handler to logger
+# Setting up logging: console and size-rotated info.log, written on a background thread
+log_listener = setup_logging('info.log')
 
 ## Following only works if main.py is executed.
 if __name__ == '__main__':
-    # Initialize Binance Futures client for testnet
-    binance = BinanceFutureClient("4bad66b617dd085319d941104cb4f3f0c03a1ab966a364a2e1845ae14cb54669", "e74f9f00255b56601171f4265ef8df3f8ca6a4f145e6f112058c55cfdecab12b",True)
+    # --record FILE keeps everything received in a market data log, --replay FILE runs offline from one
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", help="market data log to append the session to")
+    parser.add_argument("--replay", help="market data log to replay instead of connecting to Binance")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, 0 for as fast as possible")
+    parser.add_argument("--asyncio", action="store_true", help="use the asyncio client through its blocking facade")
+    parser.add_argument("--metrics-port", type=int, default=9108, help="port of the /metrics endpoint, 0 to disable")
+    args = parser.parse_args()
+
+    # Hot path instrumentation, in the Prometheus text format at http://127.0.0.1:<metrics port>/metrics
+    if args.metrics_port:
+        metrics.enabled = True
+        try:
+            metrics.serve(args.metrics_port)
+        except OSError as e:  # Port in use, e.g. by a second instance: run without the endpoint
+            logging.getLogger().warning("Metrics endpoint not started on port %s: %s", args.metrics_port, e)
+
+    recorder = None
+    if args.replay is not None:
+        binance = ReplayClient(args.replay, speed=args.speed or None)
+    elif args.asyncio:
+        from connectors.binance_futures_async import SyncBinanceFutureClient  # Needs aiohttp
+        binance = SyncBinanceFutureClient("4bad66b617dd085319d941104cb4f3f0c03a1ab966a364a2e1845ae14cb54669", "e74f9f00255b56601171f4265ef8df3f8ca6a4f145e6f112058c55cfdecab12b", True)
+    else:
+        recorder = Recorder(args.record) if args.record is not None else None
+        # Initialize Binance Futures client for testnet
+        binance = BinanceFutureClient("4bad66b617dd085319d941104cb4f3f0c03a1ab966a364a2e1845ae14cb54669", "e74f9f00255b56601171f4265ef8df3f8ca6a4f145e6f112058c55cfdecab12b",True,
+                                      recorder=recorder)
 
     ## Main window of application.
     root = Root(binance)  # Create main application window
 
     ## Function that keeps the window open indefinitely 
     # until any user input is given.
-    root.mainloop()  # Start main event loop for GUI application
\ No newline at end of file
+    root.mainloop()  # Start main event loop for GUI application
+
+    root.journal.close()  # Writes the trades and orders still queued
+    if recorder is not None:
+        recorder.close()
+    log_listener.stop()  # Writes the records still queued
\ No newline at end of file
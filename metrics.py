@@ -0,0 +1,179 @@
+import threading
+import time
+import typing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LatencyHistogram:
+    # Log-linear histogram of durations in microseconds (HDR style): 16 linear sub-buckets per power of two,
+    # so any recorded value is known within ~6% whatever its magnitude, in a fixed amount of memory.
+    SUB_BUCKETS = 16
+
+    def __init__(self):
+        self._counts = [0] * (self.SUB_BUCKETS * 40)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _index(self, micros: int) -> int:
+        if micros < self.SUB_BUCKETS:
+            return micros
+        shift = micros.bit_length() - 5
+        return (shift + 1) * self.SUB_BUCKETS + (micros >> shift) - self.SUB_BUCKETS
+
+    def _upper_bound(self, idx: int) -> int:
+        if idx < self.SUB_BUCKETS:
+            return idx
+        shift = idx // self.SUB_BUCKETS - 1
+        return ((idx % self.SUB_BUCKETS + self.SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        idx = min(self._index(int(seconds * 1_000_000)), len(self._counts) - 1)
+        with self._lock:
+            self._counts[idx] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, pct: float) -> float:
+        # Upper bound of the bucket holding the given percentile, in seconds.
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            rank = max(1, round(self.count * pct / 100))
+            seen = 0
+            for idx, count in enumerate(self._counts):
+                seen += count
+                if seen >= rank:
+                    return min(self._upper_bound(idx) / 1_000_000, self.max)
+        return self.max
+
+    def snapshot(self) -> typing.Dict[str, float]:
+        return {"count": self.count, "mean": self.total / self.count if self.count else 0.0,
+                "p50": self.percentile(50), "p90": self.percentile(90), "p99": self.percentile(99), "max": self.max}
+
+
+class Counter:
+    # Plain integer counter. Increments are not locked: each counter is meant to have a single writer thread
+    # (the decode worker of a stream, the transport of an endpoint...).
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+
+class MetricsRegistry:
+    # Named histograms and counters, with optional labels, readable as a dictionary (snapshot) or in the
+    # Prometheus text format, also served over HTTP by serve(). Hot paths look their metrics up once and keep
+    # them, and only take timestamps while `enabled` is set, so that a disabled probe is one attribute check.
+    def __init__(self):
+        self.enabled = False
+        self._histograms = dict()  # (name, labels) -> LatencyHistogram
+        self._counters = dict()  # (name, labels) -> Counter
+        self._lock = threading.Lock()
+
+        self._rates = dict()  # (name, labels) -> messages per second over the last snapshot() interval
+        self._last_rate_time = None
+        self._last_values = dict()
+
+    @staticmethod
+    def _key(name: str, labels: typing.Dict[str, str]) -> typing.Tuple[str, typing.Tuple]:
+        return name, tuple(sorted(labels.items()))
+
+    def histogram(self, name: str, **labels) -> LatencyHistogram:
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def counter(self, name: str, **labels) -> Counter:
+        key = self._key(name, labels)
+        counter = self._counters.get(key)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(key, Counter())
+        return counter
+
+    @staticmethod
+    def _series_name(name: str, labels: typing.Tuple) -> str:
+        if len(labels) == 0:
+            return name
+        return name + "{" + ",".join('%s="%s"' % (k, v) for k, v in labels) + "}"
+
+    def _update_rates(self, counters: typing.List[typing.Tuple[typing.Tuple, Counter]]):
+        # Rates are recomputed at most once per second, on the counter values seen by the latest snapshot
+        now = time.monotonic()
+        if self._last_rate_time is not None and now - self._last_rate_time < 1:
+            return
+        if self._last_rate_time is not None:
+            elapsed = now - self._last_rate_time
+            self._rates = {key: (counter.value - self._last_values.get(key, 0)) / elapsed for key, counter in counters}
+        self._last_values = {key: counter.value for key, counter in counters}
+        self._last_rate_time = now
+
+    def snapshot(self) -> typing.Dict[str, typing.Dict]:
+        counters = list(self._counters.items())
+        histograms = list(self._histograms.items())
+        with self._lock:
+            self._update_rates(counters)
+            rates = self._rates
+
+        return {"counters": {self._series_name(*key): counter.value for key, counter in counters},
+                "rates": {self._series_name(*key): rate for key, rate in rates.items()},
+                "histograms": {self._series_name(*key): histogram.snapshot() for key, histogram in histograms}}
+
+    def prometheus_text(self) -> str:
+        # Counters become <name>_total, histograms summaries in seconds with 0.5/0.9/0.99 quantiles
+        lines = []
+        typed = set()
+        for (name, labels), counter in sorted(self._counters.items()):
+            if name not in typed:
+                lines.append("# TYPE %s_total counter" % name)
+                typed.add(name)
+            lines.append("%s %s" % (self._series_name(name + "_total", labels), counter.value))
+
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            if name not in typed:
+                lines.append("# TYPE %s summary" % name)
+                typed.add(name)
+            snapshot = histogram.snapshot()
+            for quantile, key in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99")):
+                lines.append("%s %s" % (self._series_name(name, labels + (("quantile", quantile),)), snapshot[key]))
+            lines.append("%s %s" % (self._series_name(name + "_sum", labels), histogram.total))
+            lines.append("%s %s" % (self._series_name(name + "_count", labels), snapshot["count"]))
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        # GET /metrics in the Prometheus text format on a daemon thread. Returns the server, shutdown() stops it.
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                payload = registry.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# Shared by every component of the process
+metrics = MetricsRegistry()
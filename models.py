@@ -1,3 +1,9 @@
+import array
+import bisect
+import collections.abc
+import math
+import time
+import typing
 
 
 class Balance:
@@ -18,6 +24,166 @@ class Candle:
         self.close = float(candle_info[4])
         self.volume = float(candle_info[5])
 
+
+class CandleRow:
+    # Lazy, read-only view of one bar of a CandleSeries. Exposes the same attributes as Candle
+    # but reads them from the series columns on access instead of copying them.
+    __slots__ = ("_series", "_idx")
+
+    def __init__(self, series: "CandleSeries", idx: int):
+        self._series = series
+        self._idx = idx
+
+    @property
+    def timestamp(self) -> int:
+        return self._series._timestamp[self._idx]
+
+    @property
+    def open(self) -> float:
+        return self._series._open[self._idx]
+
+    @property
+    def high(self) -> float:
+        return self._series._high[self._idx]
+
+    @property
+    def low(self) -> float:
+        return self._series._low[self._idx]
+
+    @property
+    def close(self) -> float:
+        return self._series._close[self._idx]
+
+    @property
+    def volume(self) -> float:
+        return self._series._volume[self._idx]
+
+
+class CandleSeries:
+    # Columnar candle store: one contiguous typed array per field instead of one Candle object per bar.
+    # A series created by slicing is a view sharing the parent's columns, so it is read-only and
+    # only valid for the bars that existed when it was created.
+    COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+    def __init__(self):
+        self._timestamp = array.array("q")
+        self._open = array.array("d")
+        self._high = array.array("d")
+        self._low = array.array("d")
+        self._close = array.array("d")
+        self._volume = array.array("d")
+
+        self._start = 0
+        self._stop = None  # None means "up to the current end", i.e. an owning series
+        self._is_view = False
+
+    @classmethod
+    def from_klines(cls, raw_candles: typing.List[list]) -> "CandleSeries":
+        series = cls()
+        series.extend_klines(raw_candles)
+        return series
+
+    def _view(self, start: int, stop: int) -> "CandleSeries":
+        view = CandleSeries.__new__(CandleSeries)
+        view._timestamp = self._timestamp
+        view._open = self._open
+        view._high = self._high
+        view._low = self._low
+        view._close = self._close
+        view._volume = self._volume
+        view._start = start
+        view._stop = stop
+        view._is_view = True
+        return view
+
+    def _bounds(self) -> typing.Tuple[int, int]:
+        return self._start, len(self._timestamp) if self._stop is None else self._stop
+
+    def __len__(self) -> int:
+        start, stop = self._bounds()
+        return stop - start
+
+    def __getitem__(self, item):
+        start, stop = self._bounds()
+        if isinstance(item, slice):
+            s, e, step = item.indices(stop - start)
+            if step != 1:
+                raise ValueError("CandleSeries slices do not support a step")
+            return self._view(start + s, start + max(s, e))
+        if item < 0:
+            item += stop - start
+        if not 0 <= item < stop - start:
+            raise IndexError("CandleSeries index out of range")
+        return CandleRow(self, start + item)
+
+    def __iter__(self) -> typing.Iterator[CandleRow]:
+        start, stop = self._bounds()
+        for idx in range(start, stop):
+            yield CandleRow(self, idx)
+
+    def _check_writable(self):
+        if self._is_view:
+            raise ValueError("Cannot modify a CandleSeries view")
+
+    def append(self, timestamp: int, open_: float, high: float, low: float, close: float, volume: float):
+        self._check_writable()
+        self._timestamp.append(timestamp)
+        self._open.append(open_)
+        self._high.append(high)
+        self._low.append(low)
+        self._close.append(close)
+        self._volume.append(volume)
+
+    def append_kline(self, kline: list):
+        # Raw kline as returned by /fapi/v1/klines: [open time, open, high, low, close, volume, ...]
+        self.append(kline[0], float(kline[1]), float(kline[2]), float(kline[3]), float(kline[4]), float(kline[5]))
+
+    def extend_klines(self, raw_candles: typing.List[list]):
+        # Every column is parsed before any is extended, so a malformed kline leaves the series unchanged
+        self._check_writable()
+        columns = [array.array("q", (c[0] for c in raw_candles))]
+        for idx in range(1, len(self.COLUMNS)):
+            columns.append(array.array("d", (float(c[idx]) for c in raw_candles)))
+        for name, column in zip(self.COLUMNS, columns):
+            getattr(self, "_" + name).extend(column)
+
+    def extend(self, other: "CandleSeries"):
+        # Appends all bars of another series (or view), copying the columns as raw buffers.
+        self._check_writable()
+        start, stop = other._bounds()
+        for name in self.COLUMNS:
+            getattr(self, "_" + name).extend(getattr(other, "_" + name)[start:stop])
+
+    def update_last(self, high: float, low: float, close: float, volume: float):
+        # Overwrites the still-open last bar in place. An empty series has no bar to update.
+        self._check_writable()
+        if len(self._timestamp) == 0:
+            return
+        self._high[-1] = high
+        self._low[-1] = low
+        self._close[-1] = close
+        self._volume[-1] = volume
+
+    def column(self, name: str) -> memoryview:
+        # Zero-copy view of one column. Release it (or let it go out of scope) before appending,
+        # since an array cannot grow while a memoryview on it is alive.
+        if name not in self.COLUMNS:
+            raise KeyError(name)
+        start, stop = self._bounds()
+        return memoryview(getattr(self, "_" + name))[start:stop]
+
+    def between(self, start_time: int, end_time: int) -> "CandleSeries":
+        # View of the bars whose open time is within [start_time, end_time).
+        start, stop = self._bounds()
+        lo = bisect.bisect_left(self._timestamp, start_time, start, stop)
+        hi = bisect.bisect_left(self._timestamp, end_time, lo, stop)
+        return self._view(lo, hi)
+
+    def last_timestamp(self) -> typing.Optional[int]:
+        start, stop = self._bounds()
+        return self._timestamp[stop - 1] if stop > start else None
+
+
 class Contract:
     def __init__(self, contract_info):
         self.symbol = contract_info['symbol']
@@ -26,8 +192,103 @@ class Contract:
         self.price_decimals = contract_info['pricePrecision']
         self.quantity_decimals = contract_info['quantityPrecision']
 
+        # Computed once per contract rather than on every order
+        self._price_format = "%." + str(self.price_decimals) + "f"
+        self._quantity_format = "%." + str(self.quantity_decimals) + "f"
+        self._quantity_scale = 10 ** self.quantity_decimals
+
+    def round_quantity(self, quantity: float) -> float:
+        # Rounded down, so that an order sized from a balance never asks for more than the balance
+        return math.floor(quantity * self._quantity_scale + 1e-9) / self._quantity_scale
+
+    def format_price(self, price: float) -> str:
+        return self._price_format % price
+
+    def format_quantity(self, quantity: float) -> str:
+        return self._quantity_format % self.round_quantity(quantity)
+
+class LazyContracts(collections.abc.Mapping):
+    # Symbol -> Contract mapping over the raw exchangeInfo entries. A Contract is only built the first
+    # time its symbol is looked up, so listing or checking symbols never builds the hundreds not in use.
+    def __init__(self, symbols_info: typing.List[typing.Dict]):
+        self._raw = {info['symbol']: info for info in symbols_info}
+        self._contracts = dict()
+
+    def __getitem__(self, symbol: str) -> Contract:
+        contract = self._contracts.get(symbol)
+        if contract is None:
+            contract = Contract(self._raw[symbol])
+            self._contracts[symbol] = contract
+        return contract
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self._raw
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._raw)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
 class OrderStatus:
     def __init__(self, order_info):
         self.order_id = order_info['orderId']
         self.status = order_info['status']
         self.avg_price = float(order_info['avgPrice'])
+        self.symbol = order_info.get('symbol')
+        self.client_order_id = order_info.get('clientOrderId')
+        self.side = order_info.get('side')
+        self.executed_qty = float(order_info.get('executedQty', 0))
+        self.update_time = order_info.get('updateTime', 0)
+
+    @classmethod
+    def from_stream(cls, order_info) -> "OrderStatus":
+        # "o" object of an ORDER_TRADE_UPDATE user data event, which uses one letter keys
+        return cls({'orderId': order_info['i'], 'status': order_info['X'], 'avgPrice': order_info['ap'],
+                    'symbol': order_info['s'], 'clientOrderId': order_info['c'], 'side': order_info['S'],
+                    'executedQty': order_info['z'], 'updateTime': order_info['T']})
+
+
+class Position:
+    def __init__(self, position_info):
+        self.symbol = position_info['symbol']
+        self.position_side = position_info['positionSide']
+        self.amount = float(position_info['positionAmt'])
+        self.entry_price = float(position_info['entryPrice'])
+        self.unrealized_pnl = float(position_info['unrealizedProfit'])
+
+    @classmethod
+    def from_stream(cls, position_info) -> "Position":
+        # Entry of the "P" list of an ACCOUNT_UPDATE user data event
+        return cls({'symbol': position_info['s'], 'positionSide': position_info['ps'],
+                    'positionAmt': position_info['pa'], 'entryPrice': position_info['ep'],
+                    'unrealizedProfit': position_info['up']})
+
+
+class Signal:
+    def __init__(self, strategy, side: str, price: float, timestamp: int):
+        self.strategy = strategy
+        self.contract = strategy.contract
+        self.side = side
+        self.price = price
+        self.timestamp = timestamp
+        self.created = time.perf_counter()  # Start of the signal to acknowledgement latency
+
+
+class Trade:
+    # A position opened by a strategy signal, marked to market by the RiskEngine until it is exited
+    def __init__(self, trade_time: int, contract: Contract, strategy, side: str, quantity: float, entry_price: float,
+                 client_order_id: str):
+        self.time = trade_time
+        self.contract = contract
+        self.strategy = strategy
+        self.side = side  # Side of the entry order, BUY for a long
+        self.quantity = quantity
+        self.entry_price = entry_price
+        self.client_order_id = client_order_id
+
+        self.status = "open"  # Then "closing" while the exit order is in flight, and "closed"
+        self.pnl = 0.0
+        self.exit_price = None
+        self.take_profit_price = None
+        self.stop_loss_price = None
@@ -0,0 +1,353 @@
+import itertools
+import logging
+import math
+import threading
+import time
+import typing
+
+from models import *
+from database import TradeJournal
+from execution import OrderExecutor, OrderRequest, PRIORITY_EXIT
+
+logger = logging.getLogger()
+
+
+class _Book:
+    # Open longs and shorts of one strategy as quantities and entry costs, so that marking them to market is
+    # a few multiplications per tick whatever the number of trades. pnl, notional and margin are the values
+    # of the last mark, kept to update the account totals by difference.
+    __slots__ = ("long_qty", "long_cost", "short_qty", "short_cost", "pnl", "notional", "margin")
+
+    def __init__(self):
+        self.long_qty = 0.0
+        self.long_cost = 0.0
+        self.short_qty = 0.0
+        self.short_cost = 0.0
+        self.pnl = 0.0
+        self.notional = 0.0
+        self.margin = 0.0
+
+    def add(self, trade: Trade, sign: int):
+        # sign is 1 to add the trade, -1 to remove it
+        if trade.side == "BUY":
+            self.long_qty += sign * trade.quantity
+            self.long_cost += sign * trade.quantity * trade.entry_price
+        else:
+            self.short_qty += sign * trade.quantity
+            self.short_cost += sign * trade.quantity * trade.entry_price
+
+    def is_flat(self) -> bool:
+        return self.long_qty <= 1e-12 and self.short_qty <= 1e-12
+
+
+class _SymbolRisk:
+    # Open trades of one symbol, their books per strategy and the exit band: as long as the bid stays within
+    # (long_low, long_high) and the ask within (short_low, short_high), no take profit or stop loss is hit.
+    def __init__(self, contract: Contract, bid: float, ask: float, leverage: float):
+        self.contract = contract
+        self.trades = dict()  # Client order id of the entry -> Trade, open or closing
+        self.books = dict()  # Strategy -> _Book
+        self.bid = bid
+        self.ask = ask
+        self.leverage = leverage
+
+        self.long_low = -math.inf
+        self.long_high = math.inf
+        self.short_low = -math.inf
+        self.short_high = math.inf
+
+
+class RiskEngine:
+    # Tracks the trades opened by strategy signals and marks them to market from the client's PriceTable on
+    # every bookTicker update of their symbols. Per tick the cost is one book update per strategy trading the
+    # symbol and four comparisons against the exit band; trades are only scanned when a take profit or stop
+    # loss price is crossed, and then exited through the OrderExecutor with the exit priority. Unrealized PnL,
+    # exposure (notional at the current bid/ask) and margin used (notional / leverage) are kept per strategy
+    # and for the account by applying the difference of each mark.
+    #
+    # Ticks arrive on the websocket thread, entries and exits on the executor workers and fills on the user
+    # data stream thread. The interface reads the trades that changed with drain_updates(): every tick since
+    # the previous call is coalesced into one update per trade.
+    def __init__(self, client, executor: OrderExecutor, journal: typing.Optional[TradeJournal] = None):
+        self.client = client
+        self._executor = executor
+        self._journal = journal  # Trades are recorded when they open, are repriced and close, not on ticks
+
+        self.unrealized_pnl = 0.0
+        self.realized_pnl = 0.0
+        self.exposure = 0.0
+        self.margin_used = 0.0
+
+        self._symbols = dict()  # Symbol -> _SymbolRisk, only for the symbols with open trades
+        self._exits = dict()  # Client order id of an exit order -> Trade
+        self._exit_ids = itertools.count(1)
+        self._updated = dict()  # Client order id -> Trade changed since the last drain_updates()
+        self._dirty = set()  # Symbols marked since the last drain_updates()
+        self._lock = threading.Lock()
+
+        executor.add_entry_listener(self._on_entry)
+        client.account.add_order_listener(self._on_order_update)
+
+    def strategy_risk(self, strategy) -> typing.Tuple[float, float, float]:
+        # (unrealized PnL, exposure, margin used) of the open trades of a strategy
+        with self._lock:
+            symbol_risk = self._symbols.get(strategy.contract.symbol)
+            book = symbol_risk.books.get(strategy) if symbol_risk is not None else None
+            if book is None:
+                return 0.0, 0.0, 0.0
+            return book.pnl, book.notional, book.margin
+
+    @property
+    def open_trades(self) -> typing.List[Trade]:
+        with self._lock:
+            return [trade for symbol_risk in self._symbols.values() for trade in symbol_risk.trades.values()]
+
+    def on_tick(self, symbol: str, bid: float, ask: float):
+        # PriceTable listener, on the websocket thread
+        with self._lock:
+            symbol_risk = self._symbols.get(symbol)
+            if symbol_risk is None:
+                return
+            symbol_risk.bid = bid
+            symbol_risk.ask = ask
+            for book in symbol_risk.books.values():
+                self._mark(book, bid, ask, symbol_risk.leverage)
+            self._dirty.add(symbol)
+
+            if symbol_risk.long_low < bid < symbol_risk.long_high and \
+                    symbol_risk.short_low < ask < symbol_risk.short_high:
+                return
+            exits = self._triggered(symbol_risk)
+
+        for trade in exits:
+            self._exit(trade)
+
+    def drain_updates(self) -> typing.List[Trade]:
+        # The trades opened, marked or closed since the previous call, with their PnL up to date
+        with self._lock:
+            updated = self._updated
+            self._updated = dict()
+            for symbol in self._dirty:
+                symbol_risk = self._symbols.get(symbol)
+                if symbol_risk is None:
+                    continue
+                for trade in symbol_risk.trades.values():
+                    mark = symbol_risk.bid if trade.side == "BUY" else symbol_risk.ask
+                    trade.pnl = self._trade_pnl(trade, mark)
+                    updated[trade.client_order_id] = trade
+            self._dirty = set()
+        return list(updated.values())
+
+    def _changed(self, trade: Trade):
+        self._updated[trade.client_order_id] = trade
+        if self._journal is not None:
+            self._journal.record_trade(trade)
+
+    def _mark(self, book: _Book, bid: float, ask: float, leverage: float):
+        pnl = bid * book.long_qty - book.long_cost + book.short_cost - ask * book.short_qty
+        notional = bid * book.long_qty + ask * book.short_qty
+        margin = notional / leverage
+        self.unrealized_pnl += pnl - book.pnl
+        self.exposure += notional - book.notional
+        self.margin_used += margin - book.margin
+        book.pnl = pnl
+        book.notional = notional
+        book.margin = margin
+
+    @staticmethod
+    def _trade_pnl(trade: Trade, price: float) -> float:
+        if trade.side == "BUY":
+            return (price - trade.entry_price) * trade.quantity
+        return (trade.entry_price - price) * trade.quantity
+
+    @staticmethod
+    def _set_exit_prices(trade: Trade):
+        take_profit = trade.strategy.take_profit / 100
+        stop_loss = trade.strategy.stop_loss / 100
+        direction = 1 if trade.side == "BUY" else -1
+        # A percentage of 0 disables the exit
+        trade.take_profit_price = trade.entry_price * (1 + direction * take_profit) if take_profit > 0 else None
+        trade.stop_loss_price = trade.entry_price * (1 - direction * stop_loss) if stop_loss > 0 else None
+
+    def _update_band(self, symbol_risk: _SymbolRisk):
+        # Only called when a trade opens, is repriced or starts closing
+        long_low = short_low = -math.inf
+        long_high = short_high = math.inf
+        for trade in symbol_risk.trades.values():
+            if trade.status != "open":
+                continue
+            if trade.side == "BUY":
+                if trade.stop_loss_price is not None:
+                    long_low = max(long_low, trade.stop_loss_price)
+                if trade.take_profit_price is not None:
+                    long_high = min(long_high, trade.take_profit_price)
+            else:
+                if trade.take_profit_price is not None:
+                    short_low = max(short_low, trade.take_profit_price)
+                if trade.stop_loss_price is not None:
+                    short_high = min(short_high, trade.stop_loss_price)
+        symbol_risk.long_low, symbol_risk.long_high = long_low, long_high
+        symbol_risk.short_low, symbol_risk.short_high = short_low, short_high
+
+    def _triggered(self, symbol_risk: _SymbolRisk) -> typing.List[Trade]:
+        bid, ask = symbol_risk.bid, symbol_risk.ask
+        exits = []
+        for trade in symbol_risk.trades.values():
+            if trade.status != "open":
+                continue
+            if trade.side == "BUY":
+                hit = (trade.take_profit_price is not None and bid >= trade.take_profit_price) or \
+                      (trade.stop_loss_price is not None and bid <= trade.stop_loss_price)
+            else:
+                hit = (trade.take_profit_price is not None and ask <= trade.take_profit_price) or \
+                      (trade.stop_loss_price is not None and ask >= trade.stop_loss_price)
+            if hit:
+                trade.status = "closing"
+                self._changed(trade)
+                exits.append(trade)
+        if len(exits) > 0:
+            self._update_band(symbol_risk)
+        return exits
+
+    def _on_entry(self, order: OrderRequest, order_status: OrderStatus):
+        # Executor worker thread, once a signal order is accepted
+        signal = order.signal
+        contract = signal.contract
+        snapshot = self.client.prices.snapshot(contract.symbol)
+        leverage = self.client.account.leverage.get(contract.symbol, 1.0)
+        with self._lock:
+            price = self._entry_price(order_status, signal)
+            trade = Trade(int(time.time() * 1000), contract, signal.strategy, signal.side, order.quantity, price,
+                          order.client_order_id)
+            self._set_exit_prices(trade)
+
+            symbol_risk = self._symbols.get(contract.symbol)
+            first = symbol_risk is None
+            if first:
+                # Marked at the entry price until the first tick
+                if snapshot is not None and not math.isnan(snapshot[0]):
+                    symbol_risk = _SymbolRisk(contract, snapshot[0], snapshot[1], leverage)
+                else:
+                    symbol_risk = _SymbolRisk(contract, price, price, leverage)
+                self._symbols[contract.symbol] = symbol_risk
+            symbol_risk.leverage = leverage
+
+            symbol_risk.trades[trade.client_order_id] = trade
+            book = symbol_risk.books.get(trade.strategy)
+            if book is None:
+                book = symbol_risk.books[trade.strategy] = _Book()
+            book.add(trade, 1)
+            self._mark(book, symbol_risk.bid, symbol_risk.ask, leverage)
+            self._update_band(symbol_risk)
+            self._changed(trade)
+            self._dirty.add(contract.symbol)
+
+        if first:
+            self.client.prices.add_listener(contract.symbol, self.on_tick)
+            self.client.subscribe_channel([contract], "bookTicker")
+
+    def _entry_price(self, order_status: OrderStatus, signal: Signal) -> float:
+        # A market order is often FILLED on the user data stream before its REST acknowledgement, which then
+        # only carries an avgPrice of 0 (ACK response): the fill already in the account store is used. Called
+        # with the lock held, so a fill stored after this lookup finds the trade in _on_order_update.
+        if order_status.avg_price > 0:
+            return order_status.avg_price
+        filled = self.client.account.get_order(order_status.order_id)
+        if filled is not None and filled.avg_price > 0:
+            return filled.avg_price
+        return signal.price
+
+    def _on_order_update(self, order_status: OrderStatus):
+        # User data stream thread: the actual fill price of a market order replaces the price it was booked at
+        if order_status.status != "FILLED" or order_status.avg_price <= 0:
+            return
+        with self._lock:
+            exited = self._exits.get(order_status.client_order_id)
+            if exited is not None:
+                exited.exit_price = order_status.avg_price
+                if exited.status == "closed":
+                    del self._exits[order_status.client_order_id]
+                    self.realized_pnl -= exited.pnl
+                    exited.pnl = self._trade_pnl(exited, exited.exit_price)
+                    self.realized_pnl += exited.pnl
+                    self._changed(exited)
+                # Otherwise filled before the REST acknowledgement, which will close the trade at this price
+                return
+
+            symbol_risk = self._symbols.get(order_status.symbol)
+            trade = symbol_risk.trades.get(order_status.client_order_id) if symbol_risk is not None else None
+            if trade is None or trade.status != "open" or trade.entry_price == order_status.avg_price:
+                return
+            book = symbol_risk.books[trade.strategy]
+            book.add(trade, -1)
+            trade.entry_price = order_status.avg_price
+            self._set_exit_prices(trade)
+            book.add(trade, 1)
+            self._mark(book, symbol_risk.bid, symbol_risk.ask, symbol_risk.leverage)
+            self._update_band(symbol_risk)
+            self._changed(trade)
+
+    def _exit(self, trade: Trade):
+        side = "SELL" if trade.side == "BUY" else "BUY"
+        client_order_id = "%s-X-%d-%d" % (trade.contract.symbol, int(time.time()), next(self._exit_ids))
+        with self._lock:
+            self._exits[client_order_id] = trade
+        if not self._executor.submit(OrderRequest(trade.contract, side, trade.quantity, "MARKET", client_order_id,
+                                                  priority=PRIORITY_EXIT, on_ack=self._on_exit_ack)):
+            self._on_exit_ack(None, None, client_order_id)
+
+    def _on_exit_ack(self, order: typing.Optional[OrderRequest], order_status: typing.Optional[OrderStatus],
+                     client_order_id: typing.Optional[str] = None):
+        client_order_id = client_order_id or order.client_order_id
+        removed = None
+        with self._lock:
+            trade = self._exits.get(client_order_id)
+            if trade is None:
+                return
+            symbol_risk = self._symbols[trade.contract.symbol]
+
+            if order_status is None:
+                # Back in the band, so the exit is tried again on a later tick
+                del self._exits[client_order_id]
+                trade.status = "open"
+                self._update_band(symbol_risk)
+                self._changed(trade)
+                self.client._add_logs(f"Exit of the {trade.strategy.strat_name} trade on {trade.contract.symbol} "
+                                      f"failed")
+                return
+
+            filled = trade.exit_price is not None or order_status.status == "FILLED"
+            if trade.exit_price is None:
+                # Until the fill arrives, closed at the current mark
+                if order_status.avg_price > 0:
+                    trade.exit_price = order_status.avg_price
+                else:
+                    trade.exit_price = symbol_risk.bid if trade.side == "BUY" else symbol_risk.ask
+            if filled:
+                del self._exits[client_order_id]
+
+            trade.status = "closed"
+            trade.pnl = self._trade_pnl(trade, trade.exit_price)
+            self.realized_pnl += trade.pnl
+            self._changed(trade)
+
+            del symbol_risk.trades[trade.client_order_id]
+            book = symbol_risk.books[trade.strategy]
+            book.add(trade, -1)
+            self._mark(book, symbol_risk.bid, symbol_risk.ask, symbol_risk.leverage)
+            if book.is_flat():
+                # Rounding leftovers are taken out of the totals with the book
+                self.unrealized_pnl -= book.pnl
+                self.exposure -= book.notional
+                self.margin_used -= book.margin
+                del symbol_risk.books[trade.strategy]
+                trade.strategy.ongoing_position = False
+            if len(symbol_risk.trades) == 0:
+                del self._symbols[trade.contract.symbol]
+                removed = symbol_risk
+
+        self.client._add_logs(f"{trade.strategy.strat_name} trade on {trade.contract.symbol} closed at "
+                              f"{trade.exit_price}, PnL: {trade.pnl:.2f}")
+        if removed is not None:
+            self.client.prices.remove_listener(removed.contract.symbol, self.on_tick)
+            self.client.unsubscribe_channel([removed.contract], "bookTicker")
@@ -0,0 +1,162 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+import typing
+
+from models import *
+from aggregator import TIMEFRAME_MS
+from connectors.backfill import KlineBackfill
+from indicators import IndicatorRegistry
+from strategies import Strategy
+
+logger = logging.getLogger()
+
+HISTORY_CANDLES = 1000  # Closed candles a strategy is seeded with
+IDLE_LINGER = 300  # Seconds a dispatcher without strategies keeps its candle subscription before it is released
+
+_NEW_CANDLE = 0
+_SAME_CANDLE = 1
+_SEED = 2
+_STOP = 3
+
+
+class _Dispatcher:
+    # The only listener of the aggregator for one (symbol, timeframe). It queues the candle events on the worker
+    # it is pinned to, which hands them to every strategy running on that symbol and timeframe, so strategies
+    # sharing a dispatcher (and their shared indicators) are always evaluated on one thread, in stream order.
+    def __init__(self, contract: Contract, timeframe: str, work_queue: queue.SimpleQueue):
+        self.contract = contract
+        self.timeframe = timeframe
+        self.strategies = ()  # Replaced rather than mutated, the worker iterates it without locking
+        self.history = None  # Closed candles fetched over REST when the first strategy started
+        self.idle_since = None
+        self._queue = work_queue
+
+    def on_new_candle(self, timeframe: str, candles: CandleSeries):
+        # The aggregator keeps appending to `candles`: the worker gets a view that ends with the closed candle
+        self._queue.put((self, _NEW_CANDLE, candles[:len(candles)]))
+
+    def on_same_candle(self, timeframe: str, price: float, size: float, timestamp: int):
+        self._queue.put((self, _SAME_CANDLE, (price, size, timestamp)))
+
+
+class StrategyRuntime:
+    # Runs the strategies of the StrategyEditor rows. Every (symbol, timeframe) has one _Dispatcher, subscribed
+    # once to the client's candles whatever the number of strategies on it, and dispatchers are spread over a
+    # pool of worker threads so that evaluation never runs on the Tk or websocket threads. start() and stop()
+    # only queue work for the worker of the dispatcher, which fetches the REST history of a new strategy, and a
+    # dispatcher left without strategies keeps its subscription for IDLE_LINGER seconds so that switching a
+    # strategy off and on again does not touch the streams.
+    def __init__(self, client, signals, workers: int = 4, indicators: typing.Optional[IndicatorRegistry] = None,
+                 backfill: typing.Optional[KlineBackfill] = None):
+        self.client = client
+        self.signals = signals  # Passed to the strategies, usually an OrderExecutor
+        self._backfill = backfill  # With its candle cache, only the candles missing since the last run are fetched
+        self.indicators = indicators if indicators is not None else IndicatorRegistry()
+
+        self._dispatchers = dict()  # (symbol, timeframe) -> _Dispatcher
+        self._lock = threading.Lock()
+
+        self._queues = [queue.SimpleQueue() for _ in range(workers)]
+        self._next_queue = itertools.cycle(self._queues)
+        for work_queue in self._queues:
+            threading.Thread(target=self._run, args=(work_queue,), daemon=True).start()
+
+    def start(self, strategy: Strategy):
+        key = (strategy.contract.symbol, strategy.timeframe)
+        with self._lock:
+            dispatcher = self._dispatchers.get(key)
+            created = dispatcher is None
+            if created:
+                dispatcher = _Dispatcher(strategy.contract, strategy.timeframe, next(self._next_queue))
+                self._dispatchers[key] = dispatcher
+            dispatcher.idle_since = None
+
+        if created:
+            self.client.subscribe_candles(strategy.contract, strategy.timeframe, dispatcher.on_new_candle,
+                                          dispatcher.on_same_candle)
+        # Seeded on the worker, which adds it to the dispatcher afterwards
+        dispatcher._queue.put((dispatcher, _SEED, strategy))
+        self._release_idle()
+
+    def stop(self, strategy: Strategy):
+        with self._lock:
+            dispatcher = self._dispatchers.get((strategy.contract.symbol, strategy.timeframe))
+        if dispatcher is not None:
+            # Queued behind its seed, in case the strategy is stopped before it even started
+            dispatcher._queue.put((dispatcher, _STOP, strategy))
+        self._release_idle()
+
+    @property
+    def running(self) -> int:
+        return sum(len(dispatcher.strategies) for dispatcher in list(self._dispatchers.values()))
+
+    def _release_idle(self):
+        now = time.monotonic()
+        released = []
+        with self._lock:
+            for key, dispatcher in list(self._dispatchers.items()):
+                if dispatcher.idle_since is not None and now - dispatcher.idle_since > IDLE_LINGER:
+                    del self._dispatchers[key]
+                    released.append(dispatcher)
+        for dispatcher in released:
+            self.client.unsubscribe_candles(dispatcher.contract, dispatcher.timeframe, dispatcher.on_new_candle,
+                                            dispatcher.on_same_candle)
+
+    def _seed(self, dispatcher: _Dispatcher, strategy: Strategy):
+        if dispatcher.history is None:
+            timeframe_ms = TIMEFRAME_MS[dispatcher.timeframe]
+            now = int(time.time() * 1000)
+            if self._backfill is not None:
+                history = self._backfill.backfill(dispatcher.contract, dispatcher.timeframe,
+                                                  now - HISTORY_CANDLES * timeframe_ms)
+            else:
+                history = self.client.get_historical_candles(dispatcher.contract, dispatcher.timeframe,
+                                                             limit=HISTORY_CANDLES)
+            # The last kline returned is the candle in progress
+            dispatcher.history = history.between(0, now - timeframe_ms + 1)
+
+        # History plus the candles the aggregator closed since it was fetched
+        candles = CandleSeries()
+        candles.extend(dispatcher.history)
+        aggregator = self.client.aggregators.get(dispatcher.contract.symbol)
+        closed = aggregator.candles.get(dispatcher.timeframe) if aggregator is not None else None
+        last = dispatcher.history.last_timestamp()
+        if closed is not None and len(closed) > 0:
+            candles.extend(closed.between(last + 1 if last is not None else 0, closed.last_timestamp() + 1))
+
+        strategy.seed(candles)
+        with self._lock:
+            dispatcher.strategies = dispatcher.strategies + (strategy,)
+            dispatcher.idle_since = None
+
+    def _stop(self, dispatcher: _Dispatcher, strategy: Strategy):
+        with self._lock:
+            dispatcher.strategies = tuple(s for s in dispatcher.strategies if s is not strategy)
+            if len(dispatcher.strategies) == 0:
+                dispatcher.idle_since = time.monotonic()
+        strategy.stop()
+
+    def _run(self, work_queue: queue.SimpleQueue):
+        while True:
+            dispatcher, kind, args = work_queue.get()
+            try:
+                if kind == _SAME_CANDLE:
+                    for strategy in dispatcher.strategies:
+                        strategy.on_same_candle(dispatcher.timeframe, *args)
+                elif kind == _NEW_CANDLE:
+                    timestamp = args.last_timestamp()
+                    for strategy in dispatcher.strategies:
+                        # A candle closed while the strategy was seeded may already be in its history
+                        last = strategy.candles.last_timestamp()
+                        if last is None or timestamp > last:
+                            strategy.on_new_candle(dispatcher.timeframe, args)
+                elif kind == _SEED:
+                    self._seed(dispatcher, args)
+                elif kind == _STOP:
+                    self._stop(dispatcher, args)
+            except Exception as e:
+                logger.error("Error while running strategies on %s %s: %s", dispatcher.contract.symbol,
+                             dispatcher.timeframe, e)
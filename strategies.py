@@ -0,0 +1,195 @@
+import array
+import logging
+import typing
+import uuid
+
+from models import *
+from indicators import IndicatorRegistry, Macd
+
+logger = logging.getLogger()
+
+
+def new_strategy_id() -> str:
+    # Key of a strategy in its client order ids, assigned once per StrategyEditor row and kept in the workspace
+    # so that a restarted strategy sends the same ids for the same candles
+    return uuid.uuid4().hex[:8]
+
+
+class Strategy:
+    # Base class of the strategies run from the StrategyEditor rows. Strategies are fed by a
+    # CandleAggregator (on_new_candle / on_same_candle) and never place orders themselves: they hand
+    # Signal objects to an OrderExecutor, which queues them, so the websocket thread never waits on HTTP.
+    def __init__(self, contract: Contract, timeframe: str, balance_pct: float, take_profit: float, stop_loss: float,
+                 strat_name: str, signals, strategy_id: typing.Optional[str] = None):
+        self.strategy_id = strategy_id if strategy_id is not None else new_strategy_id()
+        self.contract = contract
+        self.timeframe = timeframe
+        self.balance_pct = balance_pct
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+        self.strat_name = strat_name
+
+        self._signals = signals  # Anything with a put() method, usually an OrderExecutor
+        self.ongoing_position = False
+        self.entry_pending = False  # Signal handed over, order not acknowledged yet
+
+        self.candles = CandleSeries()
+
+    def seed(self, candles: CandleSeries):
+        # Closed candles fetched over REST before the strategy starts.
+        self.candles = candles
+
+    def stop(self):
+        pass
+
+    def on_new_candle(self, timeframe: str, candles: CandleSeries):
+        self.candles = candles
+        closed = candles[-1]
+        self.on_candle_closed(closed.timestamp, closed.open, closed.high, closed.low, closed.close, closed.volume)
+
+    def on_candle_closed(self, timestamp: int, open_: float, high: float, low: float, close: float, volume: float):
+        # Evaluation on a closed candle, on plain values so the backtester can call it without building rows.
+        pass
+
+    def on_same_candle(self, timeframe: str, price: float, size: float, timestamp: int):
+        pass
+
+    def _emit(self, side: str, price: float, timestamp: int):
+        if self.ongoing_position or self.entry_pending:
+            return
+        logger.info("%s signal on %s %s: %s at %s", self.strat_name, self.contract.symbol, self.timeframe, side, price)
+        self._signals.put(Signal(self, side, price, timestamp))
+
+
+class BreakoutStrategy(Strategy):
+    # Long when the price breaks above the high of the previous candle, short when it breaks below its low,
+    # in both cases only if the candle volume is above min_vol. At most one signal per candle.
+    def __init__(self, contract: Contract, timeframe: str, balance_pct: float, take_profit: float, stop_loss: float,
+                 other_params: typing.Dict, signals, strategy_id: typing.Optional[str] = None):
+        super().__init__(contract, timeframe, balance_pct, take_profit, stop_loss, "Breakout", signals, strategy_id)
+
+        self._min_volume = other_params['min_vol']
+
+        # State of the in-progress candle, reset on each new candle so each tick is O(1)
+        self._prev_high = None
+        self._prev_low = None
+        self._volume = 0.0
+        self._signaled = False
+
+    def seed(self, candles: CandleSeries):
+        super().seed(candles)
+        if len(candles) > 0:
+            self._prev_high = candles[-1].high
+            self._prev_low = candles[-1].low
+
+    def on_candle_closed(self, timestamp: int, open_: float, high: float, low: float, close: float, volume: float):
+        if not self._signaled:
+            # The candle may only have crossed the volume threshold with its last trades
+            self._check_signal(close, volume, timestamp)
+        self._prev_high = high
+        self._prev_low = low
+        self._volume = 0.0
+        self._signaled = False
+
+    def on_same_candle(self, timeframe: str, price: float, size: float, timestamp: int):
+        self._volume += size
+        if not self._signaled:
+            self._check_signal(price, self._volume, timestamp)
+
+    def _check_signal(self, price: float, volume: float, timestamp: int):
+        if self._prev_high is None or volume <= self._min_volume:
+            return
+        if price > self._prev_high:
+            self._signaled = True
+            self._emit("BUY", price, timestamp)
+        elif price < self._prev_low:
+            self._signaled = True
+            self._emit("SELL", price, timestamp)
+
+
+class TechnicalStrategy(Strategy):
+    # MACD crossover: long when the MACD line crosses above its signal line, short when it crosses below,
+    # evaluated on closed candles. The Macd instance is shared through the IndicatorRegistry when one is given.
+    def __init__(self, contract: Contract, timeframe: str, balance_pct: float, take_profit: float, stop_loss: float,
+                 other_params: typing.Dict, signals, indicators: typing.Optional[IndicatorRegistry] = None,
+                 strategy_id: typing.Optional[str] = None):
+        super().__init__(contract, timeframe, balance_pct, take_profit, stop_loss, "Technical", signals, strategy_id)
+
+        self._ema_fast = other_params['ema_fast']
+        self._ema_slow = other_params['ema_slow']
+        self._ema_signal = other_params['ema_signal']
+
+        self._indicators = indicators
+        if indicators is not None:
+            self._macd = indicators.get_macd(contract.symbol, timeframe, self._ema_fast, self._ema_slow,
+                                             self._ema_signal)
+        else:
+            self._macd = Macd(self._ema_fast, self._ema_slow, self._ema_signal)
+
+        self._prev_diff = None
+
+    def seed(self, candles: CandleSeries):
+        super().seed(candles)
+        last = self._macd.last_timestamp
+        if last is None or (len(candles) > 0 and candles[0].timestamp > last):
+            # No state yet, or one from a checkpoint that the history does not reach back to
+            self._macd.seed(candles)
+        elif len(candles) > 0:
+            # Shared with a running strategy or restored from a checkpoint: only the newer candles are added
+            for candle in candles.between(last + 1, candles.last_timestamp() + 1):
+                self._macd.add(candle.timestamp, candle.close)
+        if self._macd.macd_line is not None:
+            self._prev_diff = self._macd.macd_line - self._macd.signal_line
+
+    def stop(self):
+        if self._indicators is not None:
+            self._indicators.release_macd(self.contract.symbol, self.timeframe, self._ema_fast, self._ema_slow,
+                                          self._ema_signal)
+
+    def on_candle_closed(self, timestamp: int, open_: float, high: float, low: float, close: float, volume: float):
+        macd_line, signal_line = self._macd.add(timestamp, close)
+        diff = macd_line - signal_line
+        if self._prev_diff is not None:
+            if self._prev_diff <= 0 < diff:
+                self._emit("BUY", close, timestamp)
+            elif self._prev_diff >= 0 > diff:
+                self._emit("SELL", close, timestamp)
+        self._prev_diff = diff
+
+
+def breakout_signals(candles: CandleSeries, min_volume: float) -> array.array:
+    # Batch version of BreakoutStrategy over closed candles: 1 for a long breakout, -1 for a short one,
+    # 0 otherwise, one entry per candle. Runs over the raw columns without creating any row objects,
+    # so it can be used to scan many contracts at once.
+    # Like the live strategy, a candle breaks out when any of its trades went past the previous high or low,
+    # i.e. when its high or low did. A candle only has its total volume and no order of its trades though:
+    # it counts as a breakout if the whole candle is above min_volume, where the live strategy needs that
+    # volume before the breaking trade, and a candle breaking both ways is reported as a long.
+    signals = array.array("b", bytes(len(candles)))
+    if len(candles) < 2:
+        return signals
+
+    high = candles.column("high")
+    low = candles.column("low")
+    volume = candles.column("volume")
+
+    for i in range(1, len(signals)):
+        if volume[i] > min_volume:
+            if high[i] > high[i - 1]:
+                signals[i] = 1
+            elif low[i] < low[i - 1]:
+                signals[i] = -1
+
+    for column in (high, low, volume):
+        column.release()
+    return signals
+
+
+def scan_breakouts(candles: typing.Dict[str, CandleSeries], min_volume: float) -> typing.Dict[str, int]:
+    # Signal of the last closed candle of every symbol, only for symbols that have one.
+    results = dict()
+    for symbol, series in candles.items():
+        signals = breakout_signals(series[-2:], min_volume)
+        if len(signals) > 0 and signals[-1] != 0:
+            results[symbol] = signals[-1]
+    return results
@@ -0,0 +1,39 @@
+from models import *
+from aggregator import CandleAggregator
+from benchmarks import fixtures
+from strategies import BreakoutStrategy
+
+
+class _Signals:
+    def __init__(self):
+        self.signals = []
+
+    def put(self, signal):
+        self.signals.append(signal)
+
+
+def test_every_trade_reaches_same_candle_listeners():
+    aggregator = CandleAggregator("BTCUSDT")
+    events = []
+    aggregator.add_listener("1m", lambda tf, candles: events.append(("new", candles[-1].timestamp)),
+                            lambda tf, price, size, timestamp: events.append(("same", timestamp)))
+
+    for timestamp in (0, 30_000, 60_000, 90_000):
+        aggregator.on_trade(100.0, 1.0, timestamp)
+
+    assert events == [("same", 0), ("same", 30_000), ("new", 0), ("same", 60_000), ("same", 90_000)]
+
+
+def test_breakout_on_the_opening_trade():
+    signals = _Signals()
+    contract = Contract(fixtures.exchange_info(1)['symbols'][0])
+    strategy = BreakoutStrategy(contract, "1m", 1.0, 1.0, 1.0, {'min_vol': 5.0}, signals)
+    aggregator = CandleAggregator("BTCUSDT")
+    aggregator.add_listener("1m", strategy.on_new_candle, strategy.on_same_candle)
+
+    aggregator.on_trade(100.0, 1.0, 0)
+    aggregator.on_trade(101.0, 1.0, 30_000)
+    # Opens the next candle above the previous high with enough volume on its own
+    aggregator.on_trade(102.0, 10.0, 60_000)
+
+    assert [(s.side, s.price, s.timestamp) for s in signals.signals] == [("BUY", 102.0, 60_000)]
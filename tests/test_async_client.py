@@ -0,0 +1,148 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from connectors.binance_futures_async import SyncBinanceFutureClient
+from benchmarks import fixtures
+from metrics import metrics
+
+
+DEPTH_EVENTS = 20
+
+
+class _StubExchange:
+    # REST routes and market / user data websockets of the exchange on an aiohttp server in its own loop
+    def __init__(self):
+        self.messages = []
+        self.loop = asyncio.new_event_loop()
+
+        app = web.Application()
+        app.router.add_get("/ws", self._market_data)
+        app.router.add_get("/ws/key", self._user_data)
+        app.router.add_get("/fapi/v1/exchangeInfo", self._json(fixtures.exchange_info(3)))
+        app.router.add_get("/fapi/v2/account", self._json(fixtures.account()))
+        app.router.add_post("/fapi/v1/listenKey", self._json({"listenKey": "key"}))
+        app.router.add_delete("/fapi/v1/listenKey", self._json(dict()))
+        app.router.add_get("/fapi/v1/ticker/bookTicker",
+                           self._json({"symbol": "BTCUSDT", "bidPrice": "1.0", "askPrice": "1.1", "time": 1}))
+        app.router.add_get("/fapi/v1/depth", self._json(fixtures.depth_snapshot()))
+
+        self._runner = web.AppRunner(app)
+        self.loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = "http://127.0.0.1:%s" % port
+        self.wss_url = "ws://127.0.0.1:%s/ws" % port
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    @staticmethod
+    def _json(payload):
+        async def handler(request):
+            return web.json_response(payload)
+        return handler
+
+    async def _market_data(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            data = json.loads(msg.data)
+            self.messages.append((data['method'], data['params']))
+            if data['method'] == "SUBSCRIBE":
+                for stream in data['params']:
+                    if stream.endswith("@depth@100ms"):
+                        for message in fixtures.depth_messages(DEPTH_EVENTS, stream.split("@")[0].upper()):
+                            await ws.send_str(message)
+                        continue
+                    await ws.send_str(json.dumps({"e": "bookTicker", "u": 1, "s": stream.split("@")[0].upper(),
+                                                  "b": "1.5", "B": "2", "a": "1.6", "A": "3", "T": 4, "E": 5},
+                                                 separators=(",", ":")))
+        return ws
+
+    async def _user_data(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str(json.dumps({"e": "ORDER_TRADE_UPDATE", "o": {"s": "BTCUSDT", "c": "abc", "S": "BUY",
+                                                                       "X": "FILLED", "i": 7, "ap": "10", "z": "1",
+                                                                       "T": 5}}))
+        async for msg in ws:
+            pass
+        return ws
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def wait_for(condition, timeout: float = 5.0):
+    done = threading.Event()
+    for _ in range(int(timeout / 0.02)):
+        if condition():
+            return True
+        done.wait(0.02)
+    return condition()
+
+
+@pytest.fixture
+def exchange():
+    exchange = _StubExchange()
+    yield exchange
+    exchange.close()
+
+
+def test_sync_facade_has_the_interface_surface(exchange):
+    client = SyncBinanceFutureClient("key", "secret", True, base_url=exchange.url, wss_url=exchange.wss_url)
+    try:
+        orders = []
+        client.account.add_order_listener(orders.append)
+        assert wait_for(lambda: client.account.get_order(7) is not None)
+
+        btc, eth = (client.contracts[symbol] for symbol in fixtures.symbols(2))
+        version = client.prices.version
+        client.subscribe_channel([btc, eth], "bookTicker")
+        client.subscribe_channel([btc], "bookTicker")  # Reference counted: no second SUBSCRIBE
+        assert wait_for(lambda: client.prices.snapshot(eth.symbol) is not None)
+        assert client.prices.version > version
+        assert client.prices.snapshot(btc.symbol)[:3] == (1.5, 1.6, 4)
+        assert [(method, sorted(params)) for method, params in exchange.messages] == \
+            [("SUBSCRIBE", ["btcusdt@bookTicker", "ethusdt@bookTicker"])]
+
+        # The REST price is older than the stream's and does not replace it
+        assert client.get_bid_ask(btc) == {'bid': 1.0, 'ask': 1.1}
+        assert client.prices.snapshot(btc.symbol)[:3] == (1.5, 1.6, 4)
+
+        client.unsubscribe_channel([btc], "bookTicker")
+        client.unsubscribe_channel([btc, eth], "bookTicker")
+        assert wait_for(lambda: len(client._subscriptions._shards) == 0)
+    finally:
+        client.close()
+
+
+def test_order_book_is_fed_by_the_depth_stream(exchange, monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", True)
+    messages = metrics.counter("ws_messages", stream="btcusdt@depthUpdate")
+    count = messages.value
+
+    client = SyncBinanceFutureClient("key", "secret", True, base_url=exchange.url, wss_url=exchange.wss_url)
+    try:
+        btc = client.contracts[fixtures.symbols(1)[0]]
+        book = client.subscribe_order_book(btc)
+        assert client.subscribe_order_book(btc) is book
+
+        last_update_id = json.loads(fixtures.depth_messages(DEPTH_EVENTS)[-1])['u']
+        assert wait_for(lambda: book.last_update_id == last_update_id)
+        assert book.synced
+        assert book.best_bid()[0] < book.best_ask()[0]
+        assert messages.value - count == DEPTH_EVENTS
+        assert "/fapi/v1/depth" in client.get_latency_stats()
+
+        client.unsubscribe_order_book(btc)
+        assert btc.symbol not in client.order_books
+        assert wait_for(lambda: len(client._subscriptions._shards) == 0)
+    finally:
+        client.close()
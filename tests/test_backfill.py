@@ -0,0 +1,108 @@
+import time
+import typing
+
+import pytest
+
+from models import *
+from connectors.backfill import CandleCache, KlineBackfill, KLINES_PAGE_LIMIT
+from connectors.binance_futures import BinanceFutureClient
+from benchmarks import fixtures
+from benchmarks.stub_server import StubBinanceServer
+
+INTERVAL_MS = 60_000
+
+
+def klines_route(history: typing.List[typing.List]):
+    # /fapi/v1/klines as Binance answers it: from startTime onwards when it is given, otherwise the latest
+    # candles up to endTime, at most `limit` of them
+    def route(params):
+        limit = int(params.get('limit', 500))
+        candles = history
+        if 'endTime' in params:
+            candles = [c for c in candles if c[0] <= int(params['endTime'])]
+        if 'startTime' in params:
+            return [c for c in candles if c[0] >= int(params['startTime'])][:limit]
+        return candles[-limit:]
+    return route
+
+
+@pytest.fixture
+def stub():
+    now = int(time.time() * 1000) // INTERVAL_MS * INTERVAL_MS
+    count = 2500
+    history = fixtures.klines(count, INTERVAL_MS, now - (count - 1) * INTERVAL_MS)
+    server = StubBinanceServer({"/fapi/v1/exchangeInfo": fixtures.exchange_info(1),
+                                "/fapi/v2/account": fixtures.account(),
+                                "/fapi/v1/klines": klines_route(history)})
+    server.history = history
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client(stub, tmp_path):
+    return BinanceFutureClient("key", "secret", True, base_url=stub.url, wss_url="ws://127.0.0.1:9",
+                               cache_dir=str(tmp_path))
+
+
+def klines_calls(stub) -> typing.List[typing.Dict]:
+    return [params for method, path, params in stub.calls if path == "/fapi/v1/klines"]
+
+
+def test_backfill_pages_backwards_from_now(stub, client, tmp_path):
+    contract = client.contracts[fixtures.symbols(1)[0]]
+    backfill = KlineBackfill(client, CandleCache(str(tmp_path / "candles")))
+
+    start_time = stub.history[0][0]
+    candles = backfill.backfill(contract, "1m", start_time)
+
+    assert [c.timestamp for c in candles] == [k[0] for k in stub.history]
+    calls = klines_calls(stub)
+    assert len(calls) == 3
+    assert all('startTime' not in params and int(params['limit']) == KLINES_PAGE_LIMIT for params in calls)
+
+
+def test_backfill_only_fetches_missing_candles_from_cache(stub, client, tmp_path):
+    contract = client.contracts[fixtures.symbols(1)[0]]
+    cache = CandleCache(str(tmp_path / "candles"))
+    start_time = stub.history[0][0]
+
+    # A previous run cached everything but the last 10 candles
+    cache.append(contract.symbol, "1m", CandleSeries.from_klines(stub.history[:-10]))
+
+    candles = KlineBackfill(client, cache).backfill(contract, "1m", start_time)
+
+    assert [c.timestamp for c in candles] == [k[0] for k in stub.history]
+    calls = klines_calls(stub)
+    assert len(calls) == 1
+    assert int(calls[0]['startTime']) == stub.history[-11][0] + 1
+
+
+def test_backfill_fetches_history_before_the_cache(stub, client, tmp_path):
+    contract = client.contracts[fixtures.symbols(1)[0]]
+    cache = CandleCache(str(tmp_path / "candles"))
+
+    # A previous run only asked for the last 500 candles
+    cache.append(contract.symbol, "1m", CandleSeries.from_klines(stub.history[-500:-1]))
+
+    start_time = stub.history[0][0]
+    candles = KlineBackfill(client, cache).backfill(contract, "1m", start_time)
+    assert [c.timestamp for c in candles] == [k[0] for k in stub.history]
+
+    # The older candles were added in front of the cached ones, so the next run downloads nothing old
+    cached = cache.load(contract.symbol, "1m")
+    assert [c.timestamp for c in cached] == [k[0] for k in stub.history[:-1]]
+    stub.calls.clear()
+    candles = KlineBackfill(client, cache).backfill(contract, "1m", start_time)
+    assert len(candles) == len(stub.history)
+    assert all('startTime' in params for params in klines_calls(stub))
+
+
+def test_backfill_ignores_a_partial_record(stub, client, tmp_path):
+    contract = client.contracts[fixtures.symbols(1)[0]]
+    cache = CandleCache(str(tmp_path / "candles"))
+    cache.append(contract.symbol, "1m", CandleSeries.from_klines(stub.history[:100]))
+    with open(cache._path(contract.symbol, "1m"), "ab") as f:
+        f.write(b"\x00" * 7)  # Crash in the middle of a write
+
+    assert len(cache.load(contract.symbol, "1m")) == 100
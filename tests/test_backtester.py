@@ -0,0 +1,77 @@
+import pytest
+
+from backtester import Backtester, run_backtest, sweep
+from models import CandleSeries, Contract
+from strategies import BreakoutStrategy
+from benchmarks import fixtures
+
+MINUTE = 60_000
+FEE = 0.04 / 100
+
+
+def contract() -> Contract:
+    return Contract(fixtures.exchange_info(1)['symbols'][0])  # Whole quantities
+
+
+def breakout_series() -> CandleSeries:
+    # A long breakout closing at its take profit on the next bar, where a second breakout is taken and then
+    # stopped out
+    candles = CandleSeries()
+    candles.append(0, 100.0, 101.0, 99.0, 100.0, 30.0)
+    candles.append(MINUTE, 100.0, 102.0, 100.0, 101.5, 20.0)  # BUY at 101.5
+    candles.append(2 * MINUTE, 101.5, 104.0, 101.0, 103.8, 10.0)  # Take profit, then BUY at 103.8
+    candles.append(3 * MINUTE, 103.8, 103.9, 102.0, 102.5, 30.0)  # Stop loss
+    return candles
+
+
+def trade_pnl(side: int, entry: float, exit_: float, quantity: float) -> float:
+    return side * (exit_ - entry) * quantity - (entry + exit_) * quantity * FEE
+
+
+def test_take_profit_and_stop_loss_exits():
+    strategy = BreakoutStrategy(contract(), "1m", 100, 2, 1, {"min_vol": 0}, None)
+    result = Backtester(strategy, 1000.0).run(breakout_series())
+
+    assert list(result.sides) == [1, 1]
+    assert list(result.entry_prices) == [101.5, 103.8]
+    assert list(result.exit_prices) == pytest.approx([101.5 * 1.02, 103.8 * 0.99])
+    assert list(result.exit_times) == [2 * MINUTE, 3 * MINUTE]
+    # Rounded down like live orders: 1000 / 101.5 = 9.85 gives 9, not 10
+    assert list(result.quantities) == [9, 9]
+
+    pnls = [trade_pnl(1, 101.5, 101.5 * 1.02, 9), trade_pnl(1, 103.8, 103.8 * 0.99, 9)]
+    assert list(result.trade_pnls) == pytest.approx(pnls)
+    assert result.pnl == pytest.approx(sum(pnls))
+    assert result.max_drawdown == pytest.approx(-pnls[1] / (1000 + pnls[0]) * 100)
+    assert not strategy.ongoing_position
+
+
+def test_position_left_open_is_closed_at_the_last_price():
+    candles = breakout_series()[:2]
+    result = run_backtest("Breakout", contract(), "1m", 100, 2, 1, {"min_vol": 0}, candles)
+    assert list(result.exit_prices) == [101.5]
+    assert result.max_drawdown == pytest.approx(-result.pnl / 1000 * 100)
+
+
+def test_trade_replay_exits_on_the_take_profit():
+    strategy = BreakoutStrategy(contract(), "1m", 100, 2, 1, {"min_vol": 0}, None)
+    prices = [100.0, 101.0, 99.0, 101.5, 102.0, 103.6]
+    timestamps = [0, 1000, 2000, MINUTE, MINUTE + 1000, MINUTE + 2000]
+    result = Backtester(strategy, 1000.0).run_trades(prices, [1.0] * len(prices), timestamps)
+
+    assert list(result.entry_prices) == [101.5]
+    assert list(result.exit_prices) == pytest.approx([101.5 * 1.02])
+    assert list(result.exit_times) == [MINUTE + 2000]
+
+
+def test_sweep_results_are_sorted_by_pnl():
+    candles = breakout_series()
+    results = sweep("Breakout", contract(), "1m", 100, 2, 1, {"min_vol": [0, 15, 1000]}, candles, processes=2)
+
+    # min_vol 15 skips the losing second breakout, 1000 skips both
+    assert [params["min_vol"] for params, _, _, _ in results] == [15, 0, 1000]
+    assert [trades for _, _, _, trades in results] == [1, 2, 0]
+    assert [pnl for _, pnl, _, _ in results] == sorted((pnl for _, pnl, _, _ in results), reverse=True)
+    for params, pnl, drawdown, trades in results:
+        result = run_backtest("Breakout", contract(), "1m", 100, 2, 1, params, candles)
+        assert (pnl, drawdown) == pytest.approx((result.pnl, result.max_drawdown))
@@ -0,0 +1,23 @@
+import time
+
+from benchmarks.suite import offline_client
+
+
+def test_account_loading_errors_are_reported():
+    client = offline_client({"/fapi/v2/account": '{"totalWalletBalance": "0"}'})  # No assets
+    for _ in range(250):
+        if len(client.logs) > 0:
+            break
+        time.sleep(0.02)
+    assert client.drain_logs() == ["Binance account could not be loaded: 'assets'"]
+    assert len(client.balances) == 0
+
+
+def test_account_is_loaded_in_the_background():
+    client = offline_client()
+    for _ in range(250):
+        if len(client.balances) > 0:
+            break
+        time.sleep(0.02)
+    assert "USDT" in client.balances
+    assert client.drain_logs() == []
@@ -0,0 +1,54 @@
+import sqlite3
+
+from database import TradeJournal
+from models import Contract, Trade
+from strategies import BreakoutStrategy
+from benchmarks import fixtures
+
+
+def closed_trade(strategy, trade_id: str, pnl: float) -> Trade:
+    trade = Trade(1713000060000, strategy.contract, strategy, "BUY", 1.0, 100.0, trade_id)
+    trade.exit_price = 100.0 + pnl
+    trade.status = "closed"
+    trade.pnl = pnl
+    return trade
+
+
+def test_trades_are_reported_per_strategy_id(tmp_path):
+    contract = Contract(fixtures.exchange_info(1)['symbols'][0])
+    first = BreakoutStrategy(contract, "1m", 1.0, 1.0, 1.0, {'min_vol': 5.0}, None, "aaaa0001")
+    second = BreakoutStrategy(contract, "15m", 1.0, 1.0, 1.0, {'min_vol': 50.0}, None, "bbbb0002")
+
+    journal = TradeJournal(str(tmp_path / "journal.db"))
+    journal.record_trade(closed_trade(first, "t1", 5.0))
+    journal.record_trade(closed_trade(first, "t2", -1.0))
+    journal.record_trade(closed_trade(second, "t3", 2.0))
+    journal.flush()
+
+    report = journal.pnl_report(group_by="strategy")
+    assert [(row['strategy'], row['strategy_type'], row['trades'], row['pnl']) for row in report] == \
+        [("aaaa0001", "Breakout", 2, 4.0), ("bbbb0002", "Breakout", 1, 2.0)]
+
+    trades = journal.load_trades({contract.symbol: contract}, strategy_id="bbbb0002")
+    assert [trade.client_order_id for trade in trades] == ["t3"]
+    assert trades[0].strategy.strategy_id == "bbbb0002"
+    journal.close()
+
+
+def test_journal_without_strategy_ids_is_migrated(tmp_path):
+    path = str(tmp_path / "journal.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE trades (id TEXT PRIMARY KEY, time INTEGER NOT NULL, symbol TEXT NOT NULL, "
+                       "strategy TEXT NOT NULL, side TEXT NOT NULL, quantity REAL NOT NULL, "
+                       "entry_price REAL NOT NULL, exit_price REAL, status TEXT NOT NULL, pnl REAL NOT NULL, "
+                       "updated INTEGER NOT NULL)")
+    connection.execute("INSERT INTO trades VALUES ('old', 1, 'BTCUSDT', 'Technical', 'BUY', 1, 100, 101, 'closed', "
+                       "1, 1)")
+    connection.commit()
+    connection.close()
+
+    journal = TradeJournal(path)
+    assert journal.pnl_report(group_by="strategy")[0]['strategy'] is None
+    contract = Contract(fixtures.exchange_info(1)['symbols'][0])
+    assert journal.load_trades({contract.symbol: contract})[0].strategy.strat_name == "Technical"
+    journal.close()
@@ -0,0 +1,86 @@
+import threading
+
+from models import Balance, Contract, OrderStatus, Signal
+from execution import OrderExecutor
+from strategies import BreakoutStrategy
+from benchmarks import fixtures
+
+
+def make_strategy(strategy_id=None, symbol_info=None, signals=None):
+    contract = Contract(symbol_info or fixtures.exchange_info(1)['symbols'][0])
+    return BreakoutStrategy(contract, "1m", 1.0, 1.0, 1.0, {'min_vol': 5.0}, signals, strategy_id)
+
+
+class _Client:
+    # place_order() waits until `ack` is set, as a slow REST round trip would
+    def __init__(self, status: str = "NEW"):
+        self.balances = {"USDT": Balance(fixtures.account()['assets'][0])}
+        self.ack = threading.Event()
+        self.orders = []
+        self.logs = []
+        self._status = status
+
+    def place_order(self, contract, side, quantity, order_type, price=None, timeinforce=None, client_order_id=None):
+        self.orders.append(client_order_id)
+        self.ack.wait(5)
+        return OrderStatus({'orderId': len(self.orders), 'status': self._status, 'avgPrice': "0",
+                            'clientOrderId': client_order_id})
+
+    def _add_logs(self, msg):
+        self.logs.append(msg)
+
+
+def test_signal_order_ids_survive_a_restart():
+    before, after = make_strategy("3f2a9c1e"), make_strategy("3f2a9c1e")
+    order_id = OrderExecutor._signal_order_id(Signal(before, "BUY", 100.0, 1713000060000))
+    assert order_id == OrderExecutor._signal_order_id(Signal(after, "BUY", 100.0, 1713000060000))
+    assert order_id.startswith("3f2a9c1e-B-1713000060-")
+
+
+def test_signal_order_ids_of_different_strategies_differ():
+    ids = {OrderExecutor._signal_order_id(Signal(make_strategy(), "SELL", 100.0, 1713000060000))
+           for _ in range(1000)}
+    assert len(ids) == 1000
+
+
+def test_signal_order_ids_fit_binance_limit_for_long_symbols():
+    ids = set()
+    for symbol in ("BTCUSDT_250627", "1000000MOGUSDT", "ETHUSDT_250926", "BTC"):
+        info = dict(fixtures.exchange_info(1)['symbols'][0], symbol=symbol)
+        order_id = OrderExecutor._signal_order_id(Signal(make_strategy("3f2a9c1e", info), "BUY", 1.0,
+                                                         1713000060000))
+        assert len(order_id) <= 36
+        ids.add(order_id)
+    assert len(ids) == 4  # The symbol still tells them apart
+
+
+def test_no_second_entry_while_the_first_is_not_acknowledged():
+    client = _Client()
+    executor = OrderExecutor(client, workers=1)
+    strategy = make_strategy(signals=executor)
+
+    strategy._emit("BUY", 100.0, 1713000060000)
+    strategy._emit("BUY", 101.0, 1713000120000)  # Next candle, before the acknowledgement
+    client.ack.set()
+    for _ in range(100):
+        if strategy.ongoing_position:
+            break
+        threading.Event().wait(0.01)
+    assert len(client.orders) == 1
+    assert strategy.ongoing_position and not strategy.entry_pending
+
+
+def test_rejected_entry_clears_the_pending_flag():
+    client = _Client("REJECTED")
+    client.ack.set()
+    executor = OrderExecutor(client, workers=1)
+    strategy = make_strategy(signals=executor)
+
+    strategy._emit("BUY", 100.0, 1713000060000)
+    for _ in range(100):
+        if not strategy.entry_pending:
+            break
+        threading.Event().wait(0.01)
+    assert not strategy.entry_pending and not strategy.ongoing_position
+    strategy._emit("BUY", 101.0, 1713000120000)  # Can try again
+    assert strategy.entry_pending
@@ -0,0 +1,88 @@
+import pytest
+
+from models import CandleSeries
+from benchmarks import fixtures
+
+MINUTE = 60_000
+START = 1713000000000
+
+
+def series(count: int = 10) -> CandleSeries:
+    return CandleSeries.from_klines(fixtures.klines(count, MINUTE, START))
+
+
+def test_slices_are_views_of_the_parent_bars():
+    candles = series()
+    view = candles[2:6]
+    assert len(view) == 4
+    assert view[0].timestamp == candles[2].timestamp
+    assert view[-1].close == candles[5].close
+    assert [row.timestamp for row in view] == [candles[i].timestamp for i in range(2, 6)]
+    assert view.last_timestamp() == candles[5].timestamp
+
+    # A view of a view keeps the parent's offsets
+    inner = view[1:]
+    assert len(inner) == 3
+    assert inner[0].timestamp == candles[3].timestamp
+    assert list(inner.column("high")) == list(candles.column("high"))[3:6]
+
+    # Bars added to the parent later are not part of the view
+    candles.append(START + 10 * MINUTE, 1.0, 2.0, 0.5, 1.5, 3.0)
+    assert len(view) == 4
+    assert len(candles[:]) == 11
+
+    assert len(candles[8:3]) == 0
+    with pytest.raises(IndexError):
+        view[4]
+    with pytest.raises(ValueError):
+        candles[::2]
+
+
+def test_between_selects_open_times_in_a_half_open_range():
+    candles = series()
+    window = candles.between(START + 2 * MINUTE, START + 5 * MINUTE)
+    assert [row.timestamp for row in window] == [START + i * MINUTE for i in (2, 3, 4)]
+
+    # On a view, only the view's bars are considered
+    assert [row.timestamp for row in candles[3:].between(START, START + 5 * MINUTE)] == \
+        [START + 3 * MINUTE, START + 4 * MINUTE]
+    assert len(candles.between(START + 20 * MINUTE, START + 30 * MINUTE)) == 0
+    assert candles.between(START + 20 * MINUTE, START + 30 * MINUTE).last_timestamp() is None
+
+
+def test_views_are_read_only():
+    candles = series()
+    view = candles[2:6]
+    with pytest.raises(ValueError):
+        view.append(START + 10 * MINUTE, 1.0, 2.0, 0.5, 1.5, 3.0)
+    with pytest.raises(ValueError):
+        view.extend_klines(fixtures.klines(1, MINUTE, START + 10 * MINUTE))
+    with pytest.raises(ValueError):
+        view.extend(candles)
+    with pytest.raises(ValueError):
+        candles.between(START, START + MINUTE).update_last(1.0, 1.0, 1.0, 1.0)
+    assert len(candles) == 10
+
+
+def test_malformed_kline_leaves_the_series_unchanged():
+    candles = series(3)
+    klines = fixtures.klines(3, MINUTE, START + 3 * MINUTE)
+    klines[1][4] = "not a price"  # Close column, after the first columns of the row parsed fine
+    with pytest.raises(ValueError):
+        candles.extend_klines(klines)
+    assert all(len(candles.column(name)) == 3 for name in CandleSeries.COLUMNS)
+
+    candles.extend_klines(fixtures.klines(3, MINUTE, START + 3 * MINUTE))
+    assert all(len(candles.column(name)) == 6 for name in CandleSeries.COLUMNS)
+
+
+def test_update_last_overwrites_the_open_bar():
+    candles = CandleSeries()
+    candles.update_last(1.0, 1.0, 1.0, 1.0)  # No bar yet
+    assert len(candles) == 0
+
+    candles = series(2)
+    candles.update_last(70000.0, 50000.0, 65000.0, 1.5)
+    last = candles[-1]
+    assert (last.high, last.low, last.close, last.volume) == (70000.0, 50000.0, 65000.0, 1.5)
+    assert candles[0].high != 70000.0
@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+
+import pytest
+
+from models import Contract
+from connectors import binance_futures
+from connectors.order_book import OrderBook
+from benchmarks import fixtures
+from benchmarks.suite import offline_client
+
+
+def reference_book(snapshot, events):
+    # Same depth replayed into plain dicts
+    bids = {float(price): float(qty) for price, qty in snapshot['bids']}
+    asks = {float(price): float(qty) for price, qty in snapshot['asks']}
+    for event in events:
+        for side, levels in ((bids, event['b']), (asks, event['a'])):
+            for price, qty in levels:
+                if float(qty) == 0:
+                    side.pop(float(price), None)
+                else:
+                    side[float(price)] = float(qty)
+    return bids, asks
+
+
+def replayed_book(count: int):
+    book = OrderBook(Contract(fixtures.exchange_info(1)['symbols'][0]))
+    snapshot = fixtures.depth_snapshot()
+    events = [json.loads(message) for message in fixtures.depth_messages(count)]
+    return book, snapshot, events
+
+
+def test_replayed_diffs_match_a_reference_book():
+    book, snapshot, events = replayed_book(500)
+    # The first events arrive before the snapshot and are buffered
+    for event in events[:5]:
+        assert book.on_depth_update(event)
+    assert book.load_snapshot(snapshot)
+    for event in events[5:]:
+        assert book.on_depth_update(event)
+
+    bids, asks = reference_book(snapshot, events)
+    assert list(book.bids.levels()) == sorted(bids.items(), reverse=True)
+    assert list(book.asks.levels()) == sorted(asks.items())
+    assert book.last_update_id == events[-1]['u']
+    assert book.synced
+
+
+def test_gap_in_the_update_chain_asks_for_a_reload():
+    book, snapshot, events = replayed_book(10)
+    assert book.load_snapshot(snapshot)
+    assert book.on_depth_update(events[0])
+    assert not book.on_depth_update(events[2])
+
+
+def test_vwap_walks_the_levels():
+    book, snapshot, events = replayed_book(1)
+    book.load_snapshot(snapshot)
+    (ask, ask_qty), (next_ask, next_qty) = list(book.asks.levels())[:2]
+
+    assert book.vwap("BUY", ask_qty) == ask
+    assert book.vwap("BUY", ask_qty + next_qty) == pytest.approx(
+        (ask_qty * ask + next_qty * next_ask) / (ask_qty + next_qty))
+    assert book.vwap("SELL", 1e9) is None  # Deeper than the book
+    assert book.slippage("BUY", ask_qty) == 0
+
+
+def test_vwap_of_a_non_positive_quantity():
+    book, snapshot, events = replayed_book(1)
+    book.load_snapshot(snapshot)
+    assert book.vwap("BUY", 0) is None
+    assert book.vwap("SELL", -1) is None
+    assert book.slippage("BUY", 0) is None
+
+
+def test_failing_snapshot_is_retried_by_one_loader_then_abandoned(monkeypatch):
+    monkeypatch.setattr(binance_futures, "ORDER_BOOK_RETRY_DELAY", 0.001)
+    monkeypatch.setattr(binance_futures, "ORDER_BOOK_MAX_ATTEMPTS", 4)
+    client = offline_client()  # No depth payload: every snapshot request fails
+    contract = Contract(fixtures.exchange_info(1)['symbols'][0])
+
+    release = threading.Event()
+    requests = []
+    get_snapshot = client.get_order_book_snapshot
+
+    def blocking_snapshot(contract):
+        requests.append(contract.symbol)
+        release.wait(5)
+        return get_snapshot(contract)
+
+    client.get_order_book_snapshot = blocking_snapshot
+    client.subscribe_order_book(contract)
+    for _ in range(5):
+        client._resync_order_book(contract.symbol)
+    time.sleep(0.05)
+    assert requests == [contract.symbol]  # No second loader
+    release.set()
+
+    for _ in range(250):
+        if contract.symbol not in client._book_loaders:
+            break
+        time.sleep(0.02)
+    # The snapshot loading during the resyncs is outdated, then 4 failed attempts
+    assert len(requests) == 5
+    assert not client.order_books[contract.symbol].synced
+    assert client.drain_logs() == [f"{contract.symbol} order book could not be loaded after 4 attempts"]
+
+
+def test_snapshot_is_loaded_by_the_resync():
+    client = offline_client({"/fapi/v1/depth": json.dumps(fixtures.depth_snapshot())})
+    contract = Contract(fixtures.exchange_info(1)['symbols'][0])
+    book = client.subscribe_order_book(contract)
+    for _ in range(250):
+        if contract.symbol not in client._book_loaders:
+            break
+        time.sleep(0.02)
+    assert book.last_update_id == fixtures.depth_snapshot()['lastUpdateId']
@@ -0,0 +1,53 @@
+import threading
+
+from connectors.price_table import PriceTable, parse_book_ticker
+
+
+def test_snapshot_reads_the_latest_update():
+    prices = PriceTable(capacity=2)
+    for i, symbol in enumerate(("BTCUSDT", "ETHUSDT", "BNBUSDT")):
+        prices.update(symbol, 10.0 + i, 11.0 + i, 1000 + i)
+    assert prices.snapshot("BNBUSDT")[:3] == (12.0, 13.0, 1002)
+    assert prices["ETHUSDT"] == {'bid': 11.0, 'ask': 12.0}
+    assert prices.snapshot("XRPUSDT") is None
+
+
+def test_snapshot_does_not_hang_on_a_slot_left_mid_write():
+    prices = PriceTable()
+    prices.update("BTCUSDT", 10.0, 11.0, 1000)
+    assert prices.snapshot("BTCUSDT")[:3] == (10.0, 11.0, 1000)
+
+    # A writer that died between its two sequence increments
+    slot = prices._index["BTCUSDT"]
+    prices._seq[slot] += 1
+    prices._bid[slot] = 12.0
+
+    assert prices.snapshot("BTCUSDT")[:3] == (10.0, 11.0, 1000)
+
+    # The next update leaves the slot readable again
+    prices.update("BTCUSDT", 13.0, 14.0, 1001)
+    assert prices.snapshot("BTCUSDT")[:3] == (13.0, 14.0, 1001)
+
+
+def test_snapshots_are_consistent_while_the_writer_runs():
+    prices = PriceTable()
+    prices.update("BTCUSDT", 0.0, 1.0, 0)
+    done = threading.Event()
+
+    def write():
+        for i in range(200_000):
+            prices.update("BTCUSDT", float(i), float(i) + 1, i)
+        done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    while not done.is_set():
+        bid, ask, update_time, seq = prices.snapshot("BTCUSDT")
+        assert ask == bid + 1 and update_time == int(bid)
+    writer.join()
+
+
+def test_parse_book_ticker():
+    frame = '{"e":"bookTicker","u":1,"s":"BTCUSDT","b":"1.5","B":"2","a":"1.6","A":"3","T":4,"E":5}'
+    assert parse_book_ticker(frame) == ("BTCUSDT", 1.5, 1.6, 4)
+    assert parse_book_ticker('{"e":"bookTicker","s":"BTCUSDT"}') is None
@@ -0,0 +1,29 @@
+from connectors.rate_limiter import RateLimiter
+
+
+def test_refused_order_holds_back_market_data_until_sent():
+    limiter = RateLimiter(order_limit_10s=1)
+    order = ("POST", "/fapi/v1/order", {'symbol': "BTCUSDT"})
+
+    assert limiter.try_acquire(*order) == 0
+    assert limiter.try_acquire(*order) > 0  # Over the orders per 10 seconds limit: waits, and is registered
+    assert limiter.try_acquire("GET", "/fapi/v1/klines", {'limit': 100}) > 0
+
+    limiter._orders_10s = 0  # The window resets
+    assert limiter.try_acquire(*order, waiting=True) == 0
+    assert limiter.try_acquire("GET", "/fapi/v1/klines", {'limit': 100}) == 0
+
+
+def test_given_up_order_releases_market_data():
+    limiter = RateLimiter(order_limit_10s=0)
+    assert limiter.try_acquire("POST", "/fapi/v1/order", dict()) > 0
+    assert limiter.try_acquire("GET", "/fapi/v1/depth", dict()) > 0
+    limiter.release_wait("POST", "/fapi/v1/order")
+    assert limiter.try_acquire("GET", "/fapi/v1/depth", dict()) == 0
+
+
+def test_used_weight_follows_the_response_headers():
+    limiter = RateLimiter(weight_limit=100, market_data_share=0.5)
+    limiter.update({"X-MBX-USED-WEIGHT-1M": "48"})
+    assert limiter.try_acquire("GET", "/fapi/v1/klines", {'limit': 1000}) > 0  # 5 over the market data share
+    assert limiter.try_acquire("POST", "/fapi/v1/order", dict()) == 0  # Orders may use the reserve
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from connectors.backfill import CandleCache, KlineBackfill
+from connectors.recorder import Recorder
+from connectors.replay import ReplayClient
+from benchmarks import fixtures
+
+START = 1713000000000
+
+
+@pytest.fixture
+def replay(tmp_path):
+    # A session whose only klines response holds 1500 one-minute candles
+    path = str(tmp_path / "session.rec")
+    recorder = Recorder(path)
+    recorder.record_response("GET", "/fapi/v1/exchangeInfo", dict(), json.dumps(fixtures.exchange_info(1)))
+    recorder.record_response("GET", "/fapi/v1/klines", {'symbol': "BTCUSDT", 'interval': "1m", 'limit': 1500},
+                             json.dumps(fixtures.klines(1500, start_time=START)))
+    recorder.close()
+    return ReplayClient(path, start=False)
+
+
+def test_klines_pages_respect_the_time_bounds(replay):
+    page = replay._make_request("GET", "/fapi/v1/klines", {'symbol': "BTCUSDT", 'interval': "1m", 'limit': 1000})
+    assert [kline[0] for kline in page] == [START + i * 60_000 for i in range(500, 1500)]
+
+    page = replay._make_request("GET", "/fapi/v1/klines", {'symbol': "BTCUSDT", 'interval': "1m", 'limit': 1000,
+                                                           'endTime': START + 500 * 60_000 - 1})
+    assert [kline[0] for kline in page] == [START + i * 60_000 for i in range(500)]
+
+    page = replay._make_request("GET", "/fapi/v1/klines", {'symbol': "BTCUSDT", 'interval': "1m", 'limit': 10,
+                                                           'startTime': START + 60_000})
+    assert [kline[0] for kline in page] == [START + i * 60_000 for i in range(1, 11)]
+
+    assert replay._make_request("GET", "/fapi/v1/klines", {'symbol': "BTCUSDT", 'interval': "1m",
+                                                           'endTime': START - 1}) == []
+
+
+def test_backfill_from_a_replay_ends(replay, tmp_path):
+    contract = replay.contracts["BTCUSDT"]
+    candles = KlineBackfill(replay, CandleCache(str(tmp_path / "cache"))).backfill(contract, "1m", START - 3600_000)
+    assert len(candles) == 1500
+    assert candles[0].timestamp == START
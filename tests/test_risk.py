@@ -0,0 +1,68 @@
+from connectors.price_table import PriceTable
+from connectors.user_stream import AccountStore
+from execution import OrderRequest
+from models import Contract, OrderStatus, Signal
+from risk import RiskEngine
+from strategies import BreakoutStrategy
+from benchmarks import fixtures
+
+
+class _Client:
+    # What the RiskEngine uses of a BinanceFutureClient
+    def __init__(self):
+        self.prices = PriceTable()
+        self.account = AccountStore()
+        self.logs = []
+
+    def subscribe_channel(self, contracts, channel):
+        pass
+
+    def unsubscribe_channel(self, contracts, channel):
+        pass
+
+    def _add_logs(self, msg):
+        self.logs.append(msg)
+
+
+class _Executor:
+    def add_entry_listener(self, listener):
+        self.on_entry = listener
+
+
+def entry(signal_price: float = 100.0):
+    contract = Contract(fixtures.exchange_info(1)['symbols'][0])
+    strategy = BreakoutStrategy(contract, "1m", 1.0, 2.0, 1.0, {'min_vol': 5.0}, None, "3f2a9c1e")
+    signal = Signal(strategy, "BUY", signal_price, 1713000060000)
+    order = OrderRequest(contract, "BUY", 0.5, "MARKET", "BTCUSDT-B-1713000060-3f2a9c1e", signal=signal)
+    ack = OrderStatus({'orderId': 7, 'status': "NEW", 'avgPrice': "0.00000", 'symbol': "BTCUSDT",
+                       'clientOrderId': order.client_order_id})
+    return order, ack
+
+
+def fill(price: float):
+    return {'s': "BTCUSDT", 'c': "BTCUSDT-B-1713000060-3f2a9c1e", 'S': "BUY", 'X': "FILLED", 'i': 7,
+            'ap': str(price), 'z': "0.500", 'T': 1713000060100}
+
+
+def test_fill_before_the_acknowledgement_sets_the_entry_price():
+    client, executor = _Client(), _Executor()
+    risk = RiskEngine(client, executor)
+    order, ack = entry()
+
+    client.account.on_order_update(fill(101.0))  # Nothing to reprice yet
+    executor.on_entry(order, ack)
+
+    trade, = risk.open_trades
+    assert trade.entry_price == 101.0
+    assert trade.take_profit_price == 101.0 * 1.02
+
+
+def test_fill_after_the_acknowledgement_reprices_the_entry():
+    client, executor = _Client(), _Executor()
+    risk = RiskEngine(client, executor)
+    order, ack = entry()
+
+    executor.on_entry(order, ack)
+    assert risk.open_trades[0].entry_price == 100.0  # The signal price until the fill
+    client.account.on_order_update(fill(99.5))
+    assert risk.open_trades[0].entry_price == 99.5
@@ -0,0 +1,73 @@
+import random
+
+from aggregator import CandleAggregator
+from models import CandleSeries, Contract
+from strategies import BreakoutStrategy, breakout_signals, scan_breakouts
+from benchmarks import fixtures
+
+MINUTE = 60_000
+
+
+class _Signals:
+    # Collects the signals of a strategy by candle, instead of an OrderExecutor
+    def __init__(self):
+        self.by_candle = dict()
+
+    def put(self, signal):
+        self.by_candle[signal.timestamp // MINUTE] = 1 if signal.side == "BUY" else -1
+
+
+def breakout_trades(count: int, seed: int = 3):
+    # Trades of `count` one-minute candles where only the last trade of a candle can go past the previous
+    # candle's range: the live strategy then sees the candle's whole volume when it breaks out, and a candle
+    # never breaks both ways, which is what the batch version assumes
+    rng = random.Random(seed)
+    trades = []
+    high, low = 101.0, 99.0
+    for i in range(count):
+        prices = [rng.uniform(low, high) for _ in range(rng.randint(1, 5))]
+        move = rng.random()
+        if move < 0.3:
+            prices.append(high + rng.uniform(0.01, 1))
+        elif move < 0.6:
+            prices.append(low - rng.uniform(0.01, 1))
+        prices = [round(price, 2) for price in prices]
+        for j, price in enumerate(prices):
+            trades.append((price, round(rng.uniform(0.1, 3), 3), i * MINUTE + j * 1000))
+        high, low = max(prices), min(prices)
+    return trades
+
+
+def candles_of(trades) -> CandleSeries:
+    candles = CandleSeries()
+    by_candle = dict()
+    for price, size, timestamp in trades:
+        by_candle.setdefault(timestamp // MINUTE, []).append((price, size))
+    for idx, candle in sorted(by_candle.items()):
+        prices = [price for price, _ in candle]
+        candles.append(idx * MINUTE, prices[0], max(prices), min(prices), prices[-1], sum(size for _, size in candle))
+    return candles
+
+
+def test_batch_breakouts_match_the_live_strategy():
+    trades = breakout_trades(300)
+    candles = candles_of(trades)
+    for min_volume in (0, 4):
+        signals = _Signals()
+        strategy = BreakoutStrategy(Contract(fixtures.exchange_info(1)['symbols'][0]), "1m", 10, 2, 1,
+                                    {"min_vol": min_volume}, signals)
+        aggregator = CandleAggregator(strategy.contract.symbol)
+        aggregator.add_listener("1m", strategy.on_new_candle, strategy.on_same_candle)
+        for price, size, timestamp in trades:
+            aggregator.on_trade(price, size, timestamp)
+
+        batch = {idx: signal for idx, signal in enumerate(breakout_signals(candles, min_volume)) if signal != 0}
+        assert batch == signals.by_candle
+        assert set(batch.values()) == {1, -1}
+
+
+def test_scan_reports_the_last_candle_only():
+    candles = candles_of(breakout_trades(50))
+    signals = breakout_signals(candles, 0)
+    results = scan_breakouts({"BTCUSDT": candles, "ETHUSDT": candles[:0]}, 0)
+    assert results == ({"BTCUSDT": signals[-1]} if signals[-1] != 0 else dict())
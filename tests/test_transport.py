@@ -0,0 +1,81 @@
+import time
+
+import pytest
+import requests
+
+from connectors.transport import HttpTransport
+from benchmarks.stub_server import StubBinanceServer
+
+
+class _FailingRoute:
+    # Fails the first `failures` calls, by answering `status` or by not answering within the read timeout
+    def __init__(self, failures: int, status: int = 503, delay: float = 0.0):
+        self.failures = failures
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, params):
+        self.calls += 1
+        if self.calls <= self.failures:
+            if self.delay > 0:
+                time.sleep(self.delay)
+                return {"status": "late"}
+            return {"code": -1001, "msg": "Internal error"}, self.status
+        return {"status": "ok"}
+
+
+@pytest.fixture
+def server():
+    server = StubBinanceServer(dict())
+    yield server
+    server.close()
+
+
+def transport(server: StubBinanceServer, read_timeout: float = 10) -> HttpTransport:
+    return HttpTransport(server.url, {'X-MBX-APIKEY': "key"}, retries=3, backoff=0, timeout=(1, read_timeout))
+
+
+def test_get_is_retried_on_server_errors(server):
+    server.routes["/fapi/v1/depth"] = route = _FailingRoute(2)
+    response = transport(server).request("GET", "/fapi/v1/depth", {'symbol': "BTCUSDT"})
+    assert response.status_code == 200
+    assert route.calls == 3
+
+
+def test_get_gives_the_last_response_once_retries_are_exhausted(server):
+    server.routes["/fapi/v1/depth"] = route = _FailingRoute(10)
+    response = transport(server).request("GET", "/fapi/v1/depth", {'symbol': "BTCUSDT"})
+    assert response.status_code == 503
+    assert route.calls == 4
+
+
+def test_post_is_not_retried_on_server_errors(server):
+    server.routes["/fapi/v1/order"] = route = _FailingRoute(1)
+    response = transport(server).request("POST", "/fapi/v1/order", {'symbol': "BTCUSDT"})
+    assert response.status_code == 503
+    assert route.calls == 1
+
+
+def test_get_is_retried_on_read_timeouts(server):
+    server.routes["/fapi/v1/depth"] = route = _FailingRoute(1, delay=0.5)
+    response = transport(server, read_timeout=0.2).request("GET", "/fapi/v1/depth", {'symbol': "BTCUSDT"})
+    assert response.json() == {"status": "ok"}
+    assert route.calls == 2
+
+
+def test_post_is_not_retried_on_read_timeouts(server):
+    # The order may have reached the matching engine: sending it again could open a second position
+    server.routes["/fapi/v1/order"] = route = _FailingRoute(1, delay=0.5)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        transport(server, read_timeout=0.2).request("POST", "/fapi/v1/order", {'symbol': "BTCUSDT"})
+    assert route.calls == 1
+
+
+def test_connections_are_kept_alive(server):
+    server.routes["/fapi/v1/time"] = {"serverTime": 0}
+    http = transport(server)
+    for _ in range(5):
+        assert http.request("GET", "/fapi/v1/time", dict()).status_code == 200
+    pool = next(iter(http._session.adapters["http://"].poolmanager.pools._container.values()))
+    assert pool.num_connections == 1
@@ -0,0 +1,32 @@
+import json
+
+from indicators import IndicatorRegistry
+from workspace import Workspace
+
+
+def test_save_is_written_in_the_background(tmp_path):
+    path = str(tmp_path / "workspace.json")
+    workspace = Workspace(path)
+    workspace.save(["BTCUSDT"], [], [])
+    workspace.save(["BTCUSDT", "ETHUSDT"], [], [])
+    workspace.flush()
+    with open(path) as f:
+        assert json.load(f)['watchlist'] == ["BTCUSDT", "ETHUSDT"]
+
+    workspace.close()
+    assert Workspace(path).load()['watchlist'] == ["BTCUSDT", "ETHUSDT"]
+
+
+def test_checkpoint_keeps_the_restored_states_not_used_yet():
+    registry = IndicatorRegistry()
+    registry.restore([{'symbol': "BTCUSDT", 'timeframe': "1m", 'indicator': "macd", 'params': [12, 26, 9],
+                       'state': [1713000000000, 100.0, 99.0, 0.5]},
+                      {'symbol': "ETHUSDT", 'timeframe': "1h", 'indicator': "macd", 'params': [12, 26, 9],
+                       'state': [1713000000000, 10.0, 9.0, 0.5]}])
+    macd = registry.get_macd("BTCUSDT", "1m", 12, 26, 9)
+    macd.add(1713000060000, 101.0)
+
+    checkpoint = {entry['symbol']: entry for entry in registry.checkpoint()}
+    assert checkpoint.keys() == {"BTCUSDT", "ETHUSDT"}
+    assert checkpoint["BTCUSDT"]['state'][0] == 1713000060000
+    assert checkpoint["ETHUSDT"]['state'] == [1713000000000, 10.0, 9.0, 0.5]
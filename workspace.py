@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+import queue
+import threading
+import typing
+
+logger = logging.getLogger()
+
+WORKSPACE_VERSION = 1
+
+
+class Workspace:
+    # What the interface was showing when it was closed, in a JSON file:
+    #   {"version": 1,
+    #    "watchlist": ["BTCUSDT", ...],
+    #    "strategies": [{"id": "3f2a9c1e", "strategy_type": "Technical", "contract": "BTCUSDT", "timeframe": "15m",
+    #                    "balance_pct": 5.0, "take_profit": 1.0, "stop_loss": 0.5,
+    #                    "parameters": {"ema_fast": 12, ...}, "active": true}, ...],
+    #    "indicators": [IndicatorRegistry.checkpoint() entries]}
+    # The file is replaced atomically, a crash while saving leaves the previous snapshot. save() only compares
+    # and queues the state, the JSON is written on a background thread so the Tk thread never waits on the disk;
+    # of the states queued while a write is in progress, only the latest is written.
+    def __init__(self, path: str = "workspace.json"):
+        self.path = path
+        self._saved = None  # Last state queued, to skip identical saves
+
+        self._queue = queue.SimpleQueue()  # States to write, or (done event, closing) markers
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def load(self) -> typing.Dict:
+        if not os.path.exists(self.path):
+            return dict()
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read the workspace %s: %s", self.path, e)
+            return dict()
+        if state.get('version') != WORKSPACE_VERSION:
+            logger.warning("Workspace %s has an unknown version %s, ignored", self.path, state.get('version'))
+            return dict()
+        self._saved = state
+        return state
+
+    def save(self, watchlist: typing.List[str], strategies: typing.List[typing.Dict],
+             indicators: typing.List[typing.Dict]):
+        state = {'version': WORKSPACE_VERSION, 'watchlist': watchlist, 'strategies': strategies,
+                 'indicators': indicators}
+        if state == self._saved:
+            return
+        self._saved = state
+        self._queue.put(state)
+
+    def _write(self):
+        while True:
+            item = self._queue.get()
+            state = None
+            while isinstance(item, dict):
+                state = item
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if state is not None:
+                self._write_file(state)
+
+            if item is not None:  # flush() or close()
+                done, closing = item
+                done.set()
+                if closing:
+                    return
+
+    def _write_file(self, state: typing.Dict):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(state, f, indent=1)
+            os.replace(self.path + ".tmp", self.path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Could not save the workspace %s: %s", self.path, e)
+
+    def flush(self):
+        # Blocks until the states saved before the call are written
+        done = threading.Event()
+        self._queue.put((done, False))
+        done.wait()
+
+    def close(self):
+        done = threading.Event()
+        self._queue.put((done, True))
+        done.wait()